@@ -0,0 +1,425 @@
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.etree import ElementTree
+
+from benchmarks.synthetic import render_screenshot
+
+_ATOM_NAMESPACE = "http://www.w3.org/2005/Atom"
+
+
+@dataclass
+class RequestRecord:
+    """
+    フェイクサーバーが受け付けた1リクエストの記録。
+    """
+
+    endpoint: str
+    status: int
+    started_at: float
+    finished_at: float
+    bytes_in: int
+    bytes_out: int
+
+
+class TokenBucket:
+    """
+    フェイクサーバーのレート制限に使用するトークンバケット。
+    """
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class _FakeServer:
+    """
+    ThreadingHTTPServer をバックグラウンドスレッドで起動し、リクエストを記録する共通部分。
+    """
+
+    def __init__(self, latency: float = 0.0, rate_limit: float | None = None):
+        self.latency = latency
+        self.rate_limiter = TokenBucket(rate_limit) if rate_limit else None
+        self.records = []
+        self._records_lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def record(self, record: RequestRecord):
+        with self._records_lock:
+            self.records.append(record)
+
+    def handle(self, method: str, path: str, query: dict, body: bytes) -> tuple[str, int, dict, bytes]:
+        """
+        リクエストを処理し、(エンドポイント名, ステータス, ヘッダー, ボディ) を返す。サブクラスで実装する。
+        """
+        raise NotImplementedError
+
+    def rate_limited_response(self, endpoint: str) -> tuple[str, int, dict, bytes]:
+        return endpoint, 429, {"Retry-After": "1", "Content-Type": "text/plain"}, b"Too Many Requests"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _dispatch(self, method: str):
+                started_at = time.perf_counter()
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                parsed = urlparse(self.path)
+                if server.latency:
+                    time.sleep(server.latency)
+                endpoint, status, headers, response_body = server.handle(
+                    method, parsed.path, parse_qs(parsed.query), body
+                )
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(response_body)))
+                self.end_headers()
+                self.wfile.write(response_body)
+                server.record(
+                    RequestRecord(endpoint, status, started_at, time.perf_counter(), len(body), len(response_body))
+                )
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_PUT(self):
+                self._dispatch("PUT")
+
+        return Handler
+
+
+class FakeNotionServer(_FakeServer):
+    """
+    Notion API（pages.retrieve, blocks.retrieve, blocks.children.list, databases.query, search）と、
+    画像ファイル（S3 の署名付き URL の代わり）を返すフェイクサーバー。
+
+    Args:
+        pages: 提供するページ。
+        latency: 1リクエストあたりの応答遅延（秒）。
+        rate_limit: 1秒あたりのリクエスト数の上限。超えた場合は 429 と Retry-After を返す。
+        url_ttl: Notion にアップロードされた画像の URL の有効期間（秒）。ブロックを返すたびに新しい URL を発行し、
+            期限が切れた URL には 403 を返す。None の場合は期限なし。
+    """
+
+    _BLOCK = re.compile(r"^/v1/blocks/([^/]+)$")
+    _BLOCK_CHILDREN = re.compile(r"^/v1/blocks/([^/]+)/children$")
+    _PAGE = re.compile(r"^/v1/pages/([^/]+)$")
+    _DATABASE_QUERY = re.compile(r"^/v1/databases/([^/]+)/query$")
+    _SEARCH = re.compile(r"^/v1/search$")
+    _FILE = re.compile(r"^/files/([^/]+)$")
+
+    def __init__(
+        self, pages: list, latency: float = 0.05, rate_limit: float | None = None, url_ttl: float | None = None
+    ):
+        super().__init__(latency, rate_limit)
+        self.url_ttl = url_ttl
+        self.pages = {page.page_id: page for page in pages}
+        self.blocks = {}
+        self.images = {}
+        self.screenshots = {}
+        for page in pages:
+            self.blocks.update(page.children)
+            self.images.update(page.images)
+            self.screenshots.update(page.screenshots)
+        self._blocks_by_id = {block["id"]: block for children in self.blocks.values() for block in children}
+        self._image_data = {}
+        self._image_lock = threading.Lock()
+
+    def _with_image_url(self, block: dict) -> dict:
+        # 画像ブロックの URL を、このサーバーの URL にする。Notion と同じく、返すたびに新しい署名付き URL を発行する
+        if block["type"] != "image":
+            return block
+        image = dict(block["image"])
+        url = f"{self.base_url}/files/{block['id']}"
+        if image["type"] == "external":
+            image["external"] = {"url": url}
+        else:
+            expiry_time = None
+            if self.url_ttl is not None:
+                expires = time.time() + self.url_ttl
+                url = f"{url}?expires={expires:.3f}"
+                expiry_time = datetime.fromtimestamp(expires, timezone.utc).isoformat().replace("+00:00", "Z")
+            image["file"] = {"url": url, "expiry_time": expiry_time}
+        return {**block, "image": image}
+
+    def database_id(self) -> str:
+        """
+        すべてのページを含むデータベースの ID。
+        """
+        return "d" * 32
+
+    def _page_summaries(self, since: str | None = None) -> list:
+        # 検索とデータベースのクエリの結果。last_edited_time の新しい順に返す
+        pages = sorted(self.pages.values(), key=lambda page: page.last_edited_time, reverse=True)
+        return [
+            {"object": "page", "id": page.page_id, "last_edited_time": page.last_edited_time}
+            for page in pages
+            if since is None or page.last_edited_time >= since
+        ]
+
+    def _image_bytes(self, image_id: str) -> bytes:
+        with self._image_lock:
+            if image_id not in self._image_data and image_id in self.screenshots:
+                self._image_data[image_id] = render_screenshot(self.screenshots[image_id])
+            elif image_id not in self._image_data:
+                size = self.images[image_id]
+                header = b"\x89PNG\r\n\x1a\n"
+                self._image_data[image_id] = header + random.Random(image_id).randbytes(max(0, size - len(header)))
+            return self._image_data[image_id]
+
+    @staticmethod
+    def _json(endpoint: str, payload: dict, status: int = 200) -> tuple[str, int, dict, bytes]:
+        return endpoint, status, {"Content-Type": "application/json"}, json.dumps(payload).encode("utf-8")
+
+    def _error(self, endpoint: str, status: int, code: str, message: str):
+        return self._json(endpoint, {"object": "error", "status": status, "code": code, "message": message}, status)
+
+    @staticmethod
+    def _paginate(items: list, query: dict, body: bytes) -> dict:
+        params = {key: values[0] for key, values in query.items()}
+        if body:
+            params.update(json.loads(body))
+        page_size = min(int(params.get("page_size") or 100), 100)
+        start = int(params.get("start_cursor") or 0)
+        end = start + page_size
+        return {
+            "object": "list",
+            "results": items[start:end],
+            "next_cursor": str(end) if end < len(items) else None,
+            "has_more": end < len(items),
+        }
+
+    def handle(self, method, path, query, body):
+        match = self._FILE.match(path)
+        if match:
+            # 画像ファイルは Notion API ではないため、レート制限の対象外とする
+            expires = query.get("expires")
+            if expires and float(expires[0]) < time.time():
+                return "notion.files.expired", 403, {"Content-Type": "application/xml"}, b"<Error>AccessDenied</Error>"
+            data = self._image_bytes(match.group(1))
+            return "notion.files.download", 200, {"Content-Type": "image/png"}, data
+
+        endpoint = "notion.unknown"
+        if self._BLOCK_CHILDREN.match(path):
+            endpoint = "notion.blocks.children.list"
+        elif self._BLOCK.match(path):
+            endpoint = "notion.blocks.retrieve"
+        elif self._PAGE.match(path):
+            endpoint = "notion.pages.retrieve"
+        elif self._DATABASE_QUERY.match(path):
+            endpoint = "notion.databases.query"
+        elif self._SEARCH.match(path):
+            endpoint = "notion.search"
+
+        if self.rate_limiter and not self.rate_limiter.try_acquire():
+            name, status, headers, response_body = self._error(endpoint, 429, "rate_limited", "Rate limited")
+            headers["Retry-After"] = "1"
+            return name, status, headers, response_body
+
+        match = self._BLOCK_CHILDREN.match(path)
+        if match and method == "GET":
+            block_id = match.group(1).replace("-", "")
+            if block_id not in self.blocks:
+                return self._error(endpoint, 404, "object_not_found", f"Block {block_id} not found")
+            response = self._paginate(self.blocks[block_id], query, b"")
+            response["results"] = [self._with_image_url(block) for block in response["results"]]
+            return self._json(endpoint, response)
+
+        match = self._BLOCK.match(path)
+        if match and method == "GET":
+            block = self._blocks_by_id.get(match.group(1).replace("-", ""))
+            if block is None:
+                return self._error(endpoint, 404, "object_not_found", "Block not found")
+            return self._json(endpoint, self._with_image_url(block))
+
+        match = self._PAGE.match(path)
+        if match and method == "GET":
+            page = self.pages.get(match.group(1).replace("-", ""))
+            if page is None:
+                return self._error(endpoint, 404, "object_not_found", "Page not found")
+            title = [{"type": "text", "text": {"content": page.title}, "plain_text": page.title, "href": None}]
+            return self._json(
+                endpoint,
+                {
+                    "object": "page",
+                    "id": page.page_id,
+                    "last_edited_time": page.last_edited_time,
+                    "properties": {"title": {"id": "title", "type": "title", "title": title}},
+                },
+            )
+
+        match = self._DATABASE_QUERY.match(path)
+        if match and method == "POST":
+            params = json.loads(body) if body else {}
+            since = params.get("filter", {}).get("last_edited_time", {}).get("on_or_after")
+            return self._json(endpoint, self._paginate(self._page_summaries(since), {}, body))
+
+        if self._SEARCH.match(path) and method == "POST":
+            return self._json(endpoint, self._paginate(self._page_summaries(), {}, body))
+
+        return self._error(endpoint, 400, "invalid_request_url", f"Unsupported request: {method} {path}")
+
+
+class FakeHatenaServer(_FakeServer):
+    """
+    はてなフォトライフの AtomPub (POST /atom/post) と、
+    はてなブログの AtomPub (POST /{user}/{blog}/atom/entry, PUT・GET /{user}/{blog}/atom/entry/{id}、
+    GET /{user}/{blog}/atom/entry) のフェイクサーバー。
+
+    Args:
+        latency: 1リクエストあたりの応答遅延（秒）。
+        rate_limit: 1秒あたりのリクエスト数の上限。超えた場合は 429 と Retry-After を返す。
+        photolife_latency_per_mb: フォトライフへのアップロード 1MB あたりの追加の遅延（秒）。
+    """
+
+    _ENTRY_COLLECTION = re.compile(r"^/([^/]+)/([^/]+)/atom/entry$")
+    _ENTRY_MEMBER = re.compile(r"^/([^/]+)/([^/]+)/atom/entry/([^/]+)$")
+    _FEED_PAGE_SIZE = 10  # エントリの一覧の1ページあたりのエントリ数
+
+    def __init__(self, latency: float = 0.1, rate_limit: float | None = None, photolife_latency_per_mb: float = 0.05):
+        super().__init__(latency, rate_limit)
+        self.photolife_latency_per_mb = photolife_latency_per_mb
+        self.entries = {}
+        self._counter = 0
+        self._counter_lock = threading.Lock()
+
+    @property
+    def photolife_url(self) -> str:
+        return f"{self.base_url}/atom/post"
+
+    def _next_id(self) -> int:
+        with self._counter_lock:
+            self._counter += 1
+            return self._counter
+
+    def _entry_response(self, endpoint: str, status: int, user: str, blog: str, entry_id: str):
+        edit_uri = f"{self.base_url}/{user}/{blog}/atom/entry/{entry_id}"
+        body = f"""<?xml version="1.0" encoding="utf-8"?>
+<entry xmlns="http://www.w3.org/2005/Atom" xmlns:app="http://www.w3.org/2007/app">
+  <id>tag:blog.hatena.ne.jp,2013:blog-{blog}-{entry_id}</id>
+  <link rel="edit" href="{edit_uri}"/>
+  <link rel="alternate" type="text/html" href="{self.base_url}/{user}/{blog}/entry/{entry_id}"/>
+</entry>"""
+        return endpoint, status, {"Content-Type": "application/atom+xml", "Location": edit_uri}, body.encode("utf-8")
+
+    def _feed(self, user: str, blog: str, query: dict) -> bytes:
+        """
+        投稿されたエントリを新しい順に並べた一覧 (Atom フィード) を返す。
+        _FEED_PAGE_SIZE 件ずつに分割し、続きがある場合は ?page=N の rel="next" のリンクを付ける。
+        """
+        page = int(query.get("page", ["0"])[0])
+        entry_ids = sorted(self.entries, key=int, reverse=True)
+        start = page * self._FEED_PAGE_SIZE
+        feed = ElementTree.Element(f"{{{_ATOM_NAMESPACE}}}feed")
+        if start + self._FEED_PAGE_SIZE < len(entry_ids):
+            link = ElementTree.SubElement(feed, f"{{{_ATOM_NAMESPACE}}}link")
+            link.set("rel", "next")
+            link.set("href", f"{self.base_url}/{user}/{blog}/atom/entry?page={page + 1}")
+        for entry_id in entry_ids[start : start + self._FEED_PAGE_SIZE]:
+            entry = ElementTree.fromstring(self.entries[entry_id])
+            for rel, href in (
+                ("edit", f"{self.base_url}/{user}/{blog}/atom/entry/{entry_id}"),
+                ("alternate", f"{self.base_url}/{user}/{blog}/entry/{entry_id}"),
+            ):
+                link = ElementTree.SubElement(entry, f"{{{_ATOM_NAMESPACE}}}link")
+                link.set("rel", rel)
+                link.set("href", href)
+            feed.append(entry)
+        return ElementTree.tostring(feed, encoding="utf-8", xml_declaration=True)
+
+    def handle(self, method, path, query, body):
+        if path == "/atom/post" and method == "POST":
+            endpoint = "hatena.photolife.post"
+        elif self._ENTRY_COLLECTION.match(path) and method == "POST":
+            endpoint = "hatena.blog.entry.create"
+        elif self._ENTRY_MEMBER.match(path) and method == "PUT":
+            endpoint = "hatena.blog.entry.update"
+        elif self._ENTRY_MEMBER.match(path) and method == "GET":
+            endpoint = "hatena.blog.entry.get"
+        elif self._ENTRY_COLLECTION.match(path) and method == "GET":
+            endpoint = "hatena.blog.entry.list"
+        else:
+            return "hatena.unknown", 404, {"Content-Type": "text/plain"}, b"Not Found"
+
+        if self.rate_limiter and not self.rate_limiter.try_acquire():
+            return self.rate_limited_response(endpoint)
+
+        if endpoint == "hatena.photolife.post":
+            if self.photolife_latency_per_mb:
+                time.sleep(self.photolife_latency_per_mb * len(body) / (1024 * 1024))
+            photo_id = f"{20260101000000 + self._next_id()}"
+            response = f"""<?xml version="1.0" encoding="utf-8"?>
+<entry xmlns="http://purl.org/atom/ns#" xmlns:hatena="http://www.hatena.ne.jp/info/xmlns#">
+  <title>image</title>
+  <hatena:syntax>[f:id:bench:{photo_id}p:plain]</hatena:syntax>
+</entry>"""
+            return endpoint, 201, {"Content-Type": "application/x.atom+xml"}, response.encode("utf-8")
+
+        match = self._ENTRY_COLLECTION.match(path)
+        if match and method == "GET":
+            feed = self._feed(match.group(1), match.group(2), query)
+            return endpoint, 200, {"Content-Type": "application/atom+xml"}, feed
+        if match:
+            entry_id = str(self._next_id())
+            self.entries[entry_id] = body
+            return self._entry_response(endpoint, 201, match.group(1), match.group(2), entry_id)
+
+        match = self._ENTRY_MEMBER.match(path)
+        entry_id = match.group(3)
+        if entry_id not in self.entries:
+            return endpoint, 404, {"Content-Type": "text/plain"}, b"Entry not found"
+        if method == "GET":
+            # 投稿された XML をそのまま返す（タイトル、本文、下書きかどうかを含む）
+            return endpoint, 200, {"Content-Type": "application/atom+xml"}, self.entries[entry_id]
+        self.entries[entry_id] = body
+        return self._entry_response(endpoint, 200, match.group(1), match.group(2), entry_id)
@@ -0,0 +1,141 @@
+"""
+Notion から取得したブロックツリーを、API の応答の dict のまま保持した場合と、
+CompactBlock に変換して保持した場合のメモリ使用量を比較するベンチマーク。
+
+ローカルのフェイクサーバーからページを取得し、表現ごとに新しいプロセスで
+ツリーの保持に使用しているメモリ（tracemalloc）、取得中のピーク、取得と変換の所要時間を計測する。
+変換した Markdown が表現によらず同じであることも確認する。
+
+使い方:
+    python -m benchmarks.memory_benchmark
+    python -m benchmarks.memory_benchmark --scenario flat-5000 --scenario mixed --json memory.json
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.fake_servers import FakeNotionServer
+from benchmarks.synthetic import SCENARIOS
+
+REPRESENTATIONS = {"raw": False, "compact": True}
+
+
+def _measure(env: dict, page_id: str, compact: bool) -> dict:
+    """
+    新しいプロセスの中でブロックツリーを取得して変換し、メモリ使用量と所要時間を返す。
+    """
+    import gc
+    import os
+    import resource
+    import tracemalloc
+
+    os.environ.update(env)
+    from src.models.converter import render_markdown_with_placeholders
+    from src.models.notion_fetcher import _get_notion_client, fetch_blocks_recursively
+
+    # クライアントの作成と読み込みにかかるメモリは計測に含めない
+    _get_notion_client()
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    started_at = time.perf_counter()
+    blocks = fetch_blocks_recursively(page_id, compact=compact)
+    fetch_time = time.perf_counter() - started_at
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started_at = time.perf_counter()
+    markdown_content, image_jobs = render_markdown_with_placeholders(blocks)
+    convert_time = time.perf_counter() - started_at
+
+    # Linux では KB、macOS ではバイト単位
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "retained_mb": (current - baseline) / (1024 * 1024),
+        "fetch_peak_mb": (peak - baseline) / (1024 * 1024),
+        "peak_rss_mb": max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024,
+        "fetch_time": fetch_time,
+        "convert_time": convert_time,
+        "markdown_sha256": hashlib.sha256(markdown_content.encode("utf-8")).hexdigest(),
+        "images": len(image_jobs),
+    }
+
+
+def run_scenario(name: str) -> dict:
+    """
+    シナリオのページを表現ごとに取得し、計測結果を返す。
+    """
+    page = SCENARIOS[name]()
+    results = {}
+    with FakeNotionServer([page], latency=0.0) as notion:
+        env = {
+            "NOTION_API_KEY": "secret_benchmark",
+            "NOTION_API_BASE_URL": notion.base_url,
+            "NOTION_RATE_LIMIT": "0",
+        }
+        # 以前の計測で確保したメモリの影響を受けないよう、表現ごとに新しいプロセスで実行する
+        context = multiprocessing.get_context("spawn")
+        for representation, compact in REPRESENTATIONS.items():
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                results[representation] = executor.submit(_measure, env, page.page_id, compact).result()
+
+    raw, compact = results["raw"], results["compact"]
+    return {
+        "scenario": name,
+        "blocks": page.block_count,
+        "results": results,
+        "retained_ratio": compact["retained_mb"] / raw["retained_mb"] if raw["retained_mb"] else 0.0,
+        "same_markdown": raw["markdown_sha256"] == compact["markdown_sha256"],
+    }
+
+
+def print_result(result: dict):
+    print(
+        f"[{result['scenario']}] blocks={result['blocks']} compact/raw={result['retained_ratio']:.2f} "
+        f"same_markdown={result['same_markdown']}"
+    )
+    for representation, stats in result["results"].items():
+        print(
+            f"    {representation:<8} retained={stats['retained_mb']:.2f}MB fetch_peak={stats['fetch_peak_mb']:.2f}MB "
+            f"peak_rss={stats['peak_rss_mb']:.1f}MB fetch={stats['fetch_time']:.2f}s "
+            f"convert={stats['convert_time'] * 1000:.0f}ms"
+        )
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="ブロックツリーの表現ごとのメモリ使用量のベンチマーク")
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="実行するシナリオ（複数指定可）。省略時は flat-5000",
+    )
+    parser.add_argument("--json", metavar="PATH", help="結果を JSON で出力するファイル")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = []
+    for name in args.scenario or ["flat-5000"]:
+        result = run_scenario(name)
+        print_result(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+
+    # 表現によって変換結果が変わった場合は失敗とする
+    return 0 if all(result["same_markdown"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""
+ローカルのフェイクサーバーに対して Notion -> はてなブログの投稿処理を実行し、所要時間を計測するベンチマーク。
+
+使い方:
+    python -m benchmarks.run_benchmark
+    python -m benchmarks.run_benchmark --scenario flat-1000 --scenario many-images --json result.json
+    python -m benchmarks.run_benchmark --baseline result.json --tolerance 0.2
+    python -m benchmarks.run_benchmark --scenario many-images --targets 3 --target-accounts 2
+"""
+
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.fake_servers import FakeHatenaServer, FakeNotionServer
+from benchmarks.synthetic import SCENARIOS
+
+
+def _run_pipeline(env: dict, page_id: str, sync: bool) -> dict:
+    """
+    新しいプロセスの中で投稿処理を1回実行し、所要時間とピークメモリを返す。
+    """
+    import resource
+
+    os.environ.update(env)
+    from src.controllers.main_controller import process_notion_to_hatena
+    from src.models.image_processing import shutdown_image_process_pool
+
+    started_at = time.perf_counter()
+    status = process_notion_to_hatena(page_id, use_image_cache=env["BENCHMARK_USE_IMAGE_CACHE"] == "1", sync=sync)
+    wall_time = time.perf_counter() - started_at
+    # ワーカープロセスの終了時には画像の最適化のプロセスプールが自動で終了しないため、ここで終了する
+    shutdown_image_process_pool()
+    # Linux では KB、macOS ではバイト単位
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+    return {"status": status, "wall_time": wall_time, "peak_rss_mb": peak_rss_mb}
+
+
+def _busy_time(intervals: list) -> float:
+    """
+    重なりを除いた、リクエストを処理していた時間の合計を返す。
+    """
+    total = 0.0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def summarize_requests(records: list) -> dict:
+    """
+    リクエストの記録をエンドポイントごとに集計する。
+    """
+    endpoints = {}
+    for record in records:
+        endpoints.setdefault(record.endpoint, []).append(record)
+
+    summary = {}
+    for endpoint, items in sorted(endpoints.items()):
+        latencies = sorted(item.finished_at - item.started_at for item in items)
+        summary[endpoint] = {
+            "requests": len(items),
+            "rate_limited": sum(1 for item in items if item.status == 429),
+            "bytes_in": sum(item.bytes_in for item in items),
+            "bytes_out": sum(item.bytes_out for item in items),
+            "mean_latency": sum(latencies) / len(latencies),
+            "max_latency": latencies[-1],
+            "active_window": max(item.finished_at for item in items) - min(item.started_at for item in items),
+            "busy_time": _busy_time([(item.started_at, item.finished_at) for item in items]),
+        }
+    return summary
+
+
+def run_scenario(name: str, args: argparse.Namespace) -> dict:
+    """
+    シナリオを1つ実行し、計測結果を返す。
+    """
+    page = SCENARIOS[name]()
+    notion = FakeNotionServer(
+        [page], latency=args.notion_latency, rate_limit=args.notion_rate_limit, url_ttl=args.notion_url_ttl
+    )
+    hatena = FakeHatenaServer(
+        latency=args.hatena_latency,
+        rate_limit=args.hatena_rate_limit,
+        photolife_latency_per_mb=args.photolife_latency_per_mb,
+    )
+    with notion, hatena, tempfile.TemporaryDirectory() as work_dir:
+        env = {
+            "NOTION_API_KEY": "secret_benchmark",
+            "NOTION_API_BASE_URL": notion.base_url,
+            "HATENA_USER_ID": "bench",
+            "HATENA_BLOG_ID": "bench.hatenablog.com",
+            "HATENA_API_KEY": "benchmark",
+            "HATENA_PHOTOLIFE_URL": hatena.photolife_url,
+            "HATENA_BLOG_BASE_URL": hatena.base_url,
+            "IMAGE_CACHE_PATH": os.path.join(work_dir, "image_cache.sqlite3"),
+            "SYNC_STATE_PATH": os.path.join(work_dir, "sync.sqlite3"),
+            # 前回の計測の変換結果を使わず、利用者のキャッシュにも書き込まないよう、作業用のディレクトリに置く
+            "RENDER_CACHE_PATH": os.path.join(work_dir, "render_cache.sqlite3"),
+            "JOURNAL_PATH": os.path.join(work_dir, "journal.sqlite3"),
+            # フェイクサーバーのエントリを、利用者のエントリの索引に登録しない
+            "ENTRY_INDEX_PATH": os.path.join(work_dir, "entry_index.sqlite3"),
+            "BENCHMARK_USE_IMAGE_CACHE": "1" if args.image_cache else "0",
+            "HATENA_OPTIMIZE_IMAGES": "1" if args.optimize_images else "0",
+        }
+        env.update(_target_env(args.targets, args.target_accounts))
+        # 計測対象のプロセスにフェイクサーバーのメモリを含めないよう、投稿処理は別プロセスで実行する。
+        # 画像の最適化でさらにプロセスを起動できるよう、デーモンでないワーカーを使う ProcessPoolExecutor で実行する
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(_run_pipeline, env, page.page_id, args.sync).result()
+
+    wall_time = result["wall_time"]
+    return {
+        "scenario": name,
+        "status": result["status"],
+        "blocks": page.block_count,
+        "images": len(page.images) + len(page.screenshots),
+        "wall_time": wall_time,
+        "pages_per_minute": 60 / wall_time if wall_time else 0.0,
+        "peak_rss_mb": result["peak_rss_mb"],
+        "endpoints": summarize_requests(notion.records + hatena.records),
+    }
+
+
+def _target_env(targets: int, accounts: int) -> dict:
+    """
+    既定の投稿先に加えて bench2, bench3, ... の投稿先を設定する環境変数を返す。
+    投稿先は accounts 個のアカウント (bench, bench1, ...) に順に割り当てる。
+    """
+    if targets <= 1:
+        return {}
+    env = {}
+    names = ["default"]
+    for index in range(1, targets):
+        name = f"bench{index + 1}"
+        account = index % max(accounts, 1)
+        env[f"HATENA_TARGET_{name.upper()}_BLOG_ID"] = f"{name}.hatenablog.com"
+        env[f"HATENA_TARGET_{name.upper()}_USER_ID"] = f"bench{account}" if account else "bench"
+        names.append(name)
+    env["HATENA_TARGETS"] = ",".join(names)
+    return env
+
+
+def print_result(result: dict):
+    print(
+        f"[{result['scenario']}] status={result['status']} blocks={result['blocks']} images={result['images']} "
+        f"wall={result['wall_time']:.2f}s pages/min={result['pages_per_minute']:.1f} "
+        f"peak_rss={result['peak_rss_mb']:.1f}MB"
+    )
+    for endpoint, stats in result["endpoints"].items():
+        print(
+            f"    {endpoint:<30} requests={stats['requests']:<5} 429={stats['rate_limited']:<3} "
+            f"in={stats['bytes_in']:<10} out={stats['bytes_out']:<10} "
+            f"mean={stats['mean_latency'] * 1000:.0f}ms busy={stats['busy_time']:.2f}s "
+            f"window={stats['active_window']:.2f}s"
+        )
+
+
+def check_regressions(results: list, baseline_path: str, tolerance: float) -> list:
+    """
+    ベースラインと比較し、所要時間が許容範囲を超えて悪化したシナリオのメッセージを返す。
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {item["scenario"]: item for item in json.load(f)["results"]}
+
+    regressions = []
+    for result in results:
+        base = baseline.get(result["scenario"])
+        if base is None:
+            continue
+        limit = base["wall_time"] * (1 + tolerance)
+        if result["wall_time"] > limit:
+            regressions.append(
+                f"{result['scenario']}: {result['wall_time']:.2f}s > {base['wall_time']:.2f}s (+{tolerance:.0%})"
+            )
+    return regressions
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Notion -> はてなブログ投稿処理のベンチマーク")
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="実行するシナリオ（複数指定可）。省略時は flat-5000 以外（Pillow がない場合は screenshots も除く）",
+    )
+    parser.add_argument("--notion-latency", type=float, default=0.05, help="Notion API の応答遅延（秒）")
+    parser.add_argument("--hatena-latency", type=float, default=0.1, help="はてな API の応答遅延（秒）")
+    parser.add_argument(
+        "--photolife-latency-per-mb",
+        type=float,
+        default=0.05,
+        help="フォトライフへのアップロード 1MB あたりの遅延（秒）",
+    )
+    parser.add_argument("--notion-rate-limit", type=float, default=3.0, help="Notion API の秒間リクエスト数の上限")
+    parser.add_argument("--hatena-rate-limit", type=float, default=None, help="はてな API の秒間リクエスト数の上限")
+    parser.add_argument(
+        "--notion-url-ttl",
+        type=float,
+        default=None,
+        help="Notion にアップロードされた画像の URL の有効期間（秒）。省略時は期限なし",
+    )
+    parser.add_argument("--targets", type=int, default=1, help="1回の実行で投稿するブログの数")
+    parser.add_argument(
+        "--target-accounts", type=int, default=1, help="--targets のブログを割り当てるはてなのアカウントの数"
+    )
+    parser.add_argument("--sync", action="store_true", help="同期モードで投稿する")
+    parser.add_argument("--image-cache", action="store_true", help="画像キャッシュを有効にする")
+    parser.add_argument(
+        "--optimize-images",
+        action="store_true",
+        help="アップロード前の画像の最適化 (HATENA_OPTIMIZE_IMAGES) を有効にする",
+    )
+    parser.add_argument("--json", metavar="PATH", help="結果を JSON で出力するファイル")
+    parser.add_argument("--baseline", metavar="PATH", help="比較対象とする以前の JSON 出力")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="ベースラインに対して許容する悪化の割合")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    default_names = [name for name in SCENARIOS if name != "flat-5000"]
+    if importlib.util.find_spec("PIL") is None:
+        # screenshots シナリオは画像の生成に Pillow を使う
+        default_names.remove("screenshots")
+    names = args.scenario or default_names
+
+    results = []
+    for name in names:
+        result = run_scenario(name, args)
+        print_result(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        regressions = check_regressions(results, args.baseline, args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
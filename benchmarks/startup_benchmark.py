@@ -0,0 +1,205 @@
+"""
+CLI と GUI の起動時間（モジュールの読み込み時間）を計測するベンチマーク。
+
+ターゲットごとに新しい Python プロセスを繰り返し起動して所要時間の中央値を求め、
+`python -X importtime` の出力から読み込みに時間がかかったモジュールを表示する。
+
+使い方:
+    python -m benchmarks.startup_benchmark
+    python -m benchmarks.startup_benchmark --target cli-help --target cli-run --json startup.json
+    python -m benchmarks.startup_benchmark --baseline startup.json --tolerance 0.2
+    python -m benchmarks.startup_benchmark --executable dist/notion-to-hatena-cli.exe
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ターゲット名 -> (説明, 実行する Python コード)
+TARGETS = {
+    "cli-help": (
+        "CLI の引数解析まで (python main.py --help 相当)",
+        "import sys; sys.argv = ['main.py', '--help']\n"
+        "import main\n"
+        "try:\n    main.parse_args()\nexcept SystemExit:\n    pass",
+    ),
+    "cli-run": (
+        "CLI でページを投稿する処理の読み込みまで",
+        "import main\nfrom src.controllers.main_controller import process_notion_to_hatena",
+    ),
+    "gui": (
+        "GUI のウィンドウの作成まで",
+        "from PySide6.QtWidgets import QApplication\n"
+        "from src.views.gui_app import MainWindow\n"
+        "app = QApplication(['main.py'])\n"
+        "window = MainWindow()",
+    ),
+}
+
+
+def _python_env() -> dict:
+    env = dict(os.environ)
+    # GUI をディスプレイなしで作成できるようにする
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return env
+
+
+def _time_command(command: list, repeat: int) -> list:
+    """
+    コマンドを repeat 回実行し、それぞれの所要時間（秒）を返す。
+    """
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        subprocess.run(command, cwd=ROOT_DIR, env=_python_env(), check=True, capture_output=True)
+        timings.append(time.perf_counter() - started_at)
+    return timings
+
+
+def parse_importtime(stderr: str, limit: int) -> tuple:
+    """
+    `-X importtime` の出力を集計する。
+
+    Returns:
+        (読み込み時間の合計（秒）, モジュール数, 自身の処理時間が長い順に limit 個のモジュール) のタプル。
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules.append(
+            {"module": name.strip(), "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000}
+        )
+    total = sum(module["self_ms"] for module in modules) / 1000
+    slowest = sorted(modules, key=lambda module: module["self_ms"], reverse=True)[:limit]
+    return total, len(modules), slowest
+
+
+def run_target(name: str, args: argparse.Namespace) -> dict | None:
+    description, code = TARGETS[name]
+    if name == "gui" and importlib.util.find_spec("PySide6") is None:
+        print(f"[{name}] skipped: PySide6 is not installed")
+        return None
+
+    command = [sys.executable, "-c", code]
+    timings = _time_command(command, args.repeat)
+    profile = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT_DIR,
+        env=_python_env(),
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    import_time, module_count, slowest = parse_importtime(profile.stderr, args.top)
+    return {
+        "target": name,
+        "description": description,
+        "wall_time": statistics.median(timings),
+        "min_wall_time": min(timings),
+        "import_time": import_time,
+        "modules": module_count,
+        "slowest_modules": slowest,
+    }
+
+
+def run_executable(path: str, args: argparse.Namespace) -> dict:
+    """
+    ビルドした実行ファイルの `--help` の所要時間を計測する。
+    """
+    timings = _time_command([os.path.abspath(path), "--help"], args.repeat)
+    return {
+        "target": f"exe:{os.path.basename(path)}",
+        "description": f"{path} --help",
+        "wall_time": statistics.median(timings),
+        "min_wall_time": min(timings),
+        "import_time": None,
+        "modules": None,
+        "slowest_modules": [],
+    }
+
+
+def print_result(result: dict):
+    line = f"[{result['target']}] wall={result['wall_time'] * 1000:.0f}ms (min {result['min_wall_time'] * 1000:.0f}ms)"
+    if result["import_time"] is not None:
+        line += f" import={result['import_time'] * 1000:.0f}ms modules={result['modules']}"
+    print(line)
+    for module in result["slowest_modules"]:
+        print(f"    {module['module']:<50} self={module['self_ms']:7.1f}ms cumulative={module['cumulative_ms']:7.1f}ms")
+
+
+def check_regressions(results: list, baseline_path: str, tolerance: float) -> list:
+    """
+    ベースラインと比較し、起動時間が許容範囲を超えて悪化したターゲットのメッセージを返す。
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {item["target"]: item for item in json.load(f)["results"]}
+
+    regressions = []
+    for result in results:
+        base = baseline.get(result["target"])
+        if base is None:
+            continue
+        limit = base["wall_time"] * (1 + tolerance)
+        if result["wall_time"] > limit:
+            regressions.append(
+                f"{result['target']}: {result['wall_time'] * 1000:.0f}ms > {base['wall_time'] * 1000:.0f}ms "
+                f"(+{tolerance:.0%})"
+            )
+    return regressions
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="CLI と GUI の起動時間のベンチマーク")
+    parser.add_argument(
+        "--target",
+        action="append",
+        choices=sorted(TARGETS),
+        help="計測するターゲット（複数指定可）。省略時はすべて（PySide6 がない場合 gui は省略）",
+    )
+    parser.add_argument("--executable", metavar="PATH", help="--help の起動時間を計測する、ビルドした実行ファイル")
+    parser.add_argument("--repeat", type=int, default=5, help="ターゲットごとにプロセスを起動する回数")
+    parser.add_argument("--top", type=int, default=10, help="表示する、読み込みに時間がかかったモジュールの数")
+    parser.add_argument("--json", metavar="PATH", help="結果を JSON で出力するファイル")
+    parser.add_argument("--baseline", metavar="PATH", help="比較対象とする以前の JSON 出力")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="ベースラインに対して許容する悪化の割合")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    results = []
+    for name in args.target or list(TARGETS):
+        result = run_target(name, args)
+        if result is not None:
+            print_result(result)
+            results.append(result)
+    if args.executable:
+        result = run_executable(args.executable, args)
+        print_result(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        regressions = check_regressions(results, args.baseline, args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
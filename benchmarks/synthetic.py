@@ -0,0 +1,242 @@
+import functools
+import io
+import random
+import uuid
+from dataclasses import dataclass, field
+
+SYNTHETIC_LAST_EDITED_TIME = "2026-01-01T00:00:00.000Z"
+
+
+@dataclass
+class SyntheticPage:
+    """
+    ベンチマーク用に生成した Notion ページ。
+
+    Attributes:
+        page_id: ページ ID（ハイフンなしの 32 文字）。
+        title: ページのタイトル。
+        children: ブロック ID -> 子ブロックのリスト。ページ直下のブロックは page_id をキーに持つ。
+        images: 画像 ID -> 画像のバイト数。
+        last_edited_time: ページの last_edited_time。
+        screenshots: 画像 ID -> スクリーンショット風の PNG を生成するシード値。同じシード値の画像は同じ内容になる。
+    """
+
+    page_id: str
+    title: str
+    children: dict = field(default_factory=dict)
+    images: dict = field(default_factory=dict)
+    last_edited_time: str = SYNTHETIC_LAST_EDITED_TIME
+    screenshots: dict = field(default_factory=dict)
+
+    @property
+    def block_count(self) -> int:
+        return sum(len(blocks) for blocks in self.children.values())
+
+
+class _PageBuilder:
+    def __init__(self, title: str, seed: int):
+        self._random = random.Random(seed)
+        self._counter = 0
+        self.page = SyntheticPage(self._new_id(), title)
+
+    def _new_id(self) -> str:
+        self._counter += 1
+        return uuid.UUID(int=self._random.getrandbits(96) << 32 | self._counter).hex
+
+    def _block(self, block_type: str, payload: dict) -> dict:
+        return {
+            "object": "block",
+            "id": self._new_id(),
+            "type": block_type,
+            "created_time": SYNTHETIC_LAST_EDITED_TIME,
+            "last_edited_time": SYNTHETIC_LAST_EDITED_TIME,
+            "created_by": {"object": "user", "id": "00000000-0000-0000-0000-000000000000"},
+            "last_edited_by": {"object": "user", "id": "00000000-0000-0000-0000-000000000000"},
+            "has_children": False,
+            "archived": False,
+            "in_trash": False,
+            block_type: payload,
+        }
+
+    @staticmethod
+    def _rich_text(text: str) -> list:
+        return [
+            {
+                "type": "text",
+                "text": {"content": text, "link": None},
+                "annotations": {
+                    "bold": False,
+                    "italic": False,
+                    "strikethrough": False,
+                    "underline": False,
+                    "code": False,
+                    "color": "default",
+                },
+                "plain_text": text,
+                "href": None,
+            }
+        ]
+
+    def text_block(self, block_type: str, text: str) -> dict:
+        return self._block(block_type, {"rich_text": self._rich_text(text), "color": "default"})
+
+    def paragraph(self) -> dict:
+        words = " ".join(f"word{self._random.randrange(1000)}" for _ in range(self._random.randrange(10, 60)))
+        return self.text_block("paragraph", words)
+
+    def image(self, size: int, external: bool = False) -> dict:
+        if external:
+            block = self._block("image", {"caption": [], "type": "external", "external": {"url": ""}})
+        else:
+            block = self._block("image", {"caption": [], "type": "file", "file": {"url": "", "expiry_time": None}})
+        self.page.images[block["id"]] = size
+        return block
+
+    def screenshot(self, seed: int) -> dict:
+        block = self._block("image", {"caption": [], "type": "file", "file": {"url": "", "expiry_time": None}})
+        self.page.screenshots[block["id"]] = seed
+        return block
+
+    def table(self, rows: int, columns: int) -> dict:
+        block = self._block("table", {"table_width": columns, "has_column_header": True, "has_row_header": False})
+        cells = [
+            self._block("table_row", {"cells": [self._rich_text(f"r{r}c{c}") for c in range(columns)]})
+            for r in range(rows)
+        ]
+        self.add_children(block, cells)
+        return block
+
+    def add_children(self, parent: dict, children: list):
+        parent["has_children"] = bool(children)
+        self.page.children[parent["id"]] = children
+
+    def set_top_level(self, blocks: list):
+        self.page.children[self.page.page_id] = blocks
+
+
+def flat_page(block_count: int = 1000, seed: int = 1) -> SyntheticPage:
+    """
+    見出しと段落、リストを並べただけの、ページ直下のブロックが多いページ。
+    """
+    builder = _PageBuilder(f"Flat page ({block_count} blocks)", seed)
+    blocks = []
+    for i in range(block_count):
+        if i % 20 == 0:
+            blocks.append(builder.text_block("heading_2", f"Section {i // 20}"))
+        elif i % 5 == 0:
+            blocks.append(builder.text_block("bulleted_list_item", f"item {i}"))
+        else:
+            blocks.append(builder.paragraph())
+    builder.set_top_level(blocks)
+    return builder.page
+
+
+def deep_page(depth: int = 6, branching: int = 3, seed: int = 2) -> SyntheticPage:
+    """
+    リスト項目を depth 階層まで branching 個ずつ入れ子にした、深いページ。
+    """
+    builder = _PageBuilder(f"Deep page (depth {depth}, branching {branching})", seed)
+
+    def build(level: int) -> list:
+        blocks = []
+        for i in range(branching):
+            block = builder.text_block("bulleted_list_item", f"level {level} item {i}")
+            if level < depth:
+                builder.add_children(block, build(level + 1))
+            blocks.append(block)
+        return blocks
+
+    builder.set_top_level(build(1))
+    return builder.page
+
+
+def image_page(image_count: int = 40, image_size: int = 2 * 1024 * 1024, seed: int = 3) -> SyntheticPage:
+    """
+    大きな画像を多数含むページ。
+    """
+    builder = _PageBuilder(f"Image page ({image_count} images)", seed)
+    blocks = []
+    for i in range(image_count):
+        blocks.append(builder.text_block("heading_3", f"Screenshot {i}"))
+        blocks.append(builder.image(image_size))
+    builder.set_top_level(blocks)
+    return builder.page
+
+
+def screenshot_page(image_count: int = 24, distinct: int = 8, seed: int = 5) -> SyntheticPage:
+    """
+    実際に画像として開けるスクリーンショット風の PNG を含むページ。distinct 種類の画像を繰り返し貼り付ける。
+    """
+    builder = _PageBuilder(f"Screenshot page ({image_count} images, {distinct} distinct)", seed)
+    blocks = []
+    for i in range(image_count):
+        blocks.append(builder.text_block("heading_3", f"Screenshot {i}"))
+        blocks.append(builder.paragraph())
+        blocks.append(builder.screenshot(i % distinct))
+    builder.set_top_level(blocks)
+    return builder.page
+
+
+@functools.cache
+def render_screenshot(seed: int, width: int = 2560, height: int = 1600) -> bytes:
+    """
+    ウィンドウやテキスト、写真を含むスクリーンショット風の PNG を生成する。Pillow が必要。
+    """
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), (245, 245, 245))
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = rng.randrange(width - 400), rng.randrange(height - 300)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.rectangle((x, y, x + rng.randrange(200, 900), y + rng.randrange(100, 600)), fill=color, outline=(0, 0, 0))
+    for row in range(0, height, 24):
+        # テキストの行に見立てた短い線
+        x = 40
+        while x < width - 100 and rng.random() < 0.97:
+            length = rng.randrange(8, 60)
+            draw.line((x, row + 12, x + length, row + 12), fill=(40, 40, 40), width=2)
+            x += length + 10
+    photo = Image.frombytes("RGB", (640, 400), rng.randbytes(640 * 400 * 3))
+    image.paste(photo, (width - 700, height - 460))
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+def mixed_page(sections: int = 30, seed: int = 4) -> SyntheticPage:
+    """
+    見出し、段落、トグル、テーブル、コールアウト、画像（一部は外部の画像）を組み合わせた、実際の記事に近いページ。
+    """
+    builder = _PageBuilder(f"Mixed page ({sections} sections)", seed)
+    blocks = []
+    for i in range(sections):
+        blocks.append(builder.text_block("heading_2", f"Section {i}"))
+        blocks.extend(builder.paragraph() for _ in range(5))
+
+        toggle = builder.text_block("toggle", f"Details {i}")
+        builder.add_children(toggle, [builder.paragraph() for _ in range(3)])
+        blocks.append(toggle)
+
+        blocks.append(builder.table(rows=6, columns=4))
+
+        callout = builder._block(
+            "callout", {"rich_text": builder._rich_text(f"Note {i}"), "icon": {"type": "emoji", "emoji": "💡"}}
+        )
+        blocks.append(callout)
+
+        if i % 3 == 0:
+            blocks.append(builder.image(512 * 1024, external=i % 6 == 3))
+    builder.set_top_level(blocks)
+    return builder.page
+
+
+SCENARIOS = {
+    "flat-1000": lambda: flat_page(1000),
+    "flat-5000": lambda: flat_page(5000),
+    "deep-nesting": lambda: deep_page(6, 3),
+    "many-images": lambda: image_page(40, 2 * 1024 * 1024),
+    "mixed": lambda: mixed_page(30),
+    "screenshots": lambda: screenshot_page(24, 8),
+}
@@ -0,0 +1,12 @@
+"""
+Entry point of the CLI-only build (notion_to_hatena_cli.spec).
+Unlike main.py, it never launches the GUI, so PySide6 is not needed.
+"""
+
+import multiprocessing
+
+from main import main
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -1,7 +1,15 @@
+import argparse
 import logging
+import multiprocessing
+import signal
 import sys
+import threading
 
-from src.controllers.main_controller import process_notion_to_hatena
+from src.utils.env_loader import load_env
+from src.utils.metrics import get_metrics
+
+# The controllers and the GUI import notion_client, requests and PySide6, which make startup slow.
+# They are imported inside the functions that need them.
 
 # Configure logging
 logging.basicConfig(
@@ -12,19 +20,167 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def parse_args(argv=None):
+    """
+    Parses command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Post a Notion page to Hatena Blog.")
+    parser.add_argument("page", nargs="?", help="Notion page ID or URL")
+    parser.add_argument("--publish", action="store_true", help="publish the entry instead of posting a draft")
+    parser.add_argument(
+        "--sync", action="store_true", help="update the previously posted entry and skip unchanged pages"
+    )
+    parser.add_argument("--no-image-cache", action="store_true", help="upload every image without using the cache")
+    parser.add_argument("--purge-image-cache", action="store_true", help="delete all entries in the image cache")
+    parser.add_argument(
+        "--no-render-cache", action="store_true", help="convert every block without using the conversion cache"
+    )
+    parser.add_argument(
+        "--purge-render-cache", action="store_true", help="delete all entries in the block conversion cache"
+    )
+    parser.add_argument(
+        "--no-journal",
+        action="store_true",
+        help="start over instead of resuming pages that failed partway through the previous run",
+    )
+    parser.add_argument(
+        "--no-entry-index",
+        action="store_true",
+        help="keep links to Notion pages instead of replacing them with links to the posted entries",
+    )
+    parser.add_argument(
+        "--rebuild-entry-index",
+        action="store_true",
+        help="read every Hatena Blog entry and rebuild the index of posted pages",
+    )
+    parser.add_argument(
+        "--targets",
+        metavar="NAMES",
+        help="comma-separated names of the blogs to post to (default: HATENA_TARGETS, or the blog in HATENA_BLOG_ID)",
+    )
+    batch_group = parser.add_mutually_exclusive_group()
+    batch_group.add_argument("--database", metavar="ID_OR_URL", help="post every page in a Notion database")
+    batch_group.add_argument("--pages-file", metavar="PATH", help="post every page listed in a file (one per line)")
+    batch_group.add_argument(
+        "--from-snapshot", metavar="PATH", help="read the page from a snapshot file instead of the Notion API"
+    )
+    parser.add_argument("--workers", type=int, help="number of pages processed concurrently in batch mode")
+    parser.add_argument(
+        "--no-compact-blocks",
+        action="store_true",
+        help="keep the full Notion blocks in batch mode (for custom renderers that read colors or captions)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and post pages edited in Notion (all pages, or the pages in --database)",
+    )
+    parser.add_argument("--interval", type=float, metavar="SECONDS", help="polling interval in watch mode")
+    parser.add_argument(
+        "--debounce", type=float, metavar="SECONDS", help="seconds without new edits before posting in watch mode"
+    )
+    parser.add_argument("--save-snapshot", metavar="PATH", help="save the page to a snapshot file without posting it")
+    parser.add_argument("--snapshot-images", action="store_true", help="include image data in the saved snapshot")
+    parser.add_argument("--convert-only", action="store_true", help="convert the page to Markdown without posting it")
+    parser.add_argument(
+        "--output", metavar="PATH", help="file to write the Markdown to with --convert-only or --dry-run"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="convert the page without uploading images or posting, and show the diff against the posted entry",
+    )
+    parser.add_argument(
+        "--output-dir", metavar="PATH", help="directory to write each page's Markdown to with --dry-run in batch mode"
+    )
+    parser.add_argument(
+        "--metrics-report",
+        metavar="PATH",
+        help="write per-stage timings and HTTP request counts to PATH (Prometheus text format if it ends with .prom)",
+    )
+    return parser.parse_args(argv)
+
+
 def main():
     """
     Main function to run the script.
     """
-    if len(sys.argv) < 2:
+    args = parse_args()
+    load_env()
+
+    if args.purge_image_cache or args.purge_render_cache or args.rebuild_entry_index:
+        from src.controllers.main_controller import purge_image_cache, purge_render_cache, rebuild_entry_index
+
+        if args.purge_image_cache:
+            purge_image_cache()
+        if args.purge_render_cache:
+            purge_render_cache()
+        if args.rebuild_entry_index:
+            rebuild_entry_index(get_targets(args))
+        if not args.page and not args.database and not args.pages_file and not args.from_snapshot and not args.watch:
+            return
+
+    get_metrics().reset()
+    try:
+        run(args)
+    finally:
+        if args.metrics_report:
+            write_metrics_report(args.metrics_report)
+
+
+def get_targets(args):
+    """
+    Returns the Hatena Blog targets selected by --targets or HATENA_TARGETS. Exits if a target is not configured.
+    """
+    from src.models.hatena_target import get_hatena_targets
+
+    try:
+        return get_hatena_targets(args.targets)
+    except ValueError as e:
+        logger.error(e)
+        sys.exit(1)
+
+
+def run(args):
+    """
+    Posts a single page, or runs the batch mode or the watch mode.
+    """
+    if args.watch:
+        run_watch(args)
+        return
+
+    if args.database or args.pages_file:
+        run_batch(args)
+        return
+
+    if args.from_snapshot:
+        run_snapshot(args)
+        return
+
+    if not args.page:
         logger.error("Usage: python main.py <NOTION_PAGE_ID_OR_URL> [--publish]")
         sys.exit(1)
 
-    input_arg = sys.argv[1]
-    publish = "--publish" in sys.argv
+    from src.controllers.main_controller import process_notion_to_hatena, save_snapshot
 
+    targets = get_targets(args)
     try:
-        process_notion_to_hatena(input_arg, publish)
+        if args.save_snapshot:
+            save_snapshot(args.page, args.save_snapshot, include_images=args.snapshot_images)
+            return
+        process_notion_to_hatena(
+            args.page,
+            args.publish,
+            use_image_cache=not args.no_image_cache,
+            sync=args.sync,
+            convert_only=args.convert_only,
+            output_path=args.output,
+            use_render_cache=not args.no_render_cache,
+            dry_run=args.dry_run,
+            use_journal=not args.no_journal,
+            use_entry_index=not args.no_entry_index,
+            targets=targets,
+        )
     except ValueError as e:
         logger.error(e)
         sys.exit(1)
@@ -33,10 +189,128 @@ def main():
         sys.exit(1)
 
 
+def run_snapshot(args):
+    """
+    Converts (and posts) a page saved in a snapshot file.
+    """
+    from src.controllers.main_controller import STATUS_FAILED, process_snapshot
+    from src.utils.errors import SnapshotFormatError
+
+    targets = get_targets(args)
+    try:
+        status = process_snapshot(
+            args.from_snapshot,
+            args.publish,
+            use_image_cache=not args.no_image_cache,
+            sync=args.sync,
+            convert_only=args.convert_only,
+            output_path=args.output,
+            use_render_cache=not args.no_render_cache,
+            dry_run=args.dry_run,
+            use_journal=not args.no_journal,
+            use_entry_index=not args.no_entry_index,
+            targets=targets,
+        )
+    except (OSError, SnapshotFormatError) as e:
+        logger.error(f"Failed to read the snapshot: {e}")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}", exc_info=True)
+        sys.exit(1)
+    if status == STATUS_FAILED:
+        sys.exit(1)
+
+
+def run_batch(args):
+    """
+    Posts every page in a Notion database or a page list file.
+    """
+    from src.controllers.batch_controller import collect_database_pages, process_batch, read_page_list
+    from src.controllers.main_controller import STATUS_FAILED
+
+    try:
+        if args.database:
+            input_args = collect_database_pages(args.database)
+        else:
+            input_args = read_page_list(args.pages_file)
+    except Exception as e:
+        logger.error(f"Failed to collect pages: {e}", exc_info=True)
+        sys.exit(1)
+
+    results = process_batch(
+        input_args,
+        args.publish,
+        use_image_cache=not args.no_image_cache,
+        sync=args.sync,
+        max_workers=args.workers,
+        use_render_cache=not args.no_render_cache,
+        dry_run=args.dry_run,
+        output_dir=args.output_dir,
+        use_journal=not args.no_journal,
+        use_entry_index=not args.no_entry_index,
+        targets=get_targets(args),
+        compact_blocks=not args.no_compact_blocks,
+    )
+    if any(result.status == STATUS_FAILED for result in results):
+        sys.exit(1)
+
+
+def run_watch(args):
+    """
+    Watches Notion for edited pages and posts them until SIGINT or SIGTERM is received.
+    """
+    from src.controllers.watch_controller import PageWatcher
+
+    stop_event = threading.Event()
+
+    def stop(signum, frame):
+        if stop_event.is_set():
+            return
+        logger.info("Received a stop signal. Finishing the pages being posted...")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        watcher = PageWatcher(
+            args.database,
+            args.publish,
+            interval=args.interval,
+            debounce=args.debounce,
+            max_workers=args.workers,
+            use_image_cache=not args.no_image_cache,
+            use_render_cache=not args.no_render_cache,
+            use_entry_index=not args.no_entry_index,
+            targets=get_targets(args),
+        )
+        watcher.run(stop_event)
+    except ValueError as e:
+        logger.error(e)
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"An unexpected error occurred: {e}", exc_info=True)
+        sys.exit(1)
+
+
+def write_metrics_report(path):
+    """
+    Writes the metrics of this run to a file and logs the summary.
+    """
+    metrics = get_metrics()
+    logger.info(f"Metrics summary:\n{metrics.format_summary()}")
+    try:
+        metrics.write_report(path)
+        logger.info(f"Metrics report written to {path}")
+    except OSError as e:
+        logger.error(f"Failed to write the metrics report to {path}: {e}")
+
+
 def run_gui():
     """
     Launches the GUI application.
     """
+    load_env()
     try:
         from src.views.gui_app import launch_gui
 
@@ -47,6 +321,8 @@ def run_gui():
 
 
 if __name__ == "__main__":
+    # The image optimization runs in a process pool, which needs this in the frozen executable.
+    multiprocessing.freeze_support()
     if len(sys.argv) < 2:
         run_gui()
     else:
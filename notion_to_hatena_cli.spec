@@ -0,0 +1,43 @@
+# -*- mode: python ; coding: utf-8 -*-
+# CLI-only build without Qt: pyinstaller notion_to_hatena_cli.spec
+
+block_cipher = None
+
+a = Analysis(
+    ['cli.py'],
+    pathex=['.'],
+    binaries=[],
+    datas=[],
+    hiddenimports=['requests'],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=['PySide6', 'shiboken6', 'src.views'],
+    win_no_prefer_redirects=False,
+    win_private_assemblies=False,
+    cipher=block_cipher,
+    noarchive=False,
+)
+pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    a.binaries,
+    a.zipfiles,
+    a.datas,
+    [],
+    name='notion-to-hatena-cli',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=True,
+    upx_exclude=[],
+    runtime_tmpdir=None,
+    console=True,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
@@ -0,0 +1,230 @@
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from src.controllers.main_controller import (
+    STATUS_FAILED,
+    extract_page_id,
+    process_notion_to_hatena,
+    refresh_entry_index,
+)
+from src.models.entry_index import EntryIndex
+from src.models.hatena_target import get_hatena_targets
+from src.models.image_cache import ImageCache
+from src.models.journal import Journal
+from src.models.notion_fetcher import query_database_page_ids
+from src.models.render_cache import RenderCache
+from src.models.sync_state import SyncState
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_CONCURRENCY = 2  # 同時に処理するページ数の既定値
+
+
+@dataclass
+class PageResult:
+    """
+    バッチ処理における1ページ分の処理結果。
+    target_statuses は投稿先の名前 -> 処理結果の辞書（status は投稿先ごとの処理結果をまとめたもの）。
+    """
+
+    input_arg: str
+    status: str
+    elapsed: float
+    error: str | None = None
+    target_statuses: dict | None = None
+
+
+def read_page_list(path: str) -> list:
+    """
+    ページ ID または URL を1行に1つ記述したファイルを読み込む。
+    空行と `#` で始まる行は無視する。
+    """
+    with open(path, encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def collect_database_pages(database_url_or_id: str) -> list:
+    """
+    Notion データベースに含まれるすべてのページの ID を取得する。
+    """
+    database_id = extract_page_id(database_url_or_id)
+    logger.info(f"Querying Notion database: {database_id}")
+    page_ids = query_database_page_ids(database_id)
+    logger.info(f"Found {len(page_ids)} pages in the database.")
+    return page_ids
+
+
+def _process_one(
+    input_arg: str,
+    publish: bool,
+    image_cache,
+    sync_state,
+    sync: bool,
+    render_cache,
+    dry_run: bool = False,
+    output_dir: str | None = None,
+    journal=None,
+    entry_index=None,
+    targets: list | None = None,
+    compact_blocks: bool | None = None,
+) -> PageResult:
+    start = time.perf_counter()
+    target_statuses = {}
+    try:
+        output_path = None
+        if dry_run and output_dir:
+            output_path = os.path.join(output_dir, f"{extract_page_id(input_arg)}.md")
+        status = process_notion_to_hatena(
+            input_arg,
+            publish,
+            use_image_cache=image_cache is not None,
+            sync=sync,
+            image_cache=image_cache,
+            sync_state=sync_state,
+            use_render_cache=render_cache is not None,
+            render_cache=render_cache,
+            output_path=output_path,
+            dry_run=dry_run,
+            use_journal=journal is not None,
+            journal=journal,
+            use_entry_index=entry_index is not None,
+            entry_index=entry_index,
+            targets=targets,
+            target_results=target_statuses,
+            compact_blocks=compact_blocks,
+        )
+        return PageResult(input_arg, status, time.perf_counter() - start, target_statuses=target_statuses)
+    except Exception as e:
+        logger.error(f"Failed to process {input_arg}: {e}", exc_info=True)
+        return PageResult(input_arg, STATUS_FAILED, time.perf_counter() - start, str(e))
+
+
+def process_batch(
+    input_args: list,
+    publish: bool = False,
+    use_image_cache: bool = True,
+    sync: bool = False,
+    max_workers: int | None = None,
+    use_render_cache: bool = True,
+    dry_run: bool = False,
+    output_dir: str | None = None,
+    use_journal: bool = True,
+    use_entry_index: bool = True,
+    targets: list | None = None,
+    compact_blocks: bool = True,
+) -> list:
+    """
+    複数のページをワーカープールで並行してはてなブログに投稿する。
+    画像キャッシュと同期状態のストア、エントリの索引はすべてのページで共有する
+    （索引は最初に1回だけ更新する。ドライランでは更新しない）。
+
+    Args:
+        input_args: ページ ID または URL のリスト。
+        publish: True の場合は公開状態で投稿する。
+        use_image_cache: True の場合は画像アップロードのキャッシュを使用する。
+        sync: True の場合は前回投稿したエントリを更新する。
+        max_workers: 同時に処理するページ数。省略時は環境変数 BATCH_CONCURRENCY（既定値 2）を使用する。
+        use_render_cache: True の場合はブロックの変換結果のキャッシュを使用する。
+        dry_run: True の場合は投稿せず、ページごとに前回投稿したエントリとの差分を表示する。
+        output_dir: dry_run の場合に、変換した Markdown を <ページ ID>.md として書き出すディレクトリ。
+            省略時はカレントディレクトリに書き出す。
+        use_journal: True の場合はページごとの途中経過をジャーナルに記録し、前回失敗したページはその続きから再開する。
+        use_entry_index: True の場合は Notion のページへのリンクを、投稿済みのエントリへのリンクに置き換える。
+        targets: 投稿先 (HatenaTarget) のリスト。ページごとに取得と変換を1回だけ行い、すべての投稿先に投稿する。
+            省略時は環境変数 HATENA_TARGETS（なければ HATENA_USER_ID, HATENA_BLOG_ID）の投稿先。
+        compact_blocks: True の場合は、取得したブロックを CompactBlock で保持してメモリ使用量を減らす。
+            register_block_renderer で登録したレンダラーが色やキャプションを使う場合は False にする。
+
+    Returns:
+        input_args と同じ順序の PageResult のリスト。
+    """
+    if not input_args:
+        return []
+
+    if max_workers is None:
+        max_workers = int(os.environ.get("BATCH_CONCURRENCY", DEFAULT_BATCH_CONCURRENCY))
+    max_workers = max(1, min(max_workers, len(input_args)))
+
+    start = time.perf_counter()
+    targets = targets or get_hatena_targets()
+    if dry_run and output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    image_cache = ImageCache() if use_image_cache else None
+    # ドライランでも、前回投稿したエントリを探すために同期状態を使用する
+    sync_state = SyncState() if sync or dry_run else None
+    render_cache = RenderCache() if use_render_cache else None
+    journal = Journal() if use_journal and not dry_run else None
+    entry_index = EntryIndex() if use_entry_index else None
+    try:
+        # ドライランでは投稿しないため、エントリの一覧を読み込まずに登録済みの索引で差分を表示する
+        if entry_index is not None and not dry_run:
+            for target in targets:
+                refresh_entry_index(entry_index, target=target)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch") as executor:
+            results = list(
+                executor.map(
+                    lambda arg: _process_one(
+                        arg,
+                        publish,
+                        image_cache,
+                        sync_state,
+                        sync,
+                        render_cache,
+                        dry_run,
+                        output_dir,
+                        journal,
+                        entry_index,
+                        targets,
+                        compact_blocks,
+                    ),
+                    input_args,
+                )
+            )
+    finally:
+        if image_cache is not None:
+            image_cache.evict()
+            image_cache.close()
+        if sync_state is not None:
+            sync_state.close()
+        if render_cache is not None:
+            render_cache.evict()
+            render_cache.close()
+        if journal is not None:
+            journal.evict()
+            journal.close()
+        if entry_index is not None:
+            entry_index.close()
+
+    log_batch_summary(results, time.perf_counter() - start, targets)
+    return results
+
+
+def log_batch_summary(results: list, wall_time: float, targets: list | None = None):
+    """
+    バッチ処理の結果をページごとに出力する。複数の投稿先では、投稿先ごとの処理結果と集計も出力する。
+    """
+    fan_out = targets is not None and len(targets) > 1
+    counts = {}
+    target_counts = {target.name: {} for target in targets or []}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+        message = f"[{result.status:>9}] {result.elapsed:7.2f}s  {result.input_arg}"
+        if fan_out and result.target_statuses:
+            message += "  " + ", ".join(f"{name}: {status}" for name, status in result.target_statuses.items())
+        if result.error:
+            message += f"  ({result.error})"
+        logger.info(message)
+        for name, status in (result.target_statuses or {}).items():
+            if name in target_counts:
+                target_counts[name][status] = target_counts[name].get(status, 0) + 1
+
+    summary = ", ".join(f"{status}: {count}" for status, count in sorted(counts.items()))
+    logger.info(f"Processed {len(results)} pages ({summary}) in {wall_time:.2f}s.")
+    if fan_out:
+        for target in targets:
+            summary = ", ".join(f"{status}: {count}" for status, count in sorted(target_counts[target.name].items()))
+            logger.info(f"  {target.name} ({target.user_id}/{target.blog_id}): {summary or 'no pages'}")
@@ -1,14 +1,95 @@
+import asyncio
+import difflib
+import hashlib
 import logging
+import os
 import re
+import sys
+import time
+from collections.abc import AsyncIterable, Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
 from urllib.parse import urlparse
 
-from src.models.converter import convert_to_markdown
-from src.models.hatena_poster import post_to_hatena
-from src.models.notion_fetcher import fetch_blocks_recursively, fetch_page_title
-from src.utils.errors import NotionPageIDError
+from src.models.converter import (
+    BLOCK_SEPARATOR,
+    RenderContext,
+    iter_markdown,
+    make_image_job,
+    substitute_image_placeholders,
+    substitute_page_link_placeholders,
+)
+from src.models.entry_index import EntryIndex, get_default_entry_index_path
+from src.models.hatena_poster import (
+    AsyncImageUploadPool,
+    DownloadedImage,
+    ImageUploadPool,
+    download_image,
+    download_image_async,
+    find_hatena_entry,
+    get_hatena_entry,
+    list_hatena_entries,
+    post_to_hatena,
+    post_to_hatena_async,
+    update_hatena_entry,
+    update_hatena_entry_async,
+)
+from src.models.hatena_target import HatenaTarget, get_hatena_targets
+from src.models.image_cache import ImageCache
+from src.models.image_job import ImageJob
+from src.models.journal import STEP_CONVERTED, STEP_FETCHED, STEP_POSTING, Journal
+from src.models.notion_fetcher import (
+    create_async_notion_client,
+    fetch_block,
+    fetch_block_async,
+    fetch_page,
+    fetch_page_async,
+    get_page_title,
+    iter_blocks_recursively,
+    iter_blocks_recursively_async,
+)
+from src.models.render_cache import RenderCache
+from src.models.snapshot import SnapshotReader, write_snapshot
+from src.models.sync_state import SyncState, get_default_sync_state_path
+from src.utils.errors import HatenaEntryLookupError, HatenaEntryNotFoundError, NotionPageIDError
+from src.utils.http_client import create_async_client
+from src.utils.metrics import get_metrics
+from src.utils.progress import (
+    STAGE_CONVERTING,
+    STAGE_DONE,
+    STAGE_FETCHING_PAGE,
+    STAGE_POSTING,
+    STAGE_UPLOADING_IMAGES,
+    JobProgress,
+)
 
 logger = logging.getLogger(__name__)
 
+# process_notion_to_hatena の処理結果
+STATUS_POSTED = "posted"  # 新しいエントリとして投稿した
+STATUS_UPDATED = "updated"  # 既存のエントリを更新した
+STATUS_UNCHANGED = "unchanged"  # 前回の同期から変更がないため投稿を省略した
+STATUS_SKIPPED = "skipped"  # タイトルまたは本文がないため投稿しなかった
+STATUS_FAILED = "failed"  # はてなブログへの投稿に失敗した
+STATUS_CONVERTED = "converted"  # 変換のみ行い、投稿しなかった
+STATUS_CHANGED = "changed"  # ドライランで、投稿するとエントリの内容が変わることを確認した（投稿はしない）
+# 複数の投稿先の処理結果を1つにまとめる場合の優先順位（前にあるものほど優先する）
+_STATUS_PRIORITY = (
+    STATUS_FAILED,
+    STATUS_POSTED,
+    STATUS_UPDATED,
+    STATUS_CHANGED,
+    STATUS_CONVERTED,
+    STATUS_UNCHANGED,
+    STATUS_SKIPPED,
+)
+
+# 有効期限までの残りがこの秒数より短い画像の URL は、ダウンロードの前に取得し直す
+IMAGE_URL_EXPIRY_MARGIN_SECONDS = 60
+# エントリの索引の更新で読み込む、エントリの一覧のページ数の上限（作成済みの索引を更新する場合）
+ENTRY_INDEX_REFRESH_PAGES = 3
+
 
 def extract_page_id(url_or_id: str) -> str | None:
     """
@@ -34,27 +115,1553 @@ def extract_page_id(url_or_id: str) -> str | None:
         )
 
 
-def process_notion_to_hatena(input_arg: str, publish: bool = False):
+def purge_image_cache():
+    """
+    画像アップロードのキャッシュをすべて削除する。
+    """
+    with ImageCache() as cache:
+        cache.purge()
+
+
+def purge_render_cache():
+    """
+    ブロックの変換結果のキャッシュをすべて削除する。
+    """
+    with RenderCache() as cache:
+        cache.purge()
+
+
+def rebuild_entry_index(targets: list | None = None):
+    """
+    はてなブログのエントリの一覧をすべて読み込み、エントリの索引を作成し直す。
+    targets を省略した場合は、環境変数 HATENA_TARGETS の投稿先（なければ既定の投稿先）の索引を作成し直す。
+    """
+    with EntryIndex() as entry_index:
+        for target in targets or get_hatena_targets():
+            refresh_entry_index(entry_index, rebuild=True, target=target)
+
+
+def refresh_entry_index(entry_index: EntryIndex, rebuild: bool = False, target: HatenaTarget | None = None) -> bool:
+    """
+    はてなブログのエントリの一覧を読み込み、エントリの索引の URL と下書きかどうかを更新する。
+
+    索引を作成していない場合（または rebuild が True の場合）は一覧をすべて読み込み、一覧になかったエントリを削除して、
+    同期状態に記録されている編集用 URI からページ ID を設定する。
+    作成済みの場合は新しい順に読み込み、URL を登録済みのエントリが現れたページ
+    （最大 ENTRY_INDEX_REFRESH_PAGES ページ）で読み込みを終える。
+    target を省略した場合は、環境変数で指定したブログの索引を更新する。
+
+    Returns:
+        一覧を読み込めた場合は True。
+    """
+    target = target or HatenaTarget.from_env()
+    hatena_user_id = target.user_id
+    hatena_blog_id = target.blog_id
+    rebuild = rebuild or not entry_index.is_built(hatena_user_id, hatena_blog_id)
+    if rebuild:
+        logger.info(f"Building the index of Hatena Blog entries of {hatena_blog_id}...")
+
+    url = None
+    edit_uris = set()
+    pages = 0
+    with get_metrics().span("hatena.refresh_entry_index"):
+        while True:
+            result = list_hatena_entries(url, target)
+            if result is None:
+                logger.warning("Could not refresh the index of Hatena Blog entries. Using the indexed entries.")
+                return False
+            entries, url = result
+            known = entry_index.put_entries(hatena_user_id, hatena_blog_id, entries)
+            edit_uris.update(entry["edit_uri"] for entry in entries)
+            pages += 1
+            if url is None or (not rebuild and (known or pages >= ENTRY_INDEX_REFRESH_PAGES)):
+                break
+
+    if rebuild:
+        deleted = entry_index.finish_build(hatena_user_id, hatena_blog_id, edit_uris)
+        if os.path.exists(get_default_sync_state_path()):
+            with SyncState() as sync_state:
+                page_ids = sync_state.get_page_ids(hatena_user_id, hatena_blog_id)
+            entry_index.link_pages(hatena_user_id, hatena_blog_id, page_ids)
+        logger.info(f"Indexed {len(edit_uris)} Hatena Blog entries (removed {deleted} deleted entries).")
+    return True
+
+
+def save_snapshot(input_arg: str, snapshot_path: str, include_images: bool = False) -> int:
+    """
+    Notion ページを取得し、スナップショットファイルに保存する。
+    Raises ValueError if input_arg is invalid.
+
+    Returns:
+        保存したページ直下のブロックの数。
+    """
+    page_id = extract_page_id(input_arg)
+    logger.info(f"Saving Notion page {page_id} to the snapshot {snapshot_path}")
+    return write_snapshot(page_id, snapshot_path, include_images)
+
+
+def _count_blocks(block: dict) -> int:
+    return 1 + sum(_count_blocks(child) for child in block.get("children", []))
+
+
+def _track_blocks(blocks: Iterable[dict], progress: JobProgress) -> Iterator[dict]:
+    """
+    ページ直下のブロックを変換に渡す前に、取り消しを確認し、取得したブロックの数を進捗に加える。
+    """
+    for block in blocks:
+        progress.check_cancelled()
+        progress.add_blocks(_count_blocks(block))
+        yield block
+
+
+class _PageCheckpoint:
+    """
+    1ページ分のジャーナル (Journal) の読み書きを行う。
+
+    ページの last_edited_time とタイトルが記録時と同じ場合に限り、記録した変換結果を再利用する。
+    画像は画像ブロックの ID と last_edited_time をキーにするため、ページが編集されていても再利用する。
+    応答を受け取れなかった新規作成で作成されていたエントリは、投稿を終えるまでページが編集されても記録し続ける。
+    記録は投稿先ごと、アップロードした画像は投稿先のアカウント（ユーザー ID）ごとに分ける。
+    """
+
+    def __init__(
+        self,
+        journal: Journal,
+        page_id: str,
+        last_edited_time: str | None,
+        title: str,
+        target: HatenaTarget | None = None,
+    ):
+        self.journal = journal
+        self.page_id = page_id
+        self.last_edited_time = last_edited_time
+        self.title = title
+        self.target = target or HatenaTarget.from_env()
+        self.hatena_user_id = self.target.user_id
+        self.hatena_blog_id = self.target.blog_id
+        self.record = journal.get(page_id, self.hatena_user_id, self.hatena_blog_id)
+        self.images = journal.get_images(page_id, self.hatena_user_id)
+
+    def interrupted_post(self) -> dict | None:
+        """
+        新規作成 (POST) の応答を受け取れずに終わった投稿があれば、その記録を返す。
+        """
+        if self.record and self.record["step"] == STEP_POSTING:
+            return self.record
+        return None
+
+    def interrupted_post_resolved(self, edit_uri: str | None, content_hash: str | None):
+        """
+        応答を受け取れなかった新規作成について、作成されていたエントリ（なければ None）を記録する。
+        """
+        self._put(STEP_FETCHED, edit_uri=edit_uri, content_hash=content_hash)
+
+    def get_posted_entry(self) -> dict | None:
+        """
+        以前の実行で作成されていたエントリがあれば、edit_uri と content_hash を持つ辞書を返す。
+        """
+        if self.record and self.record["edit_uri"]:
+            return {"edit_uri": self.record["edit_uri"], "content_hash": self.record["content_hash"]}
+        return None
+
+    def fetched(self):
+        """
+        ページを取得したことを記録する。以前と異なる版のページの記録は破棄する（途中の投稿の記録は残す）。
+        """
+        if self.interrupted_post() is None and not self._is_current():
+            self._put(STEP_FETCHED)
+
+    def get_converted_markdown(self) -> str | None:
+        """
+        同じ版のページを変換した結果が記録されていれば返す。
+        送信した内容には画像のアップロードに失敗したものも含まれるため、投稿の途中の記録は再利用しない。
+        """
+        if self._is_current() and self.record["step"] == STEP_CONVERTED:
+            return self.record["markdown"]
+        return None
+
+    def get_image_syntax(self, image_job: ImageJob) -> str | None:
+        return self.images.get((image_job.block_id, image_job.last_edited_time))
+
+    def image_uploaded(self, image_job: ImageJob, image_syntax: str):
+        if image_job.block_id is not None and image_job.last_edited_time is not None:
+            self.journal.put_image(
+                self.page_id, self.hatena_user_id, image_job.block_id, image_job.last_edited_time, image_syntax
+            )
+
+    def converted(self, markdown_content: str):
+        self._put(STEP_CONVERTED, markdown_content)
+
+    def posting(self, markdown_content: str):
+        """
+        エントリの新規作成を送信する前に、送信する内容を記録する。
+        """
+        self._put(STEP_POSTING, markdown_content)
+
+    def finish(self):
+        self.journal.finish(self.page_id, self.hatena_user_id, self.hatena_blog_id)
+
+    def _is_current(self) -> bool:
+        return (
+            self.record is not None
+            and self.last_edited_time is not None
+            and self.record["last_edited_time"] == self.last_edited_time
+            and self.record["title"] == self.title
+        )
+
+    def _put(
+        self,
+        step: str,
+        markdown_content: str | None = None,
+        edit_uri: str | None = None,
+        content_hash: str | None = None,
+    ):
+        # 作成されていたエントリの記録は、新しく新規作成を送信するまで引き継ぐ
+        if self.record and step != STEP_POSTING and edit_uri is None:
+            edit_uri = self.record["edit_uri"]
+            content_hash = self.record["content_hash"]
+        self.journal.put(
+            self.page_id,
+            self.hatena_user_id,
+            self.hatena_blog_id,
+            self.last_edited_time,
+            step,
+            self.title,
+            markdown_content,
+            edit_uri,
+            content_hash,
+        )
+        self.record = self.journal.get(self.page_id, self.hatena_user_id, self.hatena_blog_id)
+
+
+@dataclass
+class _TargetJob:
+    """
+    1ページを1つの投稿先に投稿する処理の状態。
+
+    Attributes:
+        target: 投稿先。
+        record: 前回投稿したエントリの同期状態（edit_uri と content_hash を持つ辞書）。未投稿の場合は None。
+        checkpoint: 投稿先のジャーナルの記録。ジャーナルを使用しない場合は None。
+        posted_entry: 以前の実行で作成されていたエントリ（_PageCheckpoint.get_posted_entry）。
+        page_urls: 投稿先のブログの、Notion のページ ID -> エントリの URL の辞書。索引を使用しない場合は None。
+        markdown_content: 投稿先向けに変換した Markdown。
+        images_uploaded: markdown_content の画像をすべてアップロードできたか。
+        status: 処理結果 (STATUS_*)。処理中は None。
+    """
+
+    target: HatenaTarget
+    record: dict | None = None
+    checkpoint: _PageCheckpoint | None = None
+    posted_entry: dict | None = None
+    page_urls: dict | None = None
+    markdown_content: str | None = None
+    images_uploaded: bool = True
+    status: str | None = None
+
+
+def _create_jobs(targets: list, convert_only: bool) -> list:
+    """
+    投稿先ごとの処理の状態 (_TargetJob) を作る。
+    変換のみの場合は投稿先によらず同じ Markdown になるため、最初の投稿先の分だけ作る。
+    """
+    return [_TargetJob(target) for target in (targets[:1] if convert_only else targets)]
+
+
+def _apply_sync_records(
+    jobs: list,
+    sync_state: SyncState | None,
+    page_id: str,
+    last_edited_time: str | None,
+    draft: bool,
+    skip_unedited: bool = True,
+):
+    """
+    同期状態から、投稿先ごとに前回投稿したエントリの記録を読み込む。
+    skip_unedited が True の場合、前回の同期から編集されていない投稿先は STATUS_UNCHANGED にして処理を省略する。
+    """
+    if sync_state is None:
+        return
+    for job in jobs:
+        job.record = sync_state.get(page_id, job.target.user_id, job.target.blog_id)
+        if skip_unedited and _is_unedited(job.record, last_edited_time, draft):
+            logger.info(f"The Notion page has not been edited since the last sync to {job.target.blog_id}. Skipping.")
+            job.status = STATUS_UNCHANGED
+
+
+def _start_checkpoints(
+    jobs: list, journal: Journal | None, page_id: str, last_edited_time: str | None, title: str, draft: bool
+):
+    """
+    処理を省略しない投稿先のジャーナルの記録を用意し、前回の実行の途中経過から再開する。
+
+    以前の実行で作成されていたエントリは更新の対象にし、変換済みの Markdown があれば変換を省略する。
+    応答を受け取れなかった新規作成は、エントリが作成されていたかをはてなブログに問い合わせて確かめる
+    （確かめられない投稿先は STATUS_FAILED にする）。
+    """
+    if journal is None:
+        return
+    for job in jobs:
+        if job.status is not None:
+            continue
+        job.checkpoint = _PageCheckpoint(journal, page_id, last_edited_time, title, job.target)
+        try:
+            _resolve_interrupted_post(job.checkpoint, draft)
+        except HatenaEntryLookupError as e:
+            logger.error(e)
+            job.status = STATUS_FAILED
+            continue
+        job.checkpoint.fetched()
+        job.posted_entry = job.checkpoint.get_posted_entry()
+        if job.posted_entry:
+            job.record = job.posted_entry
+        job.markdown_content = job.checkpoint.get_converted_markdown()
+        if job.markdown_content:
+            logger.info(f"Resuming from the Markdown converted in the previous run for {job.target.blog_id}.")
+
+
+def _pending_jobs(jobs: list, entry_index: EntryIndex | None) -> list:
+    """
+    変換が必要な投稿先を返す。エントリの索引があれば、投稿先のブログのエントリの URL を page_urls に読み込む。
+    """
+    pending_jobs = [job for job in jobs if job.status is None and not job.markdown_content]
+    if entry_index is not None:
+        for job in pending_jobs:
+            job.page_urls = entry_index.get_urls(job.target.user_id, job.target.blog_id)
+    return pending_jobs
+
+
+def _skip_empty_jobs(jobs: list):
+    """
+    変換した Markdown が空の投稿先を STATUS_SKIPPED にする。
+    """
+    empty_jobs = [job for job in jobs if job.status is None and not job.markdown_content]
+    if empty_jobs:
+        logger.warning("No content found on the page.")
+    for job in empty_jobs:
+        job.status = STATUS_SKIPPED
+
+
+def _write_converted(targets: list, jobs: list, output_path: str | None) -> dict:
+    """
+    変換のみの場合に、変換した Markdown を書き出して処理結果を返す。
+    """
+    if jobs[0].status is None:
+        _write_markdown(jobs[0].markdown_content, output_path)
+    return _target_statuses(targets, jobs, jobs[0].status or STATUS_CONVERTED)
+
+
+def _render_context(
+    jobs: list, render_cache: RenderCache | None, on_image: Callable[[ImageJob], None] | None = None
+) -> RenderContext:
+    """
+    jobs の投稿先に向けて変換する RenderContext を作る。
+    複数の投稿先では、ページへのリンクをプレースホルダーにして変換し、投稿先ごとに置換する (_finish_job)。
+    """
+    fan_out = len(jobs) > 1
+    page_urls = None if fan_out else jobs[0].page_urls
+    return RenderContext(on_image=on_image, render_cache=render_cache, page_urls=page_urls, defer_page_links=fan_out)
+
+
+def _finish_job(job: _TargetJob, markdown_content: str, image_jobs: list, image_syntaxes: list, fan_out: bool):
+    """
+    変換した Markdown の画像のプレースホルダーをアップロード結果に、複数の投稿先ではページへのリンクの
+    プレースホルダーを投稿先のエントリの URL に置き換え、markdown_content に設定する。
+    """
+    markdown_content = substitute_image_placeholders(markdown_content, image_jobs, image_syntaxes)
+    if fan_out:
+        markdown_content = substitute_page_link_placeholders(markdown_content, job.page_urls or {})
+    job.markdown_content = markdown_content
+
+
+def _finish_jobs_without_upload(
+    jobs: list, markdown_content: str, image_jobs: list, image_cache: ImageCache | None, fan_out: bool
+):
+    """
+    画像をアップロードしない場合の _finish_job。アップロード済みの画像はその記法、それ以外は元の URL のままにする。
+    """
+    for job in jobs:
+        image_syntaxes = [_get_cached_image_syntax(image_job, image_cache, job.target) for image_job in image_jobs]
+        _finish_job(job, markdown_content, image_jobs, image_syntaxes, fan_out)
+
+
+def _finish_account_jobs(
+    account_jobs: list, markdown_content: str, image_jobs: list, image_syntaxes: list, fan_out: bool
+):
+    """
+    1つのアカウントの投稿先に、アップロード結果を反映した Markdown を設定し、ジャーナルに変換結果を記録する。
+    アップロードに失敗した画像がある場合は、再実行時にアップロードし直せるよう変換結果を記録しない。
+    """
+    for job in account_jobs:
+        _finish_job(job, markdown_content, image_jobs, image_syntaxes, fan_out)
+        job.images_uploaded = all(image_syntaxes)
+        if job.checkpoint is not None and job.images_uploaded:
+            job.checkpoint.converted(job.markdown_content)
+
+
+def _make_on_uploaded(checkpoint: _PageCheckpoint | None, progress: JobProgress):
+    """
+    アップロードした画像をジャーナルに記録し、進捗を通知する on_uploaded を作る。
+    """
+
+    def on_uploaded(image_job: ImageJob, image_syntax: str | None):
+        if checkpoint is not None and image_syntax:
+            checkpoint.image_uploaded(image_job, image_syntax)
+        progress.image_uploaded()
+
+    return on_uploaded
+
+
+def _group_by_account(jobs: list, make_pool: Callable[[_TargetJob], object]) -> dict:
+    """
+    投稿先をアカウント（ユーザー ID）ごとにまとめ、アカウントごとに make_pool で画像のアップロードのプールを作る。
+
+    Returns:
+        アカウントのユーザー ID -> (アップロードのプール, 画像を記録するジャーナル, 投稿先のリスト) の辞書。
+    """
+    accounts = {}
+    for job in jobs:
+        if job.target.user_id not in accounts:
+            accounts[job.target.user_id] = (make_pool(job), job.checkpoint, [])
+        accounts[job.target.user_id][2].append(job)
+    return accounts
+
+
+def _submit_image(accounts: dict, image_job: ImageJob, progress: JobProgress):
+    """
+    変換中に見つかった画像を、アカウントごとのプールに渡す。
+    ジャーナルにアップロード済みと記録されている画像は、アップロードせずにその結果を追加する。
+    """
+    for upload_pool, checkpoint, _ in accounts.values():
+        progress.add_image()
+        image_syntax = checkpoint.get_image_syntax(image_job) if checkpoint is not None else None
+        if image_syntax:
+            upload_pool.add_result(image_syntax)
+            progress.image_uploaded()
+        else:
+            upload_pool.submit(image_job)
+
+
+def _log_waiting_for_images(image_jobs: list, accounts: dict):
+    logger.info(
+        f"Waiting for {len(image_jobs)} images to be uploaded to Hatena Photolife"
+        + (f" ({len(accounts)} accounts)..." if len(accounts) > 1 else "...")
+    )
+
+
+def _convert_page(
+    page_id: str,
+    image_cache: ImageCache | None,
+    snapshot: SnapshotReader | None = None,
+    upload_images: bool = True,
+    render_cache: RenderCache | None = None,
+    progress: JobProgress | None = None,
+    jobs: list | None = None,
+    compact_blocks: bool | None = None,
+) -> list:
+    """
+    ブロックの取得、Markdown への変換、画像のアップロードを並行して行う。
+
+    ページ直下のブロックは子孫ブロックの取得が終わったものから順に変換し、
+    変換中に見つかった画像はその場でアップロードを開始する。
+    snapshot を指定した場合は、Notion API の代わりにスナップショットからブロックと画像を読み込む。
+    upload_images が False の場合は画像をアップロードせず、image_cache にアップロード済みの画像はその記法、
+    それ以外は元の URL のまま出力する。
+    render_cache を指定した場合、前回から変更のないブロックは変換結果のキャッシュを使用する。
+    progress を指定した場合、取得したブロックと画像のアップロードの数を通知し、取り消されれば中断する。
+    compact_blocks が True の場合は取得したブロックを CompactBlock で保持する（省略時は NOTION_COMPACT_BLOCKS に従う）。
+
+    jobs（_TargetJob のリスト、省略時は環境変数の投稿先）の投稿先ごとに Markdown を作り、markdown_content に設定する。
+    ブロックの取得と変換は1回だけ行い、画像は投稿先のアカウント（ユーザー ID）ごとに1回アップロードする。
+    checkpoint がある投稿先は、アップロードした画像と変換結果をジャーナルに記録し、記録済みの画像はアップロードしない。
+    page_urls にあるページへのリンクは、その投稿先のエントリへのリンクにする。
+
+    Returns:
+        jobs と同じ順序の、投稿先ごとの Markdown のリスト。
+    """
+    metrics = get_metrics()
+    if progress is None:
+        progress = JobProgress()
+    if jobs is None:
+        jobs = [_TargetJob(HatenaTarget.from_env())]
+    if snapshot is not None:
+        logger.info(f"Reading blocks from the snapshot {snapshot.path} and converting to Markdown...")
+        blocks = snapshot.iter_blocks()
+        downloader = snapshot.load_image
+    else:
+        logger.info("Fetching blocks and converting to Markdown...")
+        blocks = iter_blocks_recursively(page_id, compact=compact_blocks)
+        downloader = _download_notion_image
+    blocks = _track_blocks(blocks, progress)
+    fan_out = len(jobs) > 1
+
+    if not upload_images:
+        context = _render_context(jobs, render_cache)
+        with metrics.span("pipeline.fetch_and_convert"):
+            markdown_content = "".join(iter_markdown(blocks, context))
+        _finish_jobs_without_upload(jobs, markdown_content, context.image_jobs, image_cache, fan_out)
+        return [job.markdown_content for job in jobs]
+
+    with ExitStack() as stack:
+        accounts = _group_by_account(
+            jobs,
+            lambda job: stack.enter_context(
+                ImageUploadPool(
+                    cache=image_cache,
+                    downloader=downloader,
+                    on_uploaded=_make_on_uploaded(job.checkpoint, progress),
+                    target=job.target,
+                )
+            ),
+        )
+        context = _render_context(jobs, render_cache, lambda image_job: _submit_image(accounts, image_job, progress))
+        with metrics.span("pipeline.fetch_and_convert"):
+            markdown_content = "".join(iter_markdown(blocks, context))
+
+        if context.image_jobs:
+            _log_waiting_for_images(context.image_jobs, accounts)
+            progress.set_stage(STAGE_UPLOADING_IMAGES)
+        for upload_pool, _, account_jobs in accounts.values():
+            image_syntaxes = []
+            if context.image_jobs:
+                with metrics.span("pipeline.wait_for_images"):
+                    image_syntaxes = upload_pool.results(cancel_event=progress.cancel_event)
+                progress.check_cancelled()
+            _finish_account_jobs(account_jobs, markdown_content, context.image_jobs, image_syntaxes, fan_out)
+    return [job.markdown_content for job in jobs]
+
+
+def _get_cached_image_syntax(
+    image_job: ImageJob, image_cache: ImageCache | None, target: HatenaTarget | None = None
+) -> str | None:
+    """
+    画像ブロックの ID と last_edited_time でキャッシュを検索し、投稿先のアカウントにアップロード済みの画像の記法を返す。
+    画像のダウンロードもアップロードも行わない。
+    """
+    if image_cache is None or image_job.block_id is None or image_job.last_edited_time is None:
+        return None
+    target = target or HatenaTarget.from_env()
+    return image_cache.get_by_block(target.user_id, image_job.block_id, image_job.last_edited_time)
+
+
+def _has_expiring_url(image_job: ImageJob) -> bool:
+    """
+    画像の URL が有効期限付きで、画像ブロックを取得し直せば新しい URL を得られる場合に True を返す。
+    """
+    return image_job.expires_at() is not None and image_job.block_id is not None
+
+
+def _is_url_expiring(image_job: ImageJob) -> bool:
+    """
+    画像の URL の有効期限が切れている（切れかけている）場合に True を返す。
+    """
+    return image_job.expires_at() - time.time() < IMAGE_URL_EXPIRY_MARGIN_SECONDS
+
+
+def _image_url_of(image_job: ImageJob, block: dict | None) -> str | None:
+    """
+    取得し直した画像ブロックから、新しい URL を返す。画像ブロックを取得できなかった場合は None。
+    """
+    if block is None or block.get("type") != "image":
+        logger.warning(f"Could not refresh the URL of image block {image_job.block_id}.")
+        return None
+    return make_image_job(block).url
+
+
+def _refresh_image_url(image_job: ImageJob) -> str | None:
+    """
+    画像ブロックだけを Notion から取得し直し、新しい URL を返す。取得できなかった場合は None。
+    """
+    with get_metrics().span("notion.refresh_image_url"):
+        block = fetch_block(image_job.block_id)
+    return _image_url_of(image_job, block)
+
+
+def _download_notion_image(image_job: ImageJob) -> DownloadedImage | None:
+    """
+    画像をダウンロードする。ImageUploadPool の downloader として使用する。
+
+    Notion にアップロードされた画像の URL は有効期限付きのため、期限が切れている（切れかけている）場合は、
+    ページ全体ではなくその画像ブロックだけを取得し直して新しい URL からダウンロードする。
+    期限の前でもダウンロードに失敗した場合は、URL を取得し直して1回だけ再試行する。
+    """
+    if not _has_expiring_url(image_job):
+        return download_image(image_job.url)
+
+    if _is_url_expiring(image_job):
+        logger.info(f"The URL of image block {image_job.block_id} has expired. Fetching a new URL.")
+        return download_image(_refresh_image_url(image_job) or image_job.url)
+
+    image = download_image(image_job.url)
+    if image is None:
+        url = _refresh_image_url(image_job)
+        if url and url != image_job.url:
+            logger.info(f"Retrying the download of image block {image_job.block_id} with a new URL.")
+            image = download_image(url)
+    return image
+
+
+def _resolve_interrupted_post(checkpoint: _PageCheckpoint, draft: bool):
+    """
+    前回の実行で応答を受け取れなかった新規作成 (POST) によって、エントリが作成されていたかを確かめる。
+    作成されていた場合は、同じページを2回投稿しないよう、そのエントリをジャーナルに記録して更新の対象にする。
+
+    Raises:
+        HatenaEntryLookupError: エントリの一覧を取得できず、作成されたかどうかを確かめられない場合。
+    """
+    interrupted = checkpoint.interrupted_post()
+    if interrupted is None:
+        return
+
+    logger.info("Checking whether the interrupted post created a Hatena Blog entry...")
+    try:
+        with get_metrics().span("hatena.find_entry"):
+            edit_uri = find_hatena_entry(interrupted["title"], interrupted["markdown"], target=checkpoint.target)
+    except HatenaEntryNotFoundError:
+        logger.info("The interrupted post did not create an entry.")
+        checkpoint.interrupted_post_resolved(None, None)
+        return
+    if edit_uri is None:
+        raise HatenaEntryLookupError("前回の投稿でエントリが作成されたかどうかを確認できませんでした。")
+
+    logger.info(f"The interrupted post created the entry {edit_uri}. Updating it instead of posting again.")
+    content_hash = _hash_entry(interrupted["title"], interrupted["markdown"], draft)
+    checkpoint.interrupted_post_resolved(edit_uri, content_hash)
+
+
+def _hash_entry(title: str, content: str, draft: bool) -> str:
+    """
+    投稿内容（タイトル、本文、下書きかどうか）のハッシュ値を求める。
+    """
+    entry = f"{title}\0{content}\0{'draft' if draft else 'publish'}"
+    return hashlib.sha256(entry.encode("utf-8")).hexdigest()
+
+
+def _is_unedited(record: dict | None, last_edited_time: str | None, draft: bool) -> bool:
+    """
+    前回の同期からページが編集されておらず、下書きかどうかも同じ場合に True を返す。
+    下書きかどうかの記録がない場合は False を返し、生成したコンテンツのハッシュ値で比較させる。
+    """
+    return bool(
+        record
+        and last_edited_time
+        and record["last_edited_time"] == last_edited_time
+        and record.get("draft") is not None
+        and record["draft"] == draft
+    )
+
+
+def _synced_edit_time(last_edited_time: str | None, images_uploaded: bool) -> str | None:
+    """
+    同期状態に保存する last_edited_time を返す。アップロードに失敗した画像がある場合は None にする。
+
+    失敗した画像は期限付きの Notion の URL のまま投稿されるため、ページが編集されていなくても次回の同期で
+    アップロードし直す（_is_unedited で省略されないようにする）。
+    """
+    if images_uploaded:
+        return last_edited_time
+    logger.warning("Some images could not be uploaded. The page will be synced again on the next run.")
+    return None
+
+
+def _is_unchanged(record: dict | None, content_hash: str) -> bool:
+    """
+    生成したコンテンツが前回の同期時と同じ（投稿を省略できる）場合に True を返す。
+    """
+    if record and record["content_hash"] == content_hash:
+        logger.info("The generated content has not changed since the last sync. Skipping the post.")
+        return True
+    return False
+
+
+def _record_synced_entry(
+    edit_uri: str | None,
+    sync_state: SyncState | None,
+    page_id: str,
+    last_edited_time: str | None,
+    content_hash: str,
+    draft: bool,
+    checkpoint: _PageCheckpoint | None,
+    entry_index: EntryIndex | None,
+    target: HatenaTarget,
+    images_uploaded: bool,
+):
+    """
+    投稿（または省略）したエントリを、同期状態とエントリの索引に記録し、ジャーナルの記録を削除する。
+    投稿に失敗した場合 (edit_uri が None) は何もしない。
+    """
+    if not edit_uri:
+        return
+    if sync_state is not None:
+        last_edited_time = _synced_edit_time(last_edited_time, images_uploaded)
+        sync_state.put(page_id, target.user_id, target.blog_id, edit_uri, last_edited_time, content_hash, draft)
+    if entry_index is not None:
+        entry_index.put_page(target.user_id, target.blog_id, page_id, edit_uri, draft)
+    if checkpoint is not None:
+        checkpoint.finish()
+
+
+def _posted_status(job: _TargetJob, status: str) -> str:
+    """
+    前回の実行で作成されていたエントリが今回の内容と同じ場合は、投稿を終えたもの (STATUS_POSTED) として扱う。
+    """
+    if job.posted_entry and status == STATUS_UNCHANGED:
+        return STATUS_POSTED
+    return status
+
+
+def _sync_to_hatena(
+    sync_state: SyncState | None,
+    page_id: str,
+    last_edited_time: str | None,
+    record: dict | None,
+    title: str,
+    markdown_content: str,
+    draft: bool,
+    checkpoint: _PageCheckpoint | None = None,
+    entry_index: EntryIndex | None = None,
+    target: HatenaTarget | None = None,
+    images_uploaded: bool = True,
+) -> str:
+    """
+    同期状態に応じて、はてなブログのエントリを更新 (PUT) または新規作成 (POST) する。
+    生成したコンテンツが前回の同期時と同じ場合は投稿を省略する。
+    sync_state が None の場合は、record があれば更新し、なければ新規作成する（同期状態は保存しない）。
+    images_uploaded が False の場合（アップロードに失敗した画像が元の URL のまま残っている場合）は、
+    次回の同期でページの処理を省略しないよう、同期状態に last_edited_time を保存しない。
+    checkpoint を指定した場合、新規作成の前に送信する内容をジャーナルに記録し、投稿を終えたら記録を削除する。
+    entry_index を指定した場合、投稿したエントリとページの対応を記録する。
+    target を省略した場合は、環境変数で指定したブログに投稿する。
+
+    Returns:
+        処理結果 (STATUS_*)。
+    """
+    target = target or HatenaTarget.from_env()
+    content_hash = _hash_entry(title, markdown_content, draft)
+
+    if _is_unchanged(record, content_hash):
+        edit_uri = record["edit_uri"]
+        status = STATUS_UNCHANGED
+    else:
+        edit_uri = None
+        status = STATUS_FAILED
+        if record:
+            logger.info(f"Updating the Hatena Blog entry with title: {title}")
+            try:
+                edit_uri = update_hatena_entry(record["edit_uri"], title, markdown_content, draft=draft, target=target)
+                status = STATUS_UPDATED if edit_uri else STATUS_FAILED
+            except HatenaEntryNotFoundError as e:
+                logger.warning(f"{e} Posting it as a new entry.")
+                record = None
+
+        if record is None:
+            logger.info(f"Posting to Hatena Blog with title: {title}")
+            if checkpoint is not None:
+                checkpoint.posting(markdown_content)
+            edit_uri = post_to_hatena(title, markdown_content, draft=draft, target=target)
+            status = STATUS_POSTED if edit_uri else STATUS_FAILED
+
+    _record_synced_entry(
+        edit_uri,
+        sync_state,
+        page_id,
+        last_edited_time,
+        content_hash,
+        draft,
+        checkpoint,
+        entry_index,
+        target,
+        images_uploaded,
+    )
+    return status
+
+
+def process_notion_to_hatena(
+    input_arg: str,
+    publish: bool = False,
+    use_image_cache: bool = True,
+    sync: bool = False,
+    image_cache: ImageCache | None = None,
+    sync_state: SyncState | None = None,
+    convert_only: bool = False,
+    output_path: str | None = None,
+    use_render_cache: bool = True,
+    render_cache: RenderCache | None = None,
+    progress: JobProgress | None = None,
+    dry_run: bool = False,
+    use_journal: bool = True,
+    journal: Journal | None = None,
+    use_entry_index: bool = True,
+    entry_index: EntryIndex | None = None,
+    targets: list | None = None,
+    target_results: dict | None = None,
+    compact_blocks: bool | None = None,
+) -> str:
     """
     Orchestrates the fetching from Notion and posting to Hatena.
     Raises ValueError if input_arg is invalid.
+
+    use_image_cache が True の場合、アップロード済みの画像はキャッシュから再利用する。
+    sync が True の場合、前回投稿したエントリを更新する。ページに変更がなければ処理を省略する。
+    image_cache / sync_state / render_cache / journal を渡すと、それらを開き直さずに共有して使用する（バッチ処理用）。
+    convert_only が True の場合は投稿せず、変換した Markdown を output_path（省略時は標準出力）に書き出す。
+    use_render_cache が True の場合、前回から変更のないブロックは変換結果のキャッシュを使用する。
+    progress を渡すと、処理段階、取得したブロックの数、画像のアップロードの数を通知する。
+    progress.cancel() が呼ばれると、JobCancelledError を送出して中断する。
+    dry_run が True の場合は画像のアップロードと投稿を行わず、変換した Markdown を output_path
+    （省略時は <ページ ID>.md）に書き出し、前回投稿したエントリの本文との差分を標準出力に表示する。
+    use_journal が True の場合、取得・画像のアップロード・変換・投稿の途中経過をジャーナルに記録し、
+    前回の実行が途中で失敗していればその続きから再開する。応答を受け取れなかった新規作成は、
+    エントリが作成されていたかを確かめてから投稿し直すため、同じページを2回投稿しない。
+    use_entry_index が True の場合、エントリの索引を使って、投稿済みの Notion のページへのリンク（メンションと
+    link_to_page）をエントリの URL に置き換える。索引はエントリの一覧を読み込まずに、作成済みのものをそのまま使う
+    （作成していない場合は使用しない）。更新は refresh_entry_index、作成は rebuild_entry_index で行う。
+    targets（HatenaTarget のリスト）を指定すると、ページの取得と変換を1回だけ行い、すべての投稿先に並行して投稿する。
+    省略時は環境変数 HATENA_TARGETS の投稿先（なければ HATENA_USER_ID, HATENA_BLOG_ID の投稿先）に投稿する。
+    画像は投稿先のアカウントごとに1回だけアップロードする。
+    target_results（辞書）を渡すと、投稿先の名前 -> 処理結果を設定する。
+    compact_blocks が True の場合、取得したブロックを変換に使用する値だけを保持する CompactBlock で保持し、
+    メモリ使用量を減らす（register_block_renderer で登録したレンダラーには色やキャプションなどが渡らない）。
+    省略時は環境変数 NOTION_COMPACT_BLOCKS（既定値 0）が 0 でなければ使用する。
+
+    Returns:
+        処理結果 (STATUS_POSTED, STATUS_UPDATED, STATUS_UNCHANGED, STATUS_SKIPPED, STATUS_FAILED,
+        STATUS_CONVERTED, STATUS_CHANGED のいずれか)。複数の投稿先では、いずれかが失敗した場合は STATUS_FAILED、
+        それ以外は最も大きな変更（投稿、更新の順）を表すもの。
+    """
+    page_id = extract_page_id(input_arg)
+    results = _run(
+        page_id,
+        publish=publish,
+        use_image_cache=use_image_cache,
+        sync=sync,
+        use_render_cache=use_render_cache,
+        image_cache=image_cache,
+        sync_state=sync_state,
+        render_cache=render_cache,
+        convert_only=convert_only,
+        output_path=output_path,
+        progress=progress,
+        dry_run=dry_run,
+        use_journal=use_journal,
+        journal=journal,
+        use_entry_index=use_entry_index,
+        entry_index=entry_index,
+        targets=targets,
+        compact_blocks=compact_blocks,
+    )
+    if target_results is not None:
+        target_results.update(results)
+    return _combine_statuses(results.values())
+
+
+def process_snapshot(
+    snapshot_path: str,
+    publish: bool = False,
+    use_image_cache: bool = True,
+    sync: bool = False,
+    convert_only: bool = False,
+    output_path: str | None = None,
+    use_render_cache: bool = True,
+    dry_run: bool = False,
+    use_journal: bool = True,
+    use_entry_index: bool = True,
+    targets: list | None = None,
+    target_results: dict | None = None,
+) -> str:
+    """
+    Notion API の代わりにスナップショットファイルからページを読み込み、変換・投稿する。
+    引数と戻り値は process_notion_to_hatena と同じ。
+    """
+    with SnapshotReader(snapshot_path) as snapshot:
+        results = _run(
+            snapshot.page_id,
+            publish=publish,
+            use_image_cache=use_image_cache,
+            sync=sync,
+            use_render_cache=use_render_cache,
+            snapshot=snapshot,
+            convert_only=convert_only,
+            output_path=output_path,
+            dry_run=dry_run,
+            use_journal=use_journal,
+            use_entry_index=use_entry_index,
+            targets=targets,
+        )
+    if target_results is not None:
+        target_results.update(results)
+    return _combine_statuses(results.values())
+
+
+def _combine_statuses(statuses: Iterable[str]) -> str:
+    """
+    投稿先ごとの処理結果を1つにまとめる（_STATUS_PRIORITY の前にあるものを優先する）。
+    """
+    return min(statuses, key=_STATUS_PRIORITY.index)
+
+
+def _run(
+    page_id: str,
+    publish: bool,
+    use_image_cache: bool,
+    sync: bool,
+    use_render_cache: bool,
+    image_cache: ImageCache | None = None,
+    sync_state: SyncState | None = None,
+    render_cache: RenderCache | None = None,
+    snapshot: SnapshotReader | None = None,
+    convert_only: bool = False,
+    output_path: str | None = None,
+    progress: JobProgress | None = None,
+    dry_run: bool = False,
+    use_journal: bool = False,
+    journal: Journal | None = None,
+    use_entry_index: bool = False,
+    entry_index: EntryIndex | None = None,
+    targets: list | None = None,
+    compact_blocks: bool | None = None,
+) -> dict:
+    """
+    キャッシュと同期状態、ジャーナル、エントリの索引を用意し、1ページを処理する。
+
+    Returns:
+        投稿先の名前 -> 処理結果 (STATUS_*) の辞書。
+    """
+    if progress is None:
+        progress = JobProgress()
+    targets = targets or get_hatena_targets()
+    # 変換のみの場合は画像をアップロードせず、エントリも投稿しないため、画像のキャッシュと同期状態は使用しない
+    use_image_cache = use_image_cache and not convert_only
+    # ドライランでは、前回投稿したエントリを同期状態から探す（同期状態は更新しない）
+    dry_run = dry_run and not convert_only
+    sync = (sync or dry_run) and not convert_only
+    # 投稿しない場合は、再開するための途中経過を記録しない
+    use_journal = use_journal and not convert_only and not dry_run
+    # 変換のみの場合ははてなブログにアクセスしないため、リンクは Notion のまま出力する
+    use_entry_index = use_entry_index and not convert_only
+
+    with (
+        _open_stores(use_image_cache, sync, use_render_cache, image_cache, sync_state, render_cache) as stores,
+        _open_journal(use_journal, journal) as journal,
+        _open_entry_index(use_entry_index, entry_index) as entry_index,
+    ):
+        started_at = time.perf_counter()
+        try:
+            return _process_page(
+                page_id,
+                not publish,
+                *stores,
+                snapshot,
+                convert_only,
+                output_path,
+                progress,
+                dry_run,
+                journal,
+                entry_index,
+                targets,
+                compact_blocks,
+            )
+        finally:
+            _record_page_time(page_id, started_at)
+            progress.set_stage(STAGE_DONE)
+
+
+@contextmanager
+def _open_stores(
+    use_image_cache: bool,
+    sync: bool,
+    use_render_cache: bool,
+    image_cache: ImageCache | None,
+    sync_state: SyncState | None,
+    render_cache: RenderCache | None,
+):
+    """
+    渡されなかった画像のキャッシュ、同期状態のストア、変換結果のキャッシュを開き、処理後に閉じる。
+
+    Yields:
+        (画像のキャッシュ, 同期状態のストア, 変換結果のキャッシュ) のタプル。使用しないものは None。
+    """
+    owns_image_cache = use_image_cache and image_cache is None
+    owns_sync_state = sync and sync_state is None
+    owns_render_cache = use_render_cache and render_cache is None
+    if owns_image_cache:
+        image_cache = ImageCache()
+    if owns_sync_state:
+        sync_state = SyncState()
+    if owns_render_cache:
+        render_cache = RenderCache()
+
+    try:
+        yield (
+            image_cache if use_image_cache else None,
+            sync_state if sync else None,
+            render_cache if use_render_cache else None,
+        )
+    finally:
+        if owns_image_cache:
+            image_cache.evict()
+            image_cache.close()
+        if owns_sync_state:
+            sync_state.close()
+        if owns_render_cache:
+            render_cache.evict()
+            render_cache.close()
+
+
+@contextmanager
+def _open_journal(use_journal: bool, journal: Journal | None):
+    """
+    渡されなかったジャーナルを開き、処理後に閉じる。
+
+    Yields:
+        ジャーナル。使用しない場合は None。
+    """
+    owns_journal = use_journal and journal is None
+    if owns_journal:
+        journal = Journal()
+    try:
+        yield journal if use_journal else None
+    finally:
+        if owns_journal:
+            journal.evict()
+            journal.close()
+
+
+@contextmanager
+def _open_entry_index(use_entry_index: bool, entry_index: EntryIndex | None):
+    """
+    渡されなかったエントリの索引を開き、処理後に閉じる。
+
+    1ページごとにエントリの一覧を読み込まないよう、索引は更新せずに使う。索引のファイルがない場合は、
+    一覧をすべて読み込んで作成せずに、索引を使用しない。
+
+    Yields:
+        エントリの索引。使用しない場合は None。
+    """
+    if use_entry_index and entry_index is None and not os.path.exists(get_default_entry_index_path()):
+        use_entry_index = False
+    owns_entry_index = use_entry_index and entry_index is None
+    if owns_entry_index:
+        entry_index = EntryIndex()
+    try:
+        yield entry_index if use_entry_index else None
+    finally:
+        if owns_entry_index:
+            entry_index.close()
+
+
+def _record_page_time(page_id: str, started_at: float):
+    seconds = time.perf_counter() - started_at
+    metrics = get_metrics()
+    metrics.add_span("page.total", seconds)
+    metrics.record_item("page", page_id, seconds)
+
+
+def _write_markdown(markdown_content: str, output_path: str | None):
+    """
+    変換した Markdown をファイル、または標準出力に書き出す。
+    """
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(markdown_content)
+        logger.info(f"Wrote the converted Markdown to {output_path}")
+    else:
+        sys.stdout.write(markdown_content + "\n")
+
+
+def _diff_with_hatena(
+    record: dict | None,
+    title: str,
+    markdown_content: str,
+    draft: bool,
+    output_path: str,
+    target: HatenaTarget | None = None,
+) -> str:
+    """
+    変換した Markdown と、前回投稿したエントリの現在の本文との差分を unified diff 形式で標準出力に書き出す。
+    エントリがない場合は、新しく投稿される本文全体を差分として表示する。
+
+    Returns:
+        投稿してもエントリが変わらない場合は STATUS_UNCHANGED、変わる場合は STATUS_CHANGED、
+        エントリを取得できなかった場合は STATUS_FAILED。
+    """
+    entry = None
+    if record:
+        try:
+            with get_metrics().span("hatena.get_entry"):
+                entry = get_hatena_entry(record["edit_uri"], target)
+        except HatenaEntryNotFoundError as e:
+            logger.warning(f"{e} It would be posted as a new entry.")
+            record = None
+        else:
+            if entry is None:
+                return STATUS_FAILED
+
+    if entry is None:
+        logger.info(f"No Hatena Blog entry has been posted for this page. It would be posted with title: {title}")
+        entry = {"title": title, "content": "", "draft": draft}
+        from_file = "/dev/null"
+    else:
+        from_file = record["edit_uri"]
+
+    current_lines = entry["content"].splitlines()
+    new_lines = markdown_content.splitlines()
+    if entry["title"] == title and entry["draft"] == draft and current_lines == new_lines:
+        logger.info("The rendered content is the same as the posted entry.")
+        return STATUS_UNCHANGED
+
+    if entry["title"] != title:
+        logger.info(f"The title would change: {entry['title']!r} -> {title!r}")
+    if entry["draft"] != draft:
+        logger.info(f"The entry would be {'changed to a draft' if draft else 'published'}.")
+    diff = difflib.unified_diff(current_lines, new_lines, fromfile=from_file, tofile=output_path, lineterm="")
+    # バッチ処理で複数のページの差分が混ざらないよう、まとめて書き出す
+    sys.stdout.write("".join(f"{line}\n" for line in diff))
+    return STATUS_CHANGED
+
+
+def _process_page(
+    page_id: str,
+    draft: bool,
+    image_cache: ImageCache | None,
+    sync_state: SyncState | None,
+    render_cache: RenderCache | None = None,
+    snapshot: SnapshotReader | None = None,
+    convert_only: bool = False,
+    output_path: str | None = None,
+    progress: JobProgress | None = None,
+    dry_run: bool = False,
+    journal: Journal | None = None,
+    entry_index: EntryIndex | None = None,
+    targets: list | None = None,
+    compact_blocks: bool | None = None,
+) -> dict:
+    metrics = get_metrics()
+    if progress is None:
+        progress = JobProgress()
+    if not targets:
+        targets = [HatenaTarget.from_env()]
+    jobs = _create_jobs(targets, convert_only)
+    fan_out = len(jobs) > 1
+    progress.check_cancelled()
+    if snapshot is not None:
+        last_edited_time = snapshot.last_edited_time
+        title = snapshot.title
+    else:
+        logger.info(f"Fetching content from Notion page: {page_id}")
+        progress.set_stage(STAGE_FETCHING_PAGE)
+        with metrics.span("notion.fetch_page"):
+            page = fetch_page(page_id)
+        last_edited_time = page.get("last_edited_time") if page else None
+        title = get_page_title(page) if page else None
+
+    _apply_sync_records(jobs, sync_state, page_id, last_edited_time, draft, skip_unedited=not dry_run)
+    if not title:
+        logger.warning("No title found on the page.")
+        return _target_statuses(targets, jobs, STATUS_SKIPPED)
+
+    _start_checkpoints(jobs, journal, page_id, last_edited_time, title, draft)
+    pending_jobs = _pending_jobs(jobs, entry_index)
+    if pending_jobs:
+        progress.set_stage(STAGE_CONVERTING)
+        upload_images = not convert_only and not dry_run
+        _convert_page(
+            page_id, image_cache, snapshot, upload_images, render_cache, progress, pending_jobs, compact_blocks
+        )
+    _skip_empty_jobs(jobs)
+
+    if convert_only:
+        return _write_converted(targets, jobs, output_path)
+
+    if dry_run:
+        output_path = output_path or f"{page_id}.md"
+        for job in jobs:
+            if job.status is None:
+                # 複数の投稿先では、投稿先ごとに <出力先>.<投稿先の名前>.md に書き出す
+                job_output_path = _target_output_path(output_path, job.target) if fan_out else output_path
+                _write_markdown(job.markdown_content, job_output_path)
+                job.status = _diff_with_hatena(
+                    job.record, title, job.markdown_content, draft, job_output_path, job.target
+                )
+        return _target_statuses(targets, jobs)
+
+    progress.check_cancelled()
+    progress.set_stage(STAGE_POSTING)
+
+    def post(job: _TargetJob):
+        with metrics.span("hatena.post_entry"):
+            status = _sync_to_hatena(
+                sync_state,
+                page_id,
+                last_edited_time,
+                job.record,
+                title,
+                job.markdown_content,
+                draft,
+                job.checkpoint,
+                entry_index,
+                job.target,
+                job.images_uploaded,
+            )
+        job.status = _posted_status(job, status)
+
+    post_jobs = [job for job in jobs if job.status is None]
+    if len(post_jobs) > 1:
+        with ThreadPoolExecutor(max_workers=len(post_jobs), thread_name_prefix="hatena-post") as executor:
+            # 例外は result() で呼び出し元に伝える
+            for future in [executor.submit(post, job) for job in post_jobs]:
+                future.result()
+    else:
+        for job in post_jobs:
+            post(job)
+    return _target_statuses(targets, jobs)
+
+
+def _target_statuses(targets: list, jobs: list, default: str | None = None) -> dict:
+    """
+    投稿先の名前 -> 処理結果の辞書を作る。処理結果が決まっていない投稿先は default にする。
+    複数の投稿先では、投稿先ごとの処理結果をログに出力する。
+    """
+    statuses = {job.target.name: job.status or default for job in jobs}
+    statuses = {target.name: statuses.get(target.name, default) for target in targets}
+    if len(targets) > 1:
+        for target in targets:
+            logger.info(f"[{statuses[target.name]:>9}] {target.name} ({target.user_id}/{target.blog_id})")
+    return statuses
+
+
+def _target_output_path(output_path: str, target: HatenaTarget) -> str:
+    root, ext = os.path.splitext(output_path)
+    return f"{root}.{target.name}{ext or '.md'}"
+
+
+# 非同期 API
+# 1つのイベントループで複数のページを並行して処理できるよう、取得・変換・アップロード・投稿を asyncio で行う。
+
+
+class AsyncClients:
+    """
+    process_notion_to_hatena_async で使用する、Notion API と HTTP の非同期クライアント。
+    複数のページを並行して処理する場合は、1つを作成して共有すると接続を再利用できる。
+    async with で使用するか、使い終わったら aclose を呼び出す。
+    """
+
+    def __init__(self):
+        self.notion = create_async_notion_client()
+        self.http = create_async_client()
+
+    async def aclose(self):
+        await self.notion.aclose()
+        await self.http.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+
+async def process_notion_to_hatena_async(
+    input_arg: str,
+    publish: bool = False,
+    use_image_cache: bool = True,
+    sync: bool = False,
+    image_cache: ImageCache | None = None,
+    sync_state: SyncState | None = None,
+    convert_only: bool = False,
+    output_path: str | None = None,
+    use_render_cache: bool = True,
+    render_cache: RenderCache | None = None,
+    clients: AsyncClients | None = None,
+    use_entry_index: bool = True,
+    entry_index: EntryIndex | None = None,
+    targets: list | None = None,
+    target_results: dict | None = None,
+    use_journal: bool = True,
+    journal: Journal | None = None,
+    compact_blocks: bool | None = None,
+) -> str:
+    """
+    process_notion_to_hatena の非同期版。共通の引数と戻り値は process_notion_to_hatena と同じ。
+
+    ページごとにスレッドを使わずに処理するため、asyncio.gather で多数のページを並行して処理できる。
+    clients を渡すと、Notion API と HTTP のクライアントを開き直さずに共有して使用する。
+    エントリの索引は同期版と同じく、更新せずに使う（refresh_entry_index で事前に更新する）。
+    targets と target_results は同期版と同じく、ページの取得と変換を1回だけ行ってすべての投稿先に並行して投稿し、
+    画像は投稿先のアカウントごとに1回だけアップロードする。
+    ジャーナル (use_journal / journal) と compact_blocks も同期版と同じく使用する。
+    同期版の progress と dry_run には対応しない。
     """
     page_id = extract_page_id(input_arg)
+    targets = targets or get_hatena_targets()
+    use_image_cache = use_image_cache and not convert_only
+    sync = sync and not convert_only
+    use_journal = use_journal and not convert_only
+    use_entry_index = use_entry_index and not convert_only
 
+    owns_clients = clients is None
+    if owns_clients:
+        clients = AsyncClients()
+    try:
+        with (
+            _open_stores(use_image_cache, sync, use_render_cache, image_cache, sync_state, render_cache) as stores,
+            _open_journal(use_journal, journal) as journal,
+            _open_entry_index(use_entry_index, entry_index) as entry_index,
+        ):
+            started_at = time.perf_counter()
+            try:
+                results = await _process_page_async(
+                    clients,
+                    page_id,
+                    not publish,
+                    *stores,
+                    convert_only,
+                    output_path,
+                    entry_index,
+                    targets,
+                    journal,
+                    compact_blocks,
+                )
+            finally:
+                _record_page_time(page_id, started_at)
+    finally:
+        if owns_clients:
+            await clients.aclose()
+    if target_results is not None:
+        target_results.update(results)
+    return _combine_statuses(results.values())
+
+
+async def _process_page_async(
+    clients: AsyncClients,
+    page_id: str,
+    draft: bool,
+    image_cache: ImageCache | None,
+    sync_state: SyncState | None,
+    render_cache: RenderCache | None,
+    convert_only: bool,
+    output_path: str | None,
+    entry_index: EntryIndex | None,
+    targets: list,
+    journal: Journal | None = None,
+    compact_blocks: bool | None = None,
+) -> dict:
+    """
+    _process_page の非同期版。通信以外の処理は同期版と共通の関数で行う。
+
+    Returns:
+        投稿先の名前 -> 処理結果 (STATUS_*) の辞書。
+    """
+    metrics = get_metrics()
+    jobs = _create_jobs(targets, convert_only)
     logger.info(f"Fetching content from Notion page: {page_id}")
-    title = fetch_page_title(page_id)
-    blocks = fetch_blocks_recursively(page_id)
+    with metrics.span("notion.fetch_page"):
+        page = await fetch_page_async(clients.notion, page_id)
+    last_edited_time = page.get("last_edited_time") if page else None
+    title = get_page_title(page) if page else None
 
+    _apply_sync_records(jobs, sync_state, page_id, last_edited_time, draft)
     if not title:
         logger.warning("No title found on the page.")
-        return
+        return _target_statuses(targets, jobs, STATUS_SKIPPED)
 
-    if not blocks:
-        logger.warning("No content found on the page.")
-        return
+    if journal is not None:
+        # 応答を受け取れなかった新規作成の確認ははてなブログに同期的に問い合わせるため、別スレッドで行う
+        await asyncio.to_thread(_start_checkpoints, jobs, journal, page_id, last_edited_time, title, draft)
+    pending_jobs = _pending_jobs(jobs, entry_index)
+    if pending_jobs:
+        await _convert_page_async(
+            clients, page_id, image_cache, not convert_only, render_cache, pending_jobs, compact_blocks
+        )
+    _skip_empty_jobs(jobs)
+
+    if convert_only:
+        return _write_converted(targets, jobs, output_path)
+
+    async def post(job: _TargetJob):
+        with metrics.span("hatena.post_entry"):
+            status = await _sync_to_hatena_async(
+                clients,
+                sync_state,
+                page_id,
+                last_edited_time,
+                job.record,
+                title,
+                job.markdown_content,
+                draft,
+                job.checkpoint,
+                entry_index,
+                job.target,
+                job.images_uploaded,
+            )
+        job.status = _posted_status(job, status)
+
+    await asyncio.gather(*(post(job) for job in jobs if job.status is None))
+    return _target_statuses(targets, jobs)
+
+
+async def _render_blocks_async(blocks: AsyncIterable[dict], context: RenderContext) -> str:
+    """
+    ページ直下のブロックを受け取るたびに変換し、iter_markdown と同じ区切りで連結する。
+    """
+    texts = []
+    async for block in blocks:
+        parts = list(iter_markdown([block], context))
+        if parts:
+            texts.append("".join(parts))
+    return BLOCK_SEPARATOR.join(texts)
+
+
+async def _refresh_image_url_async(clients: AsyncClients, image_job: ImageJob) -> str | None:
+    """
+    _refresh_image_url の非同期版。
+    """
+    with get_metrics().span("notion.refresh_image_url"):
+        block = await fetch_block_async(clients.notion, image_job.block_id)
+    return _image_url_of(image_job, block)
+
+
+async def _download_notion_image_async(clients: AsyncClients, image_job: ImageJob) -> DownloadedImage | None:
+    """
+    _download_notion_image の非同期版。AsyncImageUploadPool の downloader として使用する。
+    """
+    if not _has_expiring_url(image_job):
+        return await download_image_async(clients.http, image_job.url)
+
+    if _is_url_expiring(image_job):
+        logger.info(f"The URL of image block {image_job.block_id} has expired. Fetching a new URL.")
+        url = await _refresh_image_url_async(clients, image_job)
+        return await download_image_async(clients.http, url or image_job.url)
+
+    image = await download_image_async(clients.http, image_job.url)
+    if image is None:
+        url = await _refresh_image_url_async(clients, image_job)
+        if url and url != image_job.url:
+            logger.info(f"Retrying the download of image block {image_job.block_id} with a new URL.")
+            image = await download_image_async(clients.http, url)
+    return image
+
+
+async def _convert_page_async(
+    clients: AsyncClients,
+    page_id: str,
+    image_cache: ImageCache | None,
+    upload_images: bool = True,
+    render_cache: RenderCache | None = None,
+    jobs: list | None = None,
+    compact_blocks: bool | None = None,
+) -> list:
+    """
+    _convert_page の非同期版。ブロックの取得、変換、画像のアップロードを1つのイベントループで並行して行う。
+    画像は投稿先のアカウントごとに1回だけアップロードし、変換した Markdown を jobs の markdown_content に設定する。
+    ジャーナルへの画像と変換結果の記録は同期版と同じ。
+
+    Returns:
+        jobs と同じ順序の、投稿先ごとの Markdown のリスト。
+    """
+    metrics = get_metrics()
+    # 非同期版は進捗を通知しない
+    progress = JobProgress()
+    if jobs is None:
+        jobs = [_TargetJob(HatenaTarget.from_env())]
+    logger.info("Fetching blocks and converting to Markdown...")
+    blocks = iter_blocks_recursively_async(clients.notion, page_id, compact=compact_blocks)
+    fan_out = len(jobs) > 1
+
+    if not upload_images:
+        context = _render_context(jobs, render_cache)
+        with metrics.span("pipeline.fetch_and_convert"):
+            markdown_content = await _render_blocks_async(blocks, context)
+        _finish_jobs_without_upload(jobs, markdown_content, context.image_jobs, image_cache, fan_out)
+        return [job.markdown_content for job in jobs]
+
+    accounts = _group_by_account(
+        jobs,
+        lambda job: AsyncImageUploadPool(
+            clients.http,
+            cache=image_cache,
+            downloader=lambda image_job: _download_notion_image_async(clients, image_job),
+            target=job.target,
+            on_uploaded=_make_on_uploaded(job.checkpoint, progress),
+        ),
+    )
+    try:
+        context = _render_context(jobs, render_cache, lambda image_job: _submit_image(accounts, image_job, progress))
+        with metrics.span("pipeline.fetch_and_convert"):
+            markdown_content = await _render_blocks_async(blocks, context)
+
+        if context.image_jobs:
+            _log_waiting_for_images(context.image_jobs, accounts)
+            with metrics.span("pipeline.wait_for_images"):
+                account_syntaxes = await asyncio.gather(
+                    *(upload_pool.results() for upload_pool, _, _ in accounts.values())
+                )
+        else:
+            account_syntaxes = [[] for _ in accounts]
+        for (_, _, account_jobs), image_syntaxes in zip(accounts.values(), account_syntaxes):
+            _finish_account_jobs(account_jobs, markdown_content, context.image_jobs, image_syntaxes, fan_out)
+    finally:
+        # 取得や変換に失敗した場合に、アップロードを続けないようにする
+        for upload_pool, _, _ in accounts.values():
+            upload_pool.cancel()
+
+    return [job.markdown_content for job in jobs]
+
+
+async def _sync_to_hatena_async(
+    clients: AsyncClients,
+    sync_state: SyncState | None,
+    page_id: str,
+    last_edited_time: str | None,
+    record: dict | None,
+    title: str,
+    markdown_content: str,
+    draft: bool,
+    checkpoint: _PageCheckpoint | None = None,
+    entry_index: EntryIndex | None = None,
+    target: HatenaTarget | None = None,
+    images_uploaded: bool = True,
+) -> str:
+    """
+    _sync_to_hatena の非同期版。投稿するかの判定と投稿後の記録は同期版と共通の関数で行う。
+    """
+    target = target or HatenaTarget.from_env()
+    content_hash = _hash_entry(title, markdown_content, draft)
+
+    if _is_unchanged(record, content_hash):
+        edit_uri = record["edit_uri"]
+        status = STATUS_UNCHANGED
+    else:
+        edit_uri = None
+        status = STATUS_FAILED
+        if record:
+            logger.info(f"Updating the Hatena Blog entry with title: {title}")
+            try:
+                edit_uri = await update_hatena_entry_async(
+                    clients.http, record["edit_uri"], title, markdown_content, draft=draft, target=target
+                )
+                status = STATUS_UPDATED if edit_uri else STATUS_FAILED
+            except HatenaEntryNotFoundError as e:
+                logger.warning(f"{e} Posting it as a new entry.")
+                record = None
 
-    logger.info("Converting to Markdown...")
-    markdown_content = convert_to_markdown(blocks)
+        if record is None:
+            logger.info(f"Posting to Hatena Blog with title: {title}")
+            if checkpoint is not None:
+                checkpoint.posting(markdown_content)
+            edit_uri = await post_to_hatena_async(clients.http, title, markdown_content, draft=draft, target=target)
+            status = STATUS_POSTED if edit_uri else STATUS_FAILED
 
-    logger.info(f"Posting to Hatena Blog with title: {title}")
-    post_to_hatena(title, markdown_content, draft=not publish)
+    _record_synced_entry(
+        edit_uri,
+        sync_state,
+        page_id,
+        last_edited_time,
+        content_hash,
+        draft,
+        checkpoint,
+        entry_index,
+        target,
+        images_uploaded,
+    )
+    return status
@@ -0,0 +1,275 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from src.controllers.batch_controller import DEFAULT_BATCH_CONCURRENCY, PageResult, _process_one
+from src.controllers.main_controller import STATUS_FAILED, extract_page_id, refresh_entry_index
+from src.models.entry_index import EntryIndex
+from src.models.hatena_target import get_hatena_targets
+from src.models.image_cache import ImageCache
+from src.models.journal import Journal
+from src.models.notion_fetcher import query_edited_pages
+from src.models.render_cache import RenderCache
+from src.models.sync_state import SyncState
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WATCH_INTERVAL_SECONDS = 60.0  # Notion をポーリングする間隔の既定値
+DEFAULT_WATCH_DEBOUNCE_SECONDS = 30.0  # 最後の編集を検出してから投稿するまでの待ち時間の既定値
+DEFAULT_WATCH_RETRY_SECONDS = 60.0  # 投稿に失敗したページを初めて再試行するまでの待ち時間の既定値
+_MAX_WATCH_RETRY_SECONDS = 3600.0  # 失敗が続くページの再試行の間隔の上限
+# Notion の last_edited_time は分単位に丸められるため、同じ分の間の編集は検出できない。
+# 編集日時から 1 分経ってから投稿することで、投稿後の編集が必ず新しい last_edited_time として見えるようにする
+_TIMESTAMP_RESOLUTION_SECONDS = 60.0
+_SEARCH_SOURCE = "search"  # データベースを指定しない場合の、カーソルの監視対象名
+
+
+def _parse_notion_time(value: str) -> float:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def _format_notion_time(timestamp: float) -> str:
+    # Notion と同じく分単位に丸めた形式にする
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:00.000Z")
+
+
+class PageWatcher:
+    """
+    Notion を定期的にポーリングし、編集されたページをはてなブログに自動で投稿・更新する監視モード。
+
+    - 検索 API（database_id を指定した場合はデータベースのクエリ）で、カーソル以降に編集されたページを取得する。
+    - 編集を検出したページは debounce 秒間（かつ編集日時から 1 分間）新しい編集がなければ、
+      ワーカープールで同期モードの投稿を行う。連続した編集は最後の1回だけ投稿する。
+    - カーソル（未処理のページより前の last_edited_time）は監視対象と投稿先の組み合わせごとに
+      同期状態のファイルに保存し、再起動後はその続きから監視する。
+    - Notion クライアント、HTTP セッション、画像・変換結果のキャッシュ、同期状態のストアは監視中ずっと共有する。
+    - 投稿に失敗したページは投稿待ちに戻し、失敗するたびに間隔を倍にして（最大 1 時間）再試行する。
+      カーソルは失敗したページの last_edited_time より先に進めない。
+    - stop_event がセットされると、投稿待ちのページは次回に回し、処理中のページの投稿を待ってから終了する。
+
+    Args:
+        database_id: 監視する Notion データベースの ID または URL。省略時はインテグレーションがアクセスできる全ページ。
+        publish: True の場合は公開状態で投稿する。
+        interval: ポーリングの間隔（秒）。省略時は環境変数 WATCH_INTERVAL_SECONDS（既定値 60）。
+        debounce: 最後の編集を検出してから投稿するまでの待ち時間（秒）。
+            省略時は環境変数 WATCH_DEBOUNCE_SECONDS（既定値 30）。
+        retry_interval: 投稿に失敗したページを初めて再試行するまでの待ち時間（秒）。
+            省略時は環境変数 WATCH_RETRY_SECONDS（既定値 60）。
+        max_workers: 同時に処理するページ数。省略時は環境変数 BATCH_CONCURRENCY（既定値 2）。
+        use_image_cache: True の場合は画像アップロードのキャッシュを使用する。
+        use_render_cache: True の場合はブロックの変換結果のキャッシュを使用する。
+        use_entry_index: True の場合は Notion のページへのリンクを、投稿済みのエントリへのリンクに置き換える。
+            エントリの索引は、投稿するページがあるときに更新する。
+        targets: 投稿先 (HatenaTarget) のリスト。省略時は環境変数 HATENA_TARGETS（なければ既定の投稿先）。
+    """
+
+    def __init__(
+        self,
+        database_id: str | None = None,
+        publish: bool = False,
+        interval: float | None = None,
+        debounce: float | None = None,
+        retry_interval: float | None = None,
+        max_workers: int | None = None,
+        use_image_cache: bool = True,
+        use_render_cache: bool = True,
+        use_entry_index: bool = True,
+        targets: list | None = None,
+    ):
+        if interval is None:
+            interval = float(os.environ.get("WATCH_INTERVAL_SECONDS", DEFAULT_WATCH_INTERVAL_SECONDS))
+        if debounce is None:
+            debounce = float(os.environ.get("WATCH_DEBOUNCE_SECONDS", DEFAULT_WATCH_DEBOUNCE_SECONDS))
+        if retry_interval is None:
+            retry_interval = float(os.environ.get("WATCH_RETRY_SECONDS", DEFAULT_WATCH_RETRY_SECONDS))
+        if max_workers is None:
+            max_workers = int(os.environ.get("BATCH_CONCURRENCY", DEFAULT_BATCH_CONCURRENCY))
+        self.database_id = extract_page_id(database_id) if database_id else None
+        self.publish = publish
+        self.interval = max(interval, 1.0)
+        self.debounce = max(debounce, 0.0)
+        self.retry_interval = max(retry_interval, 1.0)
+        self.max_workers = max(1, max_workers)
+        self.use_image_cache = use_image_cache
+        self.use_render_cache = use_render_cache
+        self.use_entry_index = use_entry_index
+        self.targets = targets or get_hatena_targets()
+
+        self._source = self.database_id or _SEARCH_SOURCE
+        self._cursor = None
+        self._pending = {}  # ページ ID -> (last_edited_time, 投稿する時刻)
+        self._in_flight = {}  # ページ ID -> (last_edited_time, Future)
+        self._done = {}  # ページ ID -> 処理済みの last_edited_time
+        self._failures = {}  # ページ ID -> (失敗した last_edited_time, 連続して失敗した回数)
+        self._results = []
+
+    def run(self, stop_event: threading.Event) -> list:
+        """
+        stop_event がセットされるまで監視を続ける。
+
+        Returns:
+            監視中に処理したページの PageResult のリスト。
+        """
+        hatena_user_id, hatena_blog_id = self._cursor_key()
+        image_cache = ImageCache() if self.use_image_cache else None
+        sync_state = SyncState()
+        render_cache = RenderCache() if self.use_render_cache else None
+        journal = Journal()
+        entry_index = EntryIndex() if self.use_entry_index else None
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="watch")
+        caches = (image_cache, sync_state, render_cache, journal, entry_index)
+
+        self._cursor = sync_state.get_watch_cursor(self._source, hatena_user_id, hatena_blog_id)
+        if self._cursor is None:
+            # 初回は起動以降の編集だけを対象にし、既存のページをすべて投稿し直さないようにする
+            self._cursor = _format_notion_time(time.time())
+        logger.info(f"Watching {self._source} for pages edited since {self._cursor} (every {self.interval:.0f}s).")
+
+        try:
+            while not stop_event.is_set():
+                self._poll()
+                self._collect_finished()
+                self._submit_due(executor, caches)
+                self._save_cursor(sync_state, hatena_user_id, hatena_blog_id)
+                if render_cache is not None:
+                    render_cache.flush()
+                stop_event.wait(self._next_wait())
+        finally:
+            if self._in_flight:
+                logger.info(f"Stopping: waiting for {len(self._in_flight)} pages being posted.")
+            executor.shutdown(wait=True)
+            self._collect_finished()
+            self._save_cursor(sync_state, hatena_user_id, hatena_blog_id)
+            if self._pending:
+                logger.info(f"{len(self._pending)} edited pages will be posted after the next start.")
+            if image_cache is not None:
+                image_cache.evict()
+                image_cache.close()
+            sync_state.close()
+            if render_cache is not None:
+                render_cache.evict()
+                render_cache.close()
+            journal.evict()
+            journal.close()
+            if entry_index is not None:
+                entry_index.close()
+        return self._results
+
+    def _cursor_key(self) -> tuple:
+        """
+        カーソルを保存するキー（はてなのユーザー ID, ブログ ID）を投稿先から作る。
+
+        投稿先が1つの場合はそのユーザー ID とブログ ID、複数の場合は投稿先の順序によらないよう並べ替えて
+        カンマで連結したものにする。投稿先の組み合わせが異なる監視とはカーソルを共有しない。
+        """
+        pairs = sorted({(target.user_id, target.blog_id) for target in self.targets})
+        return ",".join(user_id for user_id, _ in pairs), ",".join(blog_id for _, blog_id in pairs)
+
+    def _poll(self):
+        try:
+            pages = query_edited_pages(self._cursor, self.database_id)
+        except Exception as e:
+            # 一時的な通信エラーなどで監視を止めないよう、次のポーリングで再試行する
+            logger.error(f"Failed to poll Notion for edited pages: {e}", exc_info=True)
+            return
+
+        now = time.time()
+        for page_id, last_edited_time in pages:
+            if not last_edited_time or self._done.get(page_id) == last_edited_time:
+                continue
+            if page_id in self._in_flight and self._in_flight[page_id][0] == last_edited_time:
+                continue
+            if page_id in self._pending and self._pending[page_id][0] == last_edited_time:
+                continue
+            due_at = max(now + self.debounce, _parse_notion_time(last_edited_time) + _TIMESTAMP_RESOLUTION_SECONDS)
+            if page_id not in self._pending:
+                logger.info(f"Detected an edit of page {page_id} ({last_edited_time}).")
+            self._pending[page_id] = (last_edited_time, due_at)
+
+    def _submit_due(self, executor: ThreadPoolExecutor, caches: tuple):
+        image_cache, sync_state, render_cache, journal, entry_index = caches
+        now = time.time()
+        # 同じページの投稿が処理中の場合は、終わってから投稿する
+        due = [
+            (page_id, last_edited_time)
+            for page_id, (last_edited_time, due_at) in self._pending.items()
+            if due_at <= now and page_id not in self._in_flight
+        ]
+        if due and entry_index is not None:
+            for target in self.targets:
+                refresh_entry_index(entry_index, target=target)
+        for page_id, last_edited_time in due:
+            del self._pending[page_id]
+            future = executor.submit(
+                _process_one,
+                page_id,
+                self.publish,
+                image_cache,
+                sync_state,
+                True,
+                render_cache,
+                journal=journal,
+                entry_index=entry_index,
+                targets=self.targets,
+            )
+            self._in_flight[page_id] = (last_edited_time, future)
+
+    def _collect_finished(self):
+        for page_id, (last_edited_time, future) in list(self._in_flight.items()):
+            if not future.done():
+                continue
+            del self._in_flight[page_id]
+            result = self._get_result(page_id, future)
+            self._results.append(result)
+            message = f"[{result.status:>9}] {result.elapsed:7.2f}s  {page_id}"
+            if len(self.targets) > 1 and result.target_statuses:
+                message += "  " + ", ".join(f"{name}: {status}" for name, status in result.target_statuses.items())
+            if result.error:
+                message += f"  ({result.error})"
+            if result.status == STATUS_FAILED:
+                message += self._schedule_retry(page_id, last_edited_time)
+            else:
+                self._failures.pop(page_id, None)
+                self._done[page_id] = last_edited_time
+            logger.info(message)
+
+    def _schedule_retry(self, page_id: str, last_edited_time: str) -> str:
+        # 失敗したページは投稿待ちに戻し、カーソルがその編集日時より先に進まないようにする
+        failed_time, failures = self._failures.get(page_id, (None, 0))
+        failures = failures + 1 if failed_time == last_edited_time else 1
+        self._failures[page_id] = (last_edited_time, failures)
+        if page_id in self._pending:
+            # 処理中に新しい編集を検出していれば、その投稿で再試行する
+            return ""
+        delay = min(self.retry_interval * 2 ** (failures - 1), _MAX_WATCH_RETRY_SECONDS)
+        self._pending[page_id] = (last_edited_time, time.time() + delay)
+        return f"  retry #{failures} in {delay:.0f}s"
+
+    @staticmethod
+    def _get_result(page_id: str, future: Future) -> PageResult:
+        try:
+            return future.result()
+        except Exception as e:
+            return PageResult(page_id, STATUS_FAILED, 0.0, str(e))
+
+    def _save_cursor(self, sync_state: SyncState, hatena_user_id: str, hatena_blog_id: str):
+        # 未処理（再試行待ちを含む）のページがあればその編集日時まで、なければ処理済みの最新の編集日時まで
+        # カーソルを進める。
+        # 検索は同じ日時を含めて行うため、同じ分に編集された別のページを取りこぼさない
+        unfinished = [t for t, _ in self._pending.values()] + [t for t, _ in self._in_flight.values()]
+        cursor = min(unfinished) if unfinished else max(self._done.values(), default=self._cursor)
+        cursor = max(cursor, self._cursor)
+        if cursor != self._cursor:
+            self._cursor = cursor
+            sync_state.put_watch_cursor(self._source, hatena_user_id, hatena_blog_id, cursor)
+        # カーソルより前の処理済みのページは、検索結果に現れないため忘れてよい
+        self._done = {page_id: t for page_id, t in self._done.items() if t >= cursor}
+
+    def _next_wait(self) -> float:
+        if not self._pending:
+            return self.interval
+        next_due = min(due_at for _, due_at in self._pending.values())
+        return min(self.interval, max(next_due - time.time(), 0.1))
@@ -0,0 +1,136 @@
+import sys
+
+# 変換に使用しないため、コンパクトなブロックに保持しないブロックの種類ごとの値
+_OMITTED_PAYLOAD_KEYS = frozenset(("color", "caption"))
+
+
+class CompactRichText:
+    """
+    リッチテキストのうち、変換に使用するテキスト、リンク、ページのメンションだけを保持する要素。
+
+    annotations や text などの値は保持しない。変換処理からは dict と同じく get で値を取得できる。
+    """
+
+    __slots__ = ("plain_text", "href", "mention")
+
+    def __init__(self, plain_text: str, href: str | None = None, mention: dict | None = None):
+        self.plain_text = plain_text
+        self.href = href
+        self.mention = mention
+
+    def get(self, key: str, default=None):
+        """
+        dict.get と同様に値を返す。値が None のキーは、存在しないものとして default を返す。
+        """
+        value = getattr(self, key) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def __repr__(self) -> str:
+        return f"CompactRichText({self.plain_text!r}, href={self.href!r})"
+
+
+class CompactBlock:
+    """
+    Notion の API が返すブロックのうち、変換に使用する値だけを保持するブロック。
+
+    ブロックの種類ごとの値 (payload) は、色とキャプションを除き、リッチテキストを CompactRichText にして保持する。
+    作成者・作成日時・親ブロックなどのメタデータは保持しない。ブロックの種類と last_edited_time は
+    多くのブロックで同じ値になるため、文字列をインターンして共有する。
+
+    変換処理からは dict のブロックと同じく block["id"]、block.get("children", [])、block[block["type"]] で
+    値を取得できるため、Markdown への変換 (convert_to_markdown など) にそのまま渡せる。
+    """
+
+    __slots__ = ("id", "type", "last_edited_time", "has_children", "payload", "children")
+
+    def __init__(
+        self,
+        block_id: str,
+        block_type: str | None,
+        last_edited_time: str | None = None,
+        has_children: bool = False,
+        payload: dict | None = None,
+        children: tuple | None = None,
+    ):
+        self.id = block_id
+        self.type = block_type
+        self.last_edited_time = last_edited_time
+        self.has_children = has_children
+        self.payload = payload
+        self.children = children
+
+    def get(self, key: str, default=None):
+        """
+        dict.get と同様に値を返す。ブロックの種類と同じ名前のキーでは payload を返す。
+        値が None のキーは、存在しないものとして default を返す。
+        """
+        if key == self.type:
+            value = self.payload
+        elif key in self.__slots__ and key != "payload":
+            value = getattr(self, key)
+        else:
+            value = None
+        return default if value is None else value
+
+    def __getitem__(self, key: str):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __repr__(self) -> str:
+        return f"CompactBlock({self.id!r}, {self.type!r})"
+
+
+def _compact_rich_texts(rich_texts: list) -> tuple:
+    compact = []
+    for rich_text in rich_texts:
+        mention = rich_text.get("mention")
+        if mention and mention.get("type") == "page":
+            mention = {"type": "page", "page": {"id": mention["page"]["id"]}}
+        else:
+            mention = None
+        compact.append(CompactRichText(rich_text.get("plain_text", ""), rich_text.get("href"), mention))
+    return tuple(compact)
+
+
+def _compact_payload(payload):
+    if not isinstance(payload, dict):
+        return payload
+    compact = {}
+    for key, value in payload.items():
+        if key in _OMITTED_PAYLOAD_KEYS:
+            continue
+        if key == "rich_text":
+            value = _compact_rich_texts(value)
+        elif key == "cells":
+            value = tuple(_compact_rich_texts(cell) for cell in value)
+        compact[sys.intern(key)] = value
+    return compact
+
+
+def compact_block(block: dict) -> CompactBlock:
+    """
+    Notion の API が返したブロックを CompactBlock に変換する。children がある場合は子孫ブロックも変換する。
+
+    Args:
+        block: blocks.children.list の結果のブロック。
+
+    Returns:
+        変換に使用する値だけを保持するブロック。
+    """
+    block_type = block.get("type")
+    if block_type is not None:
+        block_type = sys.intern(block_type)
+    last_edited_time = block.get("last_edited_time")
+    if last_edited_time is not None:
+        last_edited_time = sys.intern(last_edited_time)
+    children = block.get("children")
+    return CompactBlock(
+        block["id"],
+        block_type,
+        last_edited_time,
+        bool(block.get("has_children")),
+        _compact_payload(block.get(block_type)) if block_type else None,
+        tuple(compact_block(child) for child in children) if children is not None else None,
+    )
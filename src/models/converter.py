@@ -1,11 +1,86 @@
-from src.models.hatena_poster import upload_image_to_hatena_photolife
+import hashlib
+import re
+import time
+from collections.abc import Callable, Iterable, Iterator
 
+from src.models.entry_index import normalize_page_id
+from src.models.hatena_poster import upload_images_to_hatena_photolife
+from src.models.image_cache import ImageCache
+from src.models.image_job import ImageJob
+from src.models.render_cache import RenderCache
+from src.utils.metrics import get_metrics
 
-def _rich_texts_to_markdown(rich_texts: list) -> str:
+# 画像ブロックの位置に埋め込むプレースホルダー。アップロード後にはてな記法へ置換する。
+# 置換漏れがあっても記事上に表示されないよう HTML コメントの形式にしている。
+IMAGE_PLACEHOLDER = "<!-- notion-to-hatena:image:{index} -->"
+_IMAGE_PLACEHOLDER_PATTERN = re.compile(r"<!-- notion-to-hatena:image:(\d+) -->")
+
+# 複数の投稿先に投稿する場合に、Notion のページへのリンクの URL の位置に埋め込むプレースホルダー。
+# 投稿先ごとに、そのブログのエントリの URL へ置換する。
+PAGE_LINK_PLACEHOLDER = "<!-- notion-to-hatena:page:{page_id} -->"
+_PAGE_LINK_PLACEHOLDER_PATTERN = re.compile(r"<!-- notion-to-hatena:page:([0-9a-f]{32}) -->")
+_PAGE_EMBED_PLACEHOLDER_PATTERN = re.compile(r"\[<!-- notion-to-hatena:page:([0-9a-f]{32}) -->:embed\]")
+_NOTION_PAGE_URL = "https://www.notion.so/{page_id}"
+
+# Notion のページへのリンク (https://www.notion.so/...、https://*.notion.site/...、ワークスペース内の /...) の
+# 末尾のページ ID
+_NOTION_PAGE_LINK_PATTERN = re.compile(
+    r"^(?:https?://(?:www\.)?notion\.so|https?://[\w-]+\.notion\.site)?/(?:[^?#]*[/-])?([0-9a-fA-F]{32})(?:[?#].*)?$"
+)
+
+# 変換結果のキャッシュのキーに含めるバージョン。レンダラーの出力を変更した場合は値を上げる。
+RENDER_CACHE_VERSION = 2
+
+# コールアウトのアイコン（絵文字）と CSS クラスの対応
+CALLOUT_CLASSES = {
+    "💡": "callout-info",
+    "ℹ️": "callout-info",
+    "⚠️": "callout-warning",
+    "🔥": "callout-danger",
+    "✅": "callout-success",
+}
+
+BLOCK_SEPARATOR = "\n\n"
+_NESTED_INDENT = "    "
+
+# ブロックの種類ごとのレンダラー。register_block_renderer で追加・上書きできる。
+_block_renderers: dict[str, Callable[[dict, "RenderContext"], str | None]] = {}
+
+
+def _linked_page_id(rich_text: dict) -> str | None:
+    """
+    ページのメンション、または Notion のページへのリンクから、リンク先のページ ID を取り出す。
+    """
+    mention = rich_text.get("mention")
+    if mention and mention.get("type") == "page":
+        return normalize_page_id(mention["page"]["id"])
+    match = _NOTION_PAGE_LINK_PATTERN.match(rich_text.get("href") or "")
+    return match.group(1).lower() if match else None
+
+
+def _iter_linked_page_ids(block: dict) -> Iterator[str]:
+    """
+    ブロック（子孫は含まない）からリンクしている Notion のページ ID を返す。
+    """
+    block_type = block.get("type")
+    payload = block.get(block_type) or {}
+    if block_type == "link_to_page" and payload.get("type") == "page_id":
+        yield normalize_page_id(payload["page_id"])
+    for rich_texts in [payload.get("rich_text") or [], *(payload.get("cells") or [])]:
+        for rich_text in rich_texts:
+            page_id = _linked_page_id(rich_text)
+            if page_id:
+                yield page_id
+
+
+def _rich_texts_to_markdown(rich_texts: list, context: "RenderContext | None" = None) -> str:
     line_parts = []
     for rich_text in rich_texts:
         text_content = rich_text.get("plain_text", "")
         link_info = rich_text.get("href")
+        # 投稿済みの Notion のページへのリンクは、はてなブログのエントリへのリンクにする
+        if link_info and context is not None:
+            link_info = context.get_page_url(_linked_page_id(rich_text)) or link_info
 
         if link_info:
             if text_content == link_info:
@@ -22,104 +97,481 @@ def _rich_texts_to_plain_text(rich_texts: list) -> str:
     return "".join([t.get("plain_text", "") for t in rich_texts])
 
 
-def convert_to_markdown(blocks: list) -> str:
+def convert_to_markdown(
+    blocks: list,
+    max_workers: int | None = None,
+    cache: ImageCache | None = None,
+    render_cache: RenderCache | None = None,
+) -> str:
     """
     Converts a list of Notion blocks to a Markdown string.
 
+    画像はプレースホルダーとして変換した後、まとめて並行アップロードしてから置換する。
+
     Args:
-        blocks: A list of Notion block objects.
+        blocks: A list of Notion block objects. API の応答の dict と CompactBlock のどちらも変換できる。
+        max_workers: 画像アップロードの並列数。省略時は HATENA_UPLOAD_CONCURRENCY を使用する。
+        cache: 画像アップロードのキャッシュ。None の場合はキャッシュを使用しない。
+        render_cache: ブロックの変換結果のキャッシュ。変更のないブロックは変換を省略する。
 
     Returns:
         A string in Markdown format.
     """
-    markdown_lines = []
+    markdown_content, image_jobs = render_markdown_with_placeholders(blocks, render_cache)
+    image_syntaxes = upload_images_to_hatena_photolife(image_jobs, max_workers=max_workers, cache=cache)
+    return substitute_image_placeholders(markdown_content, image_jobs, image_syntaxes)
+
+
+def substitute_image_placeholders(markdown_content: str, image_jobs: list, image_syntaxes: list) -> str:
+    """
+    プレースホルダーをアップロード結果のはてな記法に置換する。
+    アップロードに失敗した画像 (None) は元の Notion の URL にフォールバックする。
+
+    Args:
+        markdown_content: render_markdown_with_placeholders が返した Markdown。
+        image_jobs: プレースホルダーの番号順に並んだ画像 (ImageJob) のリスト。
+        image_syntaxes: image_jobs と同じ順序のアップロード結果のリスト。
+
+    Returns:
+        画像を埋め込んだ Markdown。
+    """
+    replacements = [
+        image_syntax if image_syntax else f"![image]({image_job.url})"
+        for image_job, image_syntax in zip(image_jobs, image_syntaxes)
+    ]
+
+    def replace(match: re.Match) -> str:
+        index = int(match.group(1))
+        return replacements[index] if index < len(replacements) else match.group(0)
+
+    return _IMAGE_PLACEHOLDER_PATTERN.sub(replace, markdown_content)
+
+
+def substitute_page_link_placeholders(markdown_content: str, page_urls: dict) -> str:
+    """
+    Notion のページへのリンクのプレースホルダーを、投稿先のブログのエントリの URL に置換する。
+    投稿先に投稿されていないページへのリンクは Notion のページの URL にし、link_to_page の埋め込みは削除する。
+
+    Args:
+        markdown_content: defer_page_links を指定した RenderContext で変換した Markdown。
+        page_urls: 投稿先のブログの、Notion のページ ID -> エントリの URL の辞書 (EntryIndex.get_urls)。
+
+    Returns:
+        リンクを置換した Markdown。
+    """
+
+    def replace_embed(match: re.Match) -> str:
+        url = page_urls.get(match.group(1))
+        return f"[{url}:embed]" if url else ""
+
+    def replace_link(match: re.Match) -> str:
+        page_id = match.group(1)
+        return page_urls.get(page_id) or _NOTION_PAGE_URL.format(page_id=page_id)
+
+    markdown_content = _PAGE_EMBED_PLACEHOLDER_PATTERN.sub(replace_embed, markdown_content)
+    return _PAGE_LINK_PLACEHOLDER_PATTERN.sub(replace_link, markdown_content)
+
+
+class RenderContext:
+    """
+    1回の変換処理で共有する状態。
+
+    Attributes:
+        image_jobs: 変換中に見つかった画像 (ImageJob) のリスト。プレースホルダーの番号順に並ぶ。
+        on_image: 画像が見つかるたびに呼び出すコールバック。変換と並行してアップロードを始める場合に使用する。
+        render_cache: ページ直下のブロックの変換結果のキャッシュ。None の場合はキャッシュを使用しない。
+        page_urls: Notion のページ ID（ハイフンなし）-> はてなブログのエントリの URL の辞書 (EntryIndex.get_urls)。
+            ページのメンションやリンクのうち、辞書にあるページへのものはエントリの URL に置き換える。
+        defer_page_links: True の場合は page_urls の代わりに、Notion のページへのリンクをすべて
+            PAGE_LINK_PLACEHOLDER にする。変換結果を複数の投稿先で共有し、投稿先ごとに置換する場合に使用する。
+    """
+
+    def __init__(
+        self,
+        on_image: Callable[[ImageJob], None] | None = None,
+        render_cache: RenderCache | None = None,
+        page_urls: dict | None = None,
+        defer_page_links: bool = False,
+    ):
+        self.image_jobs = []
+        self.on_image = on_image
+        self.render_cache = render_cache
+        self.page_urls = page_urls or {}
+        self.defer_page_links = defer_page_links
+
+    def get_page_url(self, page_id: str | None) -> str | None:
+        """
+        Notion のページ ID に対応するはてなブログのエントリの URL を返す。投稿されていない場合は None。
+        """
+        if page_id is None:
+            return None
+        if self.defer_page_links:
+            return PAGE_LINK_PLACEHOLDER.format(page_id=page_id)
+        return self.page_urls.get(page_id)
+
+    def add_image(self, image_job: ImageJob) -> str:
+        """
+        画像を登録し、その位置に埋め込むプレースホルダーを返す。
+        """
+        placeholder = IMAGE_PLACEHOLDER.format(index=len(self.image_jobs))
+        self.image_jobs.append(image_job)
+        if self.on_image is not None:
+            self.on_image(image_job)
+        return placeholder
+
+    def render_children(self, block: dict) -> str:
+        """
+        ブロックの子要素 (children) を Markdown に変換する。
+        """
+        return "".join(_iter_rendered(block.get("children", []), self, top_level=False))
+
+
+def register_block_renderer(block_type: str, renderer: Callable[[dict, RenderContext], str | None] | None = None):
+    """
+    ブロックの種類に対応するレンダラーを登録する。デコレーターとしても使用できる。
+
+    レンダラーはブロックと RenderContext を受け取り、Markdown の文字列を返す。
+    None を返した場合、そのブロックは出力しない。
+    ブロックは API の応答の dict か CompactBlock のため、値は block.get や block[...] で取得する。
+    CompactBlock はブロックの種類ごとの値の色とキャプション、リッチテキストの装飾を保持しない
+    （CompactBlock は compact_blocks を指定した場合と、バッチモードでだけ使用する。
+    バッチモードで色やキャプションを使用するレンダラーを登録する場合は、--no-compact-blocks
+    または process_batch(compact_blocks=False) で無効にする）。
+
+    Args:
+        block_type: Notion のブロックの種類 (例: "toggle")。
+        renderer: レンダラー。省略した場合はデコレーターを返す。
+    """
+
+    def decorator(func):
+        _block_renderers[block_type] = func
+        return func
+
+    if renderer is not None:
+        return decorator(renderer)
+    return decorator
+
+
+def render_block(block: dict, context: RenderContext) -> str | None:
+    """
+    ブロックを1つ Markdown に変換する。対応するレンダラーがないブロックは None を返す。
+    """
+    renderer = _block_renderers.get(block.get("type"))
+    if renderer is None:
+        return None
+    return renderer(block, context)
+
+
+def iter_markdown(blocks: Iterable[dict], context: RenderContext | None = None) -> Iterator[str]:
+    """
+    Notion のブロックを変換しながら、Markdown を少しずつ返すジェネレーター。
+    返された文字列をすべて連結すると、変換結果の Markdown になる。
+
+    Args:
+        blocks: Notion のブロック（dict または CompactBlock）のリスト、またはブロックを順に返すイテレーター
+            (iter_blocks_recursively など)。
+        context: 変換中の状態。画像は context.image_jobs に収集される。
+
+    Yields:
+        Markdown の断片。
+    """
+    if context is None:
+        context = RenderContext()
+    return _iter_rendered(blocks, context, top_level=True)
+
+
+def _iter_rendered(blocks: Iterable[dict], context: RenderContext, top_level: bool) -> Iterator[str]:
+    metrics = get_metrics()
+    use_cache = top_level and context.render_cache is not None
+    is_first = True
     for block in blocks:
-        block_type = block.get("type")
-
-        if block_type == "heading_1":
-            text = _rich_texts_to_markdown(block["heading_1"].get("rich_text", []))
-            markdown_lines.append(f"# {text}")
-        elif block_type == "heading_2":
-            text = _rich_texts_to_markdown(block["heading_2"].get("rich_text", []))
-            markdown_lines.append(f"## {text}")
-        elif block_type == "heading_3":
-            text = _rich_texts_to_markdown(block["heading_3"].get("rich_text", []))
-            markdown_lines.append(f"### {text}")
-        elif block_type == "paragraph":
-            full_line = _rich_texts_to_markdown(block["paragraph"].get("rich_text", []))
-
-            # Handle multi-line paragraphs by adding markdown line breaks
-            processed_line = "  \n".join(full_line.split("\n"))
-            markdown_lines.append(processed_line)
-
-        elif block_type == "bulleted_list_item":
-            text = _rich_texts_to_markdown(block["bulleted_list_item"].get("rich_text", []))
-            markdown_lines.append(f"- {text}")
-        elif block_type == "numbered_list_item":
-            text = _rich_texts_to_markdown(block["numbered_list_item"].get("rich_text", []))
-            markdown_lines.append(f"1. {text}")
-        elif block_type == "code":
-            text = _rich_texts_to_plain_text(block["code"].get("rich_text", []))
-            language = block["code"]["language"]
-            markdown_lines.append(f'```"{language}"\n{text}\n```')
-        elif block_type == "quote":
-            text = _rich_texts_to_markdown(block["quote"].get("rich_text", []))
-            markdown_lines.append(f"> {text}")
-        elif block_type == "image":
-            notion_image_url = block["image"]["file"]["url"]
-            hatena_image_url = upload_image_to_hatena_photolife(notion_image_url)
-            if hatena_image_url:
-                markdown_lines.append(hatena_image_url)
-            else:
-                # Fallback to original URL if upload fails
-                markdown_lines.append(f"![image]({notion_image_url})")
-        elif block_type in ["bookmark", "link_preview", "embed"]:
-            url = block.get(block_type, {}).get("url")
-            if url:
-                markdown_lines.append(f"[{url}:embed]")
-        elif block_type == "callout":
-            icon_emoji = block.get("callout", {}).get("icon", {}).get("emoji", "📣")
-            text = _rich_texts_to_markdown(block["callout"].get("rich_text", []))
-
-            emoji_to_class = {
-                "💡": "callout-info",
-                "ℹ️": "callout-info",
-                "⚠️": "callout-warning",
-                "🔥": "callout-danger",
-                "✅": "callout-success",
-            }
-            callout_class = emoji_to_class.get(icon_emoji, "callout-default")
-
-            html = f"""<div class="callout {callout_class}">
+        if top_level:
+            started_at = time.perf_counter()
+            text = _render_block_cached(block, context) if use_cache else render_block(block, context)
+            # 取得と並行して動くため、変換にかかった時間はページ直下のブロックごとに記録する
+            metrics.add_span("convert.render_block", time.perf_counter() - started_at)
+        else:
+            text = render_block(block, context)
+        if text is None:
+            continue
+        if not is_first:
+            yield BLOCK_SEPARATOR
+        yield text
+        is_first = False
+
+
+def _fingerprint_block(block: dict, context: RenderContext) -> tuple[str, dict]:
+    """
+    ブロックツリーに含まれる全ブロックの ID、種類、last_edited_time から、変換結果のキャッシュのキーを求める。
+
+    Notion では子ブロックを編集しても親ブロックの last_edited_time は更新されないため、
+    ページ直下のブロックだけでなく、子孫ブロックもすべてキーに含める。
+    リンク先のページが投稿された場合に変換し直すよう、リンクしているページのエントリの URL もキーに含める。
+
+    Returns:
+        (フィンガープリント, ブロックツリーに含まれる画像ブロック ID -> 画像ブロック) のタプル。
+    """
+    digest = hashlib.sha256(str(RENDER_CACHE_VERSION).encode("ascii"))
+    image_blocks = {}
+    stack = [block]
+    while stack:
+        current = stack.pop()
+        if current is None:
+            digest.update(b")")
+            continue
+        digest.update(f"({current.get('id')}|{current.get('type')}|{current.get('last_edited_time')}".encode())
+        if current.get("type") == "image":
+            image_blocks[current.get("id")] = current
+        for page_id in _iter_linked_page_ids(current):
+            digest.update(f"[{page_id}|{context.get_page_url(page_id)}]".encode())
+        stack.append(None)
+        stack.extend(reversed(current.get("children", [])))
+    return digest.hexdigest(), image_blocks
+
+
+def _render_block_cached(block: dict, context: RenderContext) -> str | None:
+    """
+    ページ直下のブロックを、変換結果のキャッシュを使用して Markdown に変換する。
+
+    キャッシュにはプレースホルダーの番号をブロック内での番号に振り直した Markdown と、画像ブロックの ID を保存する。
+    キャッシュから復元する場合は、画像の URL を今回取得したブロックのものにして登録し直す。
+    """
+    block_id = block.get("id")
+    if not block_id:
+        return render_block(block, context)
+
+    fingerprint, image_blocks = _fingerprint_block(block, context)
+    cached = context.render_cache.get(block_id, fingerprint)
+    if cached is not None:
+        markdown, image_block_ids = cached
+        if all(image_block_id in image_blocks for image_block_id in image_block_ids):
+            placeholders = [
+                context.add_image(make_image_job(image_blocks[image_block_id])) for image_block_id in image_block_ids
+            ]
+            if markdown is None:
+                return None
+            return _IMAGE_PLACEHOLDER_PATTERN.sub(lambda match: placeholders[int(match.group(1))], markdown)
+
+    first_image = len(context.image_jobs)
+    text = render_block(block, context)
+    image_jobs = context.image_jobs[first_image:]
+    if any(image_job.block_id is None for image_job in image_jobs):
+        return text
+
+    local_text = text
+    if text is not None and image_jobs:
+        local_text = _IMAGE_PLACEHOLDER_PATTERN.sub(
+            lambda match: IMAGE_PLACEHOLDER.format(index=int(match.group(1)) - first_image), text
+        )
+    context.render_cache.put(block_id, fingerprint, local_text, [image_job.block_id for image_job in image_jobs])
+    return text
+
+
+def render_markdown_with_placeholders(
+    blocks: list, render_cache: RenderCache | None = None, page_urls: dict | None = None
+) -> tuple[str, list]:
+    """
+    Converts a list of Notion blocks to Markdown without uploading images.
+
+    画像ブロックは IMAGE_PLACEHOLDER に置き換え、対応する画像 (ImageJob) を出現順に収集する。
+
+    Args:
+        blocks: A list of Notion block objects.
+        render_cache: ブロックの変換結果のキャッシュ。None の場合はキャッシュを使用しない。
+        page_urls: Notion のページ ID -> はてなブログのエントリの URL の辞書。リンクの置き換えに使用する。
+
+    Returns:
+        プレースホルダー入りの Markdown と、画像 (ImageJob) のリストのタプル。
+    """
+    context = RenderContext(render_cache=render_cache, page_urls=page_urls)
+    markdown_content = "".join(iter_markdown(blocks, context))
+    return markdown_content, context.image_jobs
+
+
+def _indent(text: str) -> str:
+    return "\n".join(_NESTED_INDENT + line if line else line for line in text.split("\n"))
+
+
+def _with_nested_children(text: str, block: dict, context: RenderContext) -> str:
+    """
+    子要素をインデントしてブロックの後ろに続ける（リスト項目の入れ子など）。
+    """
+    children = context.render_children(block)
+    if not children:
+        return text
+    return f"{text}{BLOCK_SEPARATOR}{_indent(children)}"
+
+
+def _with_children(text: str, block: dict, context: RenderContext) -> str:
+    """
+    子要素をインデントせずにブロックの後ろに続ける。
+    """
+    children = context.render_children(block)
+    if not children:
+        return text
+    return f"{text}{BLOCK_SEPARATOR}{children}"
+
+
+def _make_heading_renderer(block_type: str, prefix: str):
+    def render(block: dict, context: RenderContext) -> str:
+        text = _rich_texts_to_markdown(block[block_type].get("rich_text", []), context)
+        return _with_children(f"{prefix} {text}", block, context)
+
+    return render
+
+
+for _level in (1, 2, 3):
+    register_block_renderer(f"heading_{_level}", _make_heading_renderer(f"heading_{_level}", "#" * _level))
+
+
+@register_block_renderer("paragraph")
+def _render_paragraph(block: dict, context: RenderContext) -> str:
+    full_line = _rich_texts_to_markdown(block["paragraph"].get("rich_text", []), context)
+
+    # Handle multi-line paragraphs by adding markdown line breaks
+    processed_line = "  \n".join(full_line.split("\n"))
+    return _with_children(processed_line, block, context)
+
+
+@register_block_renderer("bulleted_list_item")
+def _render_bulleted_list_item(block: dict, context: RenderContext) -> str:
+    text = _rich_texts_to_markdown(block["bulleted_list_item"].get("rich_text", []), context)
+    return _with_nested_children(f"- {text}", block, context)
+
+
+@register_block_renderer("numbered_list_item")
+def _render_numbered_list_item(block: dict, context: RenderContext) -> str:
+    text = _rich_texts_to_markdown(block["numbered_list_item"].get("rich_text", []), context)
+    return _with_nested_children(f"1. {text}", block, context)
+
+
+@register_block_renderer("to_do")
+def _render_to_do(block: dict, context: RenderContext) -> str:
+    text = _rich_texts_to_markdown(block["to_do"].get("rich_text", []), context)
+    checkbox = "[x]" if block["to_do"].get("checked") else "[ ]"
+    return _with_nested_children(f"- {checkbox} {text}", block, context)
+
+
+@register_block_renderer("code")
+def _render_code(block: dict, context: RenderContext) -> str:
+    text = _rich_texts_to_plain_text(block["code"].get("rich_text", []))
+    language = block["code"]["language"]
+    return f'```"{language}"\n{text}\n```'
+
+
+@register_block_renderer("quote")
+def _render_quote(block: dict, context: RenderContext) -> str:
+    text = _rich_texts_to_markdown(block["quote"].get("rich_text", []), context)
+    quoted = _with_children(text, block, context)
+    return "\n".join(f"> {line}" if line else ">" for line in quoted.split("\n"))
+
+
+def make_image_job(block: dict) -> ImageJob:
+    """
+    画像ブロックからアップロードする画像の情報を作成する。
+    Notion にアップロードされた画像 (file) の URL は有効期限付き、外部の画像 (external) の URL は期限なしとして扱う。
+    """
+    image = block["image"]
+    image_file = image.get(image.get("type"), {})
+    return ImageJob(
+        image_file.get("url", ""), block.get("id"), block.get("last_edited_time"), image_file.get("expiry_time")
+    )
+
+
+@register_block_renderer("image")
+def _render_image(block: dict, context: RenderContext) -> str:
+    return context.add_image(make_image_job(block))
+
+
+def _render_embed(block: dict, context: RenderContext) -> str | None:
+    url = block.get(block["type"], {}).get("url")
+    if url:
+        return f"[{url}:embed]"
+    return None
+
+
+for _block_type in ("bookmark", "link_preview", "embed"):
+    register_block_renderer(_block_type, _render_embed)
+
+
+@register_block_renderer("link_to_page")
+def _render_link_to_page(block: dict, context: RenderContext) -> str | None:
+    # 投稿済みのページへのリンクだけを、エントリの埋め込みとして出力する
+    link = block.get("link_to_page", {})
+    if link.get("type") != "page_id":
+        return None
+    url = context.get_page_url(normalize_page_id(link["page_id"]))
+    return f"[{url}:embed]" if url else None
+
+
+@register_block_renderer("callout")
+def _render_callout(block: dict, context: RenderContext) -> str:
+    icon_emoji = block.get("callout", {}).get("icon", {}).get("emoji", "📣")
+    text = _rich_texts_to_markdown(block["callout"].get("rich_text", []), context)
+    callout_class = CALLOUT_CLASSES.get(icon_emoji, "callout-default")
+
+    children = context.render_children(block)
+    content = f"<p>{text}</p>"
+    if children:
+        content = f"{content}{BLOCK_SEPARATOR}{children}{BLOCK_SEPARATOR}"
+
+    return f"""<div class="callout {callout_class}">
 <div class="callout-icon">{icon_emoji}</div>
-<div class="callout-content"><p>{text}</p></div>
+<div class="callout-content">{content}</div>
 </div>"""
-            markdown_lines.append(html)
-        elif block_type == "table":
-            table_rows = block.get("children", [])
-            if not table_rows:
-                continue
-
-            has_header = block.get("table", {}).get("has_column_header", False)
-            html_table = "<table>"
-
-            if has_header:
-                header_row = table_rows[0]
-                html_table += "<thead><tr>"
-                for cell in header_row.get("table_row", {}).get("cells", []):
-                    cell_text = _rich_texts_to_markdown(cell)
-                    html_table += f"<th>{cell_text}</th>"
-                html_table += "</tr></thead>"
-                table_rows = table_rows[1:]  # Remove header row
-
-            html_table += "<tbody>"
-            for row in table_rows:
-                html_table += "<tr>"
-                for cell in row.get("table_row", {}).get("cells", []):
-                    cell_text = _rich_texts_to_markdown(cell)
-                    html_table += f"<td>{cell_text}</td>"
-                html_table += "</tr>"
-            html_table += "</tbody></table>"
-            markdown_lines.append(html_table)
-
-    return "\n\n".join(markdown_lines)
+
+
+@register_block_renderer("table")
+def _render_table(block: dict, context: RenderContext) -> str | None:
+    table_rows = block.get("children", [])
+    if not table_rows:
+        return None
+
+    has_header = block.get("table", {}).get("has_column_header", False)
+    parts = ["<table>"]
+
+    if has_header:
+        header_row = table_rows[0]
+        parts.append("<thead><tr>")
+        for cell in header_row.get("table_row", {}).get("cells", []):
+            parts.append(f"<th>{_rich_texts_to_markdown(cell, context)}</th>")
+        parts.append("</tr></thead>")
+        table_rows = table_rows[1:]  # Remove header row
+
+    parts.append("<tbody>")
+    for row in table_rows:
+        parts.append("<tr>")
+        for cell in row.get("table_row", {}).get("cells", []):
+            parts.append(f"<td>{_rich_texts_to_markdown(cell, context)}</td>")
+        parts.append("</tr>")
+    parts.append("</tbody></table>")
+    return "".join(parts)
+
+
+@register_block_renderer("toggle")
+def _render_toggle(block: dict, context: RenderContext) -> str:
+    summary = _rich_texts_to_markdown(block["toggle"].get("rich_text", []), context)
+    children = context.render_children(block)
+    return f"<details><summary>{summary}</summary>{BLOCK_SEPARATOR}{children}{BLOCK_SEPARATOR}</details>"
+
+
+@register_block_renderer("divider")
+def _render_divider(block: dict, context: RenderContext) -> str:
+    return "---"
+
+
+@register_block_renderer("equation")
+def _render_equation(block: dict, context: RenderContext) -> str:
+    expression = block["equation"].get("expression", "")
+    return f"[tex:{expression}]"
+
+
+def _render_children_only(block: dict, context: RenderContext) -> str | None:
+    """
+    ブロック自体は何も出力せず、子要素だけを出力する（列レイアウトや同期ブロック）。
+    """
+    return context.render_children(block) or None
+
+
+for _block_type in ("column_list", "column", "synced_block"):
+    register_block_renderer(_block_type, _render_children_only)
@@ -0,0 +1,173 @@
+import os
+import sqlite3
+import threading
+import time
+
+from src.utils.env_loader import get_app_dir
+
+ENTRY_INDEX_FILENAME = ".notion_to_hatena_entry_index.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    hatena_user_id TEXT NOT NULL,
+    hatena_blog_id TEXT NOT NULL,
+    edit_uri TEXT NOT NULL,
+    page_id TEXT,
+    url TEXT,
+    draft INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (hatena_user_id, hatena_blog_id, edit_uri)
+);
+CREATE TABLE IF NOT EXISTS builds (
+    hatena_user_id TEXT NOT NULL,
+    hatena_blog_id TEXT NOT NULL,
+    built_at REAL NOT NULL,
+    PRIMARY KEY (hatena_user_id, hatena_blog_id)
+);
+"""
+
+
+def get_default_entry_index_path() -> str:
+    """
+    エントリの索引ファイルのパスを返す。
+    環境変数 ENTRY_INDEX_PATH があればそれを、なければ .env と同じディレクトリのファイルを使用する。
+    """
+    return os.environ.get("ENTRY_INDEX_PATH") or os.path.join(get_app_dir(), ENTRY_INDEX_FILENAME)
+
+
+def normalize_page_id(page_id: str) -> str:
+    """
+    Notion のページ ID をハイフンなしの小文字にそろえる。
+    """
+    return page_id.replace("-", "").lower()
+
+
+class EntryIndex:
+    """
+    Notion のページ ID からはてなブログのエントリの URL を引く SQLite の索引。
+
+    エントリ（編集用 URI）ごとに、公開時の URL、下書きかどうか、投稿元の Notion ページ ID を保持する。
+    URL と下書きかどうかはエントリの一覧 (AtomPub のコレクション) から、ページ ID は投稿時の記録から登録する。
+    変換時は get_urls で公開済みのエントリの対応表を一度に読み込み、ページへのリンクを API を呼ばずに解決する。
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or get_default_entry_index_path()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def get_urls(self, hatena_user_id: str, hatena_blog_id: str) -> dict:
+        """
+        公開済みのエントリの対応表を取得する。1つのページから複数のエントリがある場合は、最後に更新したものを使う。
+
+        Returns:
+            Notion のページ ID（ハイフンなし）-> エントリの URL の辞書。
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT page_id, url FROM entries WHERE hatena_user_id = ? AND hatena_blog_id = ? "
+                "AND page_id IS NOT NULL AND url IS NOT NULL AND draft = 0 ORDER BY updated_at",
+                (hatena_user_id, hatena_blog_id),
+            ).fetchall()
+        return {row["page_id"]: row["url"] for row in rows}
+
+    def put_page(self, hatena_user_id: str, hatena_blog_id: str, page_id: str, edit_uri: str, draft: bool) -> None:
+        """
+        ページを投稿（または更新）したエントリを記録する。URL は次にエントリの一覧を読み込んだ時点で登録する。
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO entries (hatena_user_id, hatena_blog_id, edit_uri, page_id, url, draft, updated_at) "
+                "VALUES (?, ?, ?, ?, NULL, ?, ?) ON CONFLICT (hatena_user_id, hatena_blog_id, edit_uri) "
+                "DO UPDATE SET page_id = excluded.page_id, draft = excluded.draft, updated_at = excluded.updated_at",
+                (hatena_user_id, hatena_blog_id, edit_uri, normalize_page_id(page_id), int(draft), time.time()),
+            )
+
+    def put_entries(self, hatena_user_id: str, hatena_blog_id: str, entries: list) -> int:
+        """
+        エントリの一覧から読み込んだエントリの URL と下書きかどうかを登録する（記録済みのページ ID は残す）。
+
+        Args:
+            entries: list_hatena_entries が返すエントリのリスト。
+
+        Returns:
+            すでに URL を登録していたエントリの数。
+        """
+        with self._lock, self._connection:
+            known = 0
+            for entry in entries:
+                row = self._connection.execute(
+                    "SELECT url FROM entries WHERE hatena_user_id = ? AND hatena_blog_id = ? AND edit_uri = ?",
+                    (hatena_user_id, hatena_blog_id, entry["edit_uri"]),
+                ).fetchone()
+                if row is not None and row["url"] is not None:
+                    known += 1
+                self._connection.execute(
+                    "INSERT INTO entries (hatena_user_id, hatena_blog_id, edit_uri, page_id, url, draft, updated_at) "
+                    "VALUES (?, ?, ?, NULL, ?, ?, ?) ON CONFLICT (hatena_user_id, hatena_blog_id, edit_uri) "
+                    "DO UPDATE SET url = excluded.url, draft = excluded.draft",
+                    (hatena_user_id, hatena_blog_id, entry["edit_uri"], entry["url"], int(entry["draft"]), time.time()),
+                )
+        return known
+
+    def link_pages(self, hatena_user_id: str, hatena_blog_id: str, page_ids: dict) -> None:
+        """
+        ページ ID が記録されていないエントリに、編集用 URI -> ページ ID の対応（同期状態など）からページ ID を設定する。
+        """
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "UPDATE entries SET page_id = ? "
+                "WHERE hatena_user_id = ? AND hatena_blog_id = ? AND edit_uri = ? AND page_id IS NULL",
+                [
+                    (normalize_page_id(page_id), hatena_user_id, hatena_blog_id, edit_uri)
+                    for edit_uri, page_id in page_ids.items()
+                ],
+            )
+
+    def is_built(self, hatena_user_id: str, hatena_blog_id: str) -> bool:
+        """
+        エントリの一覧をすべて読み込んで索引を作成済みかどうかを返す。
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM builds WHERE hatena_user_id = ? AND hatena_blog_id = ?",
+                (hatena_user_id, hatena_blog_id),
+            ).fetchone()
+        return row is not None
+
+    def finish_build(self, hatena_user_id: str, hatena_blog_id: str, edit_uris: set) -> int:
+        """
+        エントリの一覧をすべて読み込んだことを記録し、一覧になかった（削除された）エントリを削除する。
+
+        Returns:
+            削除したエントリの数。
+        """
+        with self._lock, self._connection:
+            rows = self._connection.execute(
+                "SELECT edit_uri FROM entries WHERE hatena_user_id = ? AND hatena_blog_id = ?",
+                (hatena_user_id, hatena_blog_id),
+            ).fetchall()
+            deleted = [
+                (hatena_user_id, hatena_blog_id, row["edit_uri"]) for row in rows if row["edit_uri"] not in edit_uris
+            ]
+            self._connection.executemany(
+                "DELETE FROM entries WHERE hatena_user_id = ? AND hatena_blog_id = ? AND edit_uri = ?", deleted
+            )
+            self._connection.execute(
+                "INSERT OR REPLACE INTO builds (hatena_user_id, hatena_blog_id, built_at) VALUES (?, ?, ?)",
+                (hatena_user_id, hatena_blog_id, time.time()),
+            )
+        return len(deleted)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,18 +1,152 @@
+import asyncio
 import base64
 import hashlib
+import heapq
+import itertools
 import logging
+import math
 import os
+import tempfile
+import threading
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timezone
 from xml.etree import ElementTree
+from xml.sax.saxutils import escape
 
+import httpx
 import requests
 
+from src.models.hatena_target import HatenaTarget
+from src.models.image_cache import ImageCache
+from src.models.image_job import ImageJob
+from src.models.image_processing import (
+    IMAGE_FORMATS,
+    SPOOL_MAX_SIZE,
+    ImageOptions,
+    get_image_process_pool,
+    is_pillow_available,
+    optimize_image,
+    shrink_image,
+    shutdown_image_process_pool,
+)
 from src.utils.env_loader import load_env
+from src.utils.errors import HatenaEntryNotFoundError
+from src.utils.http_client import (
+    DEFAULT_BACKOFF_FACTOR,
+    DEFAULT_MAX_RETRIES,
+    get_api_session,
+    get_session,
+    is_retryable_status,
+)
+from src.utils.metrics import get_metrics, requests_response_hook
+from src.utils.rate_limiter import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_CRITICAL,
+    PRIORITY_NORMAL,
+    get_rate_limiter,
+    parse_retry_after,
+)
 
 load_env()
 
 logger = logging.getLogger(__name__)
 
+# API のエンドポイント。ベンチマーク用のローカルサーバーなどに向ける場合は環境変数で上書きする
+DEFAULT_PHOTOLIFE_URL = "https://f.hatena.ne.jp/atom/post"
+DEFAULT_BLOG_BASE_URL = "https://blog.hatena.ne.jp"
+
+DEFAULT_UPLOAD_CONCURRENCY = 4  # はてなフォトライフへの同時アップロード数の既定値
+DEFAULT_MAX_IMAGE_BYTES = 10 * 1024 * 1024  # アップロードする画像の最大サイズの既定値
+# 縮小できる場合にダウンロードする画像の最大サイズの既定値（アップロードする画像の最大サイズに対する倍率）
+DEFAULT_MAX_DOWNLOAD_FACTOR = 5
+DEFAULT_IMAGE_FORMAT = "jpeg"  # 画像の最適化で変換する形式の既定値
+DEFAULT_IMAGE_QUALITY = 85  # 画像の最適化の品質の既定値
+DEFAULT_IMAGE_MAX_WIDTH = 1200  # 画像の最適化で縮小する幅の既定値（ブログの本文の幅の2倍程度）
+DEFAULT_FIND_ENTRY_PAGES = 3  # 投稿済みのエントリを探す際に取得する、エントリの一覧のページ数の既定値
+_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+_BASE64_CHUNK_SIZE = 48 * 1024  # 3 の倍数にすると、チャンクごとの base64 をそのまま連結できる
+HATENA_MAX_RATE_LIMIT_RETRIES = 5  # 429 が返った場合に再試行する最大回数
+_CANCEL_POLL_SECONDS = 0.2  # アップロードの完了を待つ間に、取り消しを確認する間隔
+
+
+class _HatenaRetry:
+    """
+    はてなの API のレスポンスを再試行するかを判定する。同期版と非同期版の送信処理で共有する（送信と待機は行わない）。
+
+    429 の場合は RateLimiter に通知してはてなへのすべての送信を止め、HATENA_MAX_RATE_LIMIT_RETRIES 回まで再試行する。
+    retry_server_errors が True の場合は、再試行できるステータス (is_retryable_status) も HTTP_MAX_RETRIES 回まで、
+    Retry-After（なければ HTTP_BACKOFF_FACTOR の指数バックオフ）の後に再試行する。
+    同期版はセッションの Retry で 5xx を再試行するため False にする。
+    """
+
+    def __init__(self, method: str, retry_server_errors: bool):
+        self.limiter = get_rate_limiter("hatena")
+        self.method = method
+        self.retry_server_errors = retry_server_errors
+        self.max_retries = int(os.environ.get("HTTP_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+        self.backoff_factor = float(os.environ.get("HTTP_BACKOFF_FACTOR", DEFAULT_BACKOFF_FACTOR))
+        self._rate_limit_attempt = 0
+        self._attempt = 0
+
+    def next_delay(self, status_code: int, retry_after: str | None) -> float | None:
+        """
+        Returns:
+            再試行する前に呼び出し側で待機する秒数（429 は次の acquire で待つため 0）。再試行しない場合は None。
+        """
+        if status_code == 429:
+            if self._rate_limit_attempt >= HATENA_MAX_RATE_LIMIT_RETRIES:
+                return None
+            delay = self.limiter.on_rate_limited(parse_retry_after(retry_after))
+            self._rate_limit_attempt += 1
+            get_metrics().record_retry("hatena", "429", delay)
+            return 0.0
+
+        self.limiter.on_success()
+        if (
+            not self.retry_server_errors
+            or not is_retryable_status(self.method, status_code)
+            or self._attempt >= self.max_retries
+        ):
+            return None
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            delay = self.backoff_factor * (2**self._attempt)
+        self._attempt += 1
+        get_metrics().record_retry("http", str(status_code), delay)
+        return delay
+
+
+def _send_hatena_request(
+    method: str,
+    url: str,
+    priority: int = PRIORITY_NORMAL,
+    build_headers: Callable[[], dict] | None = None,
+    **kwargs,
+) -> requests.Response:
+    """
+    はてなの API にリクエストを送信する。
+
+    送信前にはてな用の RateLimiter で送信間隔を調整する（priority が小さいリクエストを先に送信する）。
+    429 が返った場合は RateLimiter に通知してはてなへのすべての送信を止め、再開後に再試行する。
+    build_headers を指定すると、送信のたびにヘッダーを作り直す（WSSE のように使い回せないヘッダーの場合）。
+    """
+    retry = _HatenaRetry(method, retry_server_errors=False)
+    session = get_api_session()
+    while True:
+        retry.limiter.acquire(priority)
+        if build_headers is not None:
+            kwargs["headers"] = build_headers()
+        response = session.request(method, url, **kwargs)
+        delay = retry.next_delay(response.status_code, response.headers.get("Retry-After"))
+        if delay is None:
+            return response
+        response.close()
+        if delay:
+            time.sleep(delay)
+
 
 def _generate_wsse_header(hatena_user_id, hatena_api_key):
     """Generates WSSE authentication header for Hatena API."""
@@ -24,62 +158,316 @@ def _generate_wsse_header(hatena_user_id, hatena_api_key):
     return f'UsernameToken Username="{hatena_user_id}", PasswordDigest="{digest}", Nonce="{nonce}", Created="{created}"'
 
 
-def upload_image_to_hatena_photolife(image_url: str) -> str | None:
+class DownloadedImage:
     """
-    Uploads an image to Hatena Photolife and returns the permanent URL.
+    ダウンロードした画像。
+
+    画像データは一定サイズまではメモリ、それを超える場合は一時ファイルに保持し、
+    大きな画像でもメモリ使用量が増えすぎないようにする。
+
+    Attributes:
+        file: 画像データを保持するファイルオブジェクト。
+        size: 画像データのバイト数。
+        content_type: 画像の MIME タイプ。
+        content_hash: ダウンロードした画像データの SHA-256。
+    """
+
+    def __init__(self, file, size: int, content_type: str, content_hash: str):
+        self.file = file
+        self.size = size
+        self.content_type = content_type
+        self.content_hash = content_hash
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _Base64XmlBody:
+    """
+    画像を base64 に変換しながら送信する、Photolife 投稿用の XML リクエストボディ。
+
+    画像全体の base64 文字列を作らずにチャンクごとに変換して送信する。
+    __len__ で Content-Length を通知し、再試行時に再送できるよう __iter__ のたびに先頭から読み直す。
+    """
+
+    def __init__(self, prefix: bytes, image: DownloadedImage, suffix: bytes):
+        self.prefix = prefix
+        self.image = image
+        self.suffix = suffix
+
+    def __len__(self):
+        return len(self.prefix) + 4 * math.ceil(self.image.size / 3) + len(self.suffix)
+
+    def __iter__(self):
+        yield self.prefix
+        self.image.file.seek(0)
+        while chunk := self.image.file.read(_BASE64_CHUNK_SIZE):
+            yield base64.b64encode(chunk)
+        yield self.suffix
+
+
+def _get_max_image_bytes() -> int:
+    return int(os.environ.get("HATENA_MAX_IMAGE_BYTES", DEFAULT_MAX_IMAGE_BYTES))
+
+
+def _get_max_download_bytes(max_bytes: int) -> int:
+    """
+    縮小できる場合にダウンロードする画像の最大サイズ。環境変数 HATENA_IMAGE_MAX_DOWNLOAD_BYTES
+    （既定値は HATENA_MAX_IMAGE_BYTES の DEFAULT_MAX_DOWNLOAD_FACTOR 倍）で指定し、max_bytes より小さくはしない。
+    """
+    value = os.environ.get("HATENA_IMAGE_MAX_DOWNLOAD_BYTES")
+    max_download_bytes = int(value) if value else max_bytes * DEFAULT_MAX_DOWNLOAD_FACTOR
+    return max(max_download_bytes, max_bytes)
+
+
+def _can_shrink_images() -> bool:
+    return os.environ.get("HATENA_SHRINK_OVERSIZED_IMAGES", "1") != "0" and is_pillow_available()
+
+
+class _ImageDownloadBuffer:
+    """
+    ダウンロード中の画像データを受け取るバッファー。download_image とその非同期版で共有する（通信は行わない）。
+
+    一定サイズまではメモリ、それを超える分は一時ファイルに書き出し、内容のハッシュ値を求める。
+    上限 (HATENA_MAX_IMAGE_BYTES) を超える画像は、縮小できない場合は受け取りを中止する。
+    縮小できる場合も、HATENA_IMAGE_MAX_DOWNLOAD_BYTES を超える画像は受け取りを中止する。
+    """
+
+    def __init__(self, image_url: str):
+        self.image_url = image_url
+        max_bytes = _get_max_image_bytes()
+        self.max_bytes = _get_max_download_bytes(max_bytes) if _can_shrink_images() else max_bytes
+        self.size = 0
+        self._file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        self._digest = hashlib.sha256()
+
+    def write(self, chunk: bytes) -> bool:
+        """
+        チャンクを追加する。上限を超えて受け取りを中止した場合は、バッファーを閉じて False を返す。
+        """
+        self._file.write(chunk)
+        self._digest.update(chunk)
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            logger.error(f"Image at {self.image_url} exceeds the maximum size of {self.max_bytes} bytes.")
+            self.close()
+            return False
+        return True
+
+    def finish(self, content_type: str) -> DownloadedImage:
+        return DownloadedImage(self._file, self.size, content_type, self._digest.hexdigest())
+
+    def close(self):
+        self._file.close()
+
+
+def download_image(image_url: str) -> DownloadedImage | None:
+    """
+    Downloads an image.
+
+    画像はチャンクごとに読み込み、一定サイズを超える分は一時ファイルに書き出す。
+    上限 (HATENA_MAX_IMAGE_BYTES) を超える画像は、縮小できない場合はダウンロードを中止する。
+    縮小できる場合も、HATENA_IMAGE_MAX_DOWNLOAD_BYTES（既定値は HATENA_MAX_IMAGE_BYTES の5倍）を超える画像は
+    ダウンロードを中止する。縮小や最適化はアップロードの直前に prepare_image で行う。
 
     Args:
         image_url: The temporary URL of the image from Notion.
 
     Returns:
-        The permanent URL of the uploaded image on Hatena Photolife, or None on failure.
+        ダウンロードした画像。失敗した場合は None。
     """
-    hatena_user_id = os.environ["HATENA_USER_ID"]
-    hatena_api_key = os.environ["HATENA_API_KEY"]
-
+    buffer = _ImageDownloadBuffer(image_url)
     try:
-        response = requests.get(image_url, stream=True)
-        response.raise_for_status()
-        image_data = response.content
-        content_type = response.headers.get("Content-Type", "image/jpeg")
+        with get_session().get(image_url, stream=True, hooks=requests_response_hook("image.download")) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "image/jpeg")
+            for chunk in response.iter_content(_DOWNLOAD_CHUNK_SIZE):
+                if not buffer.write(chunk):
+                    return None
     except requests.exceptions.RequestException as e:
         logger.error(f"Failed to download image from {image_url}. {e}")
+        buffer.close()
         return None
 
-    url = "https://f.hatena.ne.jp/atom/post"
-    title = "image"  # Title in Hatena Photolife (can be customized)
-    xml_data = f"""<entry xmlns="http://purl.org/atom/ns#">
-<title>{title}</title>
-<content mode="base64" type="{content_type}">{base64.b64encode(image_data).decode()}</content>
-</entry>"""
+    return buffer.finish(content_type)
+
+
+def _get_image_options() -> ImageOptions | None:
+    """
+    画像の最適化の設定を環境変数から読み込む。最適化が無効な場合や Pillow がない場合は None を返す。
+    """
+    if os.environ.get("HATENA_OPTIMIZE_IMAGES", "0") == "0" or not is_pillow_available():
+        return None
+    output_format = os.environ.get("HATENA_IMAGE_FORMAT", DEFAULT_IMAGE_FORMAT).lower()
+    if output_format not in IMAGE_FORMATS:
+        raise ValueError(f"HATENA_IMAGE_FORMAT must be one of {', '.join(IMAGE_FORMATS)}: {output_format}")
+    quality = int(os.environ.get("HATENA_IMAGE_QUALITY", DEFAULT_IMAGE_QUALITY))
+    max_width = int(os.environ.get("HATENA_IMAGE_MAX_WIDTH", DEFAULT_IMAGE_MAX_WIDTH))
+    return ImageOptions(output_format, min(max(quality, 1), 100), max(max_width, 0))
 
-    headers = {"X-WSSE": _generate_wsse_header(hatena_user_id, hatena_api_key)}
 
+def _submit_optimize_image(image: DownloadedImage, options: ImageOptions) -> Future:
+    image.file.seek(0)
+    return get_image_process_pool().submit(optimize_image, image.file.read(), options)
+
+
+def _optimized_image(image: DownloadedImage, future: Future, started_at: float) -> DownloadedImage:
+    """
+    プロセスプールでの最適化の結果から、新しい画像を作る。最適化しなかった場合は元の画像を返す。
+    """
     try:
-        post_response = requests.post(url, headers=headers, data=xml_data.encode("utf-8"))
-        post_response.raise_for_status()
+        optimized = future.result()
+    except BrokenProcessPool as e:
+        logger.error(f"The image process pool is broken. The image is uploaded without optimization. {e}")
+        shutdown_image_process_pool(wait=False)
+        optimized = None
+    except Exception as e:
+        logger.error(f"Failed to optimize an image. The image is uploaded without optimization. {e}")
+        optimized = None
+    finally:
+        get_metrics().add_span("image.optimize", time.perf_counter() - started_at)
 
-        # Register the Hatena namespace to find hatena:syntax
-        namespaces = {
-            "hatena": "http://www.hatena.ne.jp/info/xmlns#",
-            "atom": "http://www.w3.org/2005/Atom",
-        }
-        root = ElementTree.fromstring(post_response.content)
-
-        syntax_tag = root.find("hatena:syntax", namespaces)
-        if syntax_tag is not None:
-            # Return the Hatena syntax which is like [f:id:user:yyyymmddhhmmss:plain]
-            return syntax_tag.text
-        else:
-            # Fallback to find the alternate link if syntax is not available
-            alt_link = root.find('atom:link[@rel="alternate"]', namespaces)
-            if alt_link is not None:
-                return alt_link.get("href")
-            else:
-                logger.error("Could not find image URL in Hatena Photolife response.")
-                logger.error(f"Response: {post_response.text}")
-                return None
+    if optimized is None:
+        return image
+    data, content_type = optimized
+    logger.debug(f"Optimized an image from {image.size} bytes to {len(data)} bytes ({content_type}).")
+    optimized_file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    optimized_file.write(data)
+    # キャッシュのキーとして使えるよう、ハッシュ値は元の画像のものを保持する
+    return DownloadedImage(optimized_file, len(data), content_type, image.content_hash)
+
+
+def _fit_image(image: DownloadedImage, max_bytes: int) -> DownloadedImage | None:
+    """
+    上限を超える画像を縮小した新しい画像を返す。縮小できない場合は None を返す。元の画像は閉じない。
+    """
+    if image.size <= max_bytes:
+        return image
+
+    shrunk = shrink_image(image.file, image.size, max_bytes)
+    if shrunk is None:
+        return None
+    shrunk_file, shrunk_size, shrunk_content_type = shrunk
+    return DownloadedImage(shrunk_file, shrunk_size, shrunk_content_type, image.content_hash)
+
+
+def prepare_image(image: DownloadedImage) -> DownloadedImage | None:
+    """
+    アップロードの直前に画像を前処理する。
+
+    1. HATENA_OPTIMIZE_IMAGES=1 の場合は、プロセスプールで縮小（HATENA_IMAGE_MAX_WIDTH）・
+       形式の変換（HATENA_IMAGE_FORMAT）・再圧縮（HATENA_IMAGE_QUALITY）を行う。
+    2. 上限 (HATENA_MAX_IMAGE_BYTES) を超える画像を縮小する。
+
+    Args:
+        image: ダウンロードした画像。この関数では閉じない。
+
+    Returns:
+        前処理した画像（前処理しなかった場合は image そのもの）。上限に収まらない場合は None。
+        image と異なる画像を返した場合は、呼び出し元で閉じること。
+    """
+    optimized = image
+    options = _get_image_options()
+    if options is not None:
+        started_at = time.perf_counter()
+        future = _submit_optimize_image(image, options)
+        optimized = _optimized_image(image, future, started_at)
+    prepared = _fit_image(optimized, _get_max_image_bytes())
+    if optimized is not image and optimized is not prepared:
+        optimized.close()
+    return prepared
+
+
+class ImageDeduplicator:
+    """
+    同じ実行の中で、内容（ハッシュ値）が同じ画像のアップロードを1回にまとめる。
 
+    Notion のページに同じ画像を何度も貼り付けると、ブロックごとに別の URL になるため、
+    ダウンロードした内容のハッシュ値で判定する。最初の画像だけをアップロードし、
+    同じ画像は（アップロード中であれば完了を待って）その結果を再利用する。
+    スレッドからは run、イベントループからは run_async で使用する。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._uploads = {}  # ハッシュ値 -> アップロード結果の Future
+
+    def _claim(self, content_hash: str) -> tuple[Future, bool]:
+        with self._lock:
+            future = self._uploads.get(content_hash)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._uploads[content_hash] = future
+            return future, True
+
+    def run(self, content_hash: str, upload: Callable[[], str | None]) -> str | None:
+        """
+        同じ画像が初めてであれば upload を呼び出し、そうでなければ最初のアップロードの結果を返す。
+        """
+        future, is_first = self._claim(content_hash)
+        if not is_first:
+            logger.debug(f"Reusing the upload of an identical image ({content_hash}).")
+            return future.result()
+        result = None
+        try:
+            result = upload()
+            return result
+        finally:
+            future.set_result(result)
+
+    async def run_async(self, content_hash: str, upload: Callable[[], Awaitable[str | None]]) -> str | None:
+        """
+        run の非同期版。
+        """
+        future, is_first = self._claim(content_hash)
+        if not is_first:
+            logger.debug(f"Reusing the upload of an identical image ({content_hash}).")
+            return await asyncio.wrap_future(future)
+        result = None
+        try:
+            result = await upload()
+            return result
+        finally:
+            future.set_result(result)
+
+
+def post_image_to_hatena_photolife(image: DownloadedImage, target: HatenaTarget | None = None) -> str | None:
+    """
+    Uploads image data to Hatena Photolife and returns the permanent URL.
+
+    Args:
+        image: The downloaded image.
+        target: アップロード先のアカウント。省略時は環境変数 HATENA_USER_ID, HATENA_API_KEY を使用する。
+
+    Returns:
+        The Hatena syntax (or URL) of the uploaded image on Hatena Photolife, or None on failure.
+    """
+    target = target or HatenaTarget.from_env()
+    hatena_user_id = target.user_id
+    hatena_api_key = target.api_key
+
+    url = os.environ.get("HATENA_PHOTOLIFE_URL", DEFAULT_PHOTOLIFE_URL)
+    body = _build_photolife_body(image)
+
+    try:
+        # 画像のアップロードは記事の変換と並行して進められるため、記事の投稿より後回しにする
+        post_response = _send_hatena_request(
+            "POST",
+            url,
+            priority=PRIORITY_BACKGROUND,
+            build_headers=lambda: {"X-WSSE": _generate_wsse_header(hatena_user_id, hatena_api_key)},
+            data=body,
+            hooks=requests_response_hook("hatena.photolife.post"),
+        )
+        post_response.raise_for_status()
+        return _parse_photolife_response(post_response.content)
     except requests.exceptions.RequestException as e:
         logger.error(f"Failed to upload image to Hatena Photolife. {e}")
         if "post_response" in locals():
@@ -90,44 +478,1016 @@ def upload_image_to_hatena_photolife(image_url: str) -> str | None:
         return None
 
 
-def post_to_hatena(title: str, content: str, draft: bool = True):
+def _build_photolife_body(image: DownloadedImage) -> _Base64XmlBody:
+    title = "image"  # Title in Hatena Photolife (can be customized)
+    prefix = f"""<entry xmlns="http://purl.org/atom/ns#">
+<title>{title}</title>
+<content mode="base64" type="{escape(image.content_type)}">"""
+    suffix = """</content>
+</entry>"""
+    return _Base64XmlBody(prefix.encode("utf-8"), image, suffix.encode("utf-8"))
+
+
+def _parse_photolife_response(content: bytes) -> str | None:
     """
-    Posts an article to Hatena Blog.
+    はてなフォトライフのレスポンスから、アップロードした画像のはてな記法（なければ URL）を取得する。
+
+    Raises:
+        ElementTree.ParseError: レスポンスが XML でない場合。
+    """
+    # Register the Hatena namespace to find hatena:syntax
+    namespaces = {
+        "hatena": "http://www.hatena.ne.jp/info/xmlns#",
+        "atom": "http://www.w3.org/2005/Atom",
+    }
+    root = ElementTree.fromstring(content)
+
+    syntax_tag = root.find("hatena:syntax", namespaces)
+    if syntax_tag is not None:
+        # Return the Hatena syntax which is like [f:id:user:yyyymmddhhmmss:plain]
+        return syntax_tag.text
+    else:
+        # Fallback to find the alternate link if syntax is not available
+        alt_link = root.find('atom:link[@rel="alternate"]', namespaces)
+        if alt_link is not None:
+            return alt_link.get("href")
+        else:
+            logger.error("Could not find image URL in Hatena Photolife response.")
+            logger.error(f"Response: {content.decode('utf-8', errors='replace')}")
+            return None
+
+
+def upload_image_to_hatena_photolife(image_url: str) -> str | None:
+    """
+    Uploads an image to Hatena Photolife and returns the permanent URL.
 
     Args:
-        title: The title of the article.
-        content: The content of the article in Markdown format.
-        draft: If True, post as a draft. Defaults to True.
+        image_url: The temporary URL of the image from Notion.
+
+    Returns:
+        The permanent URL of the uploaded image on Hatena Photolife, or None on failure.
+    """
+    image = download_image(image_url)
+    if image is None:
+        return None
+    with image:
+        return _prepare_and_post_image(image)
+
+
+def download_image_job(image_job: ImageJob) -> DownloadedImage | None:
+    """
+    画像ブロックの URL から画像をダウンロードする。upload_image_job の既定の取得方法。
+    """
+    return download_image(image_job.url)
+
+
+# アップロード結果のキャッシュの参照と保存。同期版と非同期版のアップロードで共有する。
+
+
+def _has_block_key(cache: ImageCache | None, image_job: ImageJob) -> bool:
+    return cache is not None and image_job.block_id is not None and image_job.last_edited_time is not None
+
+
+def _get_cached_block(cache: ImageCache | None, image_job: ImageJob, hatena_user_id: str) -> str | None:
+    """
+    画像ブロックの ID と last_edited_time で、アップロード済みの画像のはてな記法を探す。
+    """
+    if not _has_block_key(cache, image_job):
+        return None
+    image_syntax = cache.get_by_block(hatena_user_id, image_job.block_id, image_job.last_edited_time)
+    if image_syntax:
+        logger.debug(f"Image cache hit for block {image_job.block_id}.")
+    return image_syntax
+
+
+def _link_cached_block(cache: ImageCache | None, image_job: ImageJob, hatena_user_id: str, content_hash: str):
+    if _has_block_key(cache, image_job):
+        cache.link_block(hatena_user_id, image_job.block_id, image_job.last_edited_time, content_hash)
+
+
+def _get_cached_image(cache: ImageCache | None, image: DownloadedImage, hatena_user_id: str) -> str | None:
+    """
+    画像の内容のハッシュ値で、アップロード済みの画像のはてな記法を探す。
+    """
+    if cache is None:
+        return None
+    image_syntax = cache.get_by_hash(hatena_user_id, image.content_hash)
+    if image_syntax:
+        logger.debug(f"Image cache hit for content hash {image.content_hash}.")
+    return image_syntax
+
+
+def _put_cached_image(
+    cache: ImageCache | None,
+    image: DownloadedImage,
+    prepared: DownloadedImage,
+    image_syntax: str | None,
+    hatena_user_id: str,
+):
+    if image_syntax and cache is not None:
+        cache.put(hatena_user_id, image.content_hash, image_syntax, prepared.size)
+
+
+def _prepare_and_post_image(
+    image: DownloadedImage, cache: ImageCache | None = None, target: HatenaTarget | None = None
+) -> str | None:
+    """
+    内容のハッシュ値がキャッシュになければ、画像を前処理してアップロードし、結果をキャッシュに保存する。
+    """
+    target = target or HatenaTarget.from_env()
+    image_syntax = _get_cached_image(cache, image, target.user_id)
+    if image_syntax:
+        return image_syntax
+
+    prepared = prepare_image(image)
+    if prepared is None:
+        return None
+    try:
+        image_syntax = post_image_to_hatena_photolife(prepared, target)
+    finally:
+        if prepared is not image:
+            prepared.close()
+    _put_cached_image(cache, image, prepared, image_syntax, target.user_id)
+    return image_syntax
+
+
+def upload_image_job(
+    image_job: ImageJob,
+    cache: ImageCache | None = None,
+    downloader: Callable[[ImageJob], DownloadedImage | None] | None = None,
+    deduplicator: ImageDeduplicator | None = None,
+    target: HatenaTarget | None = None,
+) -> str | None:
+    """
+    画像を1件アップロードする。キャッシュが指定されていれば、アップロード済みの画像を再利用する。
+
+    1. 画像ブロックの ID と last_edited_time がキャッシュにあれば、ダウンロードせずに結果を返す。
+    2. 同じ実行の中で内容が同じ画像をアップロード済み（またはアップロード中）であれば、その結果を返す。
+    3. ダウンロードした画像の内容のハッシュ値がキャッシュにあれば、アップロードせずに結果を返す。
+    4. いずれもなければ前処理 (prepare_image) してアップロードし、結果をキャッシュに保存する。
+
+    Args:
+        image_job: アップロードする画像の情報。
+        cache: アップロード結果のキャッシュ。None の場合はキャッシュを使用しない。
+        downloader: 画像データを取得する関数。省略時は画像ブロックの URL からダウンロードする。
+        deduplicator: 同じ実行の中で、内容が同じ画像のアップロードを1回にまとめる。None の場合はまとめない。
+        target: アップロード先のアカウント。キャッシュはアカウントのユーザー ID ごとに分ける。
+            省略時は環境変数 HATENA_USER_ID, HATENA_API_KEY を使用する。
+
+    Returns:
+        The Hatena syntax of the uploaded image, or None on failure.
+    """
+    if downloader is None:
+        downloader = download_image_job
+
+    target = target or HatenaTarget.from_env()
+    cached_syntax = _get_cached_block(cache, image_job, target.user_id)
+    if cached_syntax:
+        return cached_syntax
+
+    image = downloader(image_job)
+    if image is None:
+        return None
+    content_hash = image.content_hash
+
+    with image:
+        if deduplicator is None:
+            image_syntax = _prepare_and_post_image(image, cache, target)
+        else:
+            image_syntax = deduplicator.run(content_hash, lambda: _prepare_and_post_image(image, cache, target))
+    if not image_syntax:
+        return None
+
+    _link_cached_block(cache, image_job, target.user_id, content_hash)
+    return image_syntax
+
+
+class _ExpiryQueue:
+    """
+    画像の URL の有効期限が近い順に取り出すキュー（期限のない画像は最後、期限が同じ画像は追加した順）。
+    ImageUploadPool と AsyncImageUploadPool で共有する。スレッドセーフではない。
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._sequence = itertools.count()
+
+    def push(self, image_job: ImageJob, item):
+        expires_at = image_job.expires_at()
+        heapq.heappush(self._heap, (expires_at is None, expires_at or 0.0, next(self._sequence), item))
+
+    def pop(self):
+        return heapq.heappop(self._heap)[-1]
+
+    def clear(self) -> list:
+        """
+        残っている要素をすべて取り出す。
+        """
+        items = [entry[-1] for entry in self._heap]
+        self._heap.clear()
+        return items
+
+    def __len__(self):
+        return len(self._heap)
+
+
+class ImageUploadPool:
+    """
+    画像を受け取るとすぐにアップロードを開始するワーカープール。
+
+    変換処理の途中で見つかった画像を submit で渡すと、変換の完了を待たずにアップロードが始まる。
+    ワーカーが空いていない場合は、URL の有効期限が近い画像から順にアップロードする（期限のない画像は最後）。
+    results で、submit した順にアップロード結果を受け取る。
+    downloader を指定すると、URL からのダウンロードの代わりにその関数で画像データを取得する（スナップショットなど）。
+    内容が同じ画像のアップロードは、プールの中で1回にまとめる (ImageDeduplicator)。
+    on_uploaded を指定すると、画像のアップロードが終わるたびに（失敗した場合も）ワーカースレッドから
+    画像とアップロード結果（失敗した場合は None）を渡して呼び出す。
+    target を指定すると、そのアカウントのはてなフォトライフにアップロードする（省略時は環境変数のアカウント）。
     """
-    hatena_user_id = os.environ["HATENA_USER_ID"]
-    hatena_blog_id = os.environ["HATENA_BLOG_ID"]
-    hatena_api_key = os.environ["HATENA_API_KEY"]
 
-    url = f"https://blog.hatena.ne.jp/{hatena_user_id}/{hatena_blog_id}/atom/entry"
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        cache: ImageCache | None = None,
+        downloader: Callable[[ImageJob], DownloadedImage | None] | None = None,
+        on_uploaded: Callable[[ImageJob, str | None], None] | None = None,
+        target: HatenaTarget | None = None,
+    ):
+        if max_workers is None:
+            max_workers = int(os.environ.get("HATENA_UPLOAD_CONCURRENCY", DEFAULT_UPLOAD_CONCURRENCY))
+        self.cache = cache
+        self.downloader = downloader
+        self.on_uploaded = on_uploaded
+        self.target = target or HatenaTarget.from_env()
+        self.deduplicator = ImageDeduplicator()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="photolife-upload")
+        self._futures = []
+        # まだ始まっていないアップロード
+        self._pending = _ExpiryQueue()
+        self._pending_lock = threading.Lock()
 
-    headers = {"Content-Type": "application/xml"}
+    def submit(self, image_job: ImageJob):
+        """
+        画像のアップロードを予約する。ワーカーが空き次第、有効期限が近いものから開始する。
+        """
+        future = Future()
+        with self._pending_lock:
+            self._pending.push(image_job, (image_job, future))
+        self._futures.append(future)
+        self._executor.submit(self._upload_next)
 
+    def add_result(self, image_syntax: str):
+        """
+        アップロード済みの画像の結果を、submit と同じ順序の結果として追加する（ジャーナルから再開する場合）。
+        """
+        future = Future()
+        future.set_result(image_syntax)
+        self._futures.append(future)
+
+    def _upload_next(self):
+        # submit 1回につき1回呼び出され、その時点で最も有効期限が近い画像をアップロードする
+        with self._pending_lock:
+            image_job, future = self._pending.pop()
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(self._upload(image_job))
+        except BaseException as e:
+            future.set_exception(e)
+
+    def _upload(self, image_job: ImageJob) -> str | None:
+        started_at = time.perf_counter()
+        image_syntax = None
+        try:
+            image_syntax = upload_image_job(image_job, self.cache, self.downloader, self.deduplicator, self.target)
+            return image_syntax
+        finally:
+            seconds = time.perf_counter() - started_at
+            metrics = get_metrics()
+            metrics.add_span("hatena.upload_image", seconds)
+            metrics.record_item("image_upload", image_job.block_id or image_job.url, seconds, url=image_job.url)
+            if self.on_uploaded is not None:
+                self.on_uploaded(image_job, image_syntax)
+
+    def __len__(self):
+        return len(self._futures)
+
+    def results(self, cancel_event: threading.Event | None = None) -> list:
+        """
+        すべてのアップロードの完了を待ち、submit した順にアップロード結果（失敗した画像は None）を返す。
+        cancel_event がセットされた場合は、完了を待たずに戻る（戻り値は使用しないこと）。
+        """
+        if cancel_event is not None:
+            pending = set(self._futures)
+            while pending and not cancel_event.is_set():
+                _, pending = wait(pending, timeout=_CANCEL_POLL_SECONDS)
+            if pending:
+                return []
+        return [future.result() for future in self._futures]
+
+    def close(self, cancel_pending: bool = False):
+        """
+        ワーカープールを終了する。cancel_pending が True の場合は、まだ始まっていないアップロードを取り消す。
+        """
+        self._executor.shutdown(wait=True, cancel_futures=cancel_pending)
+        with self._pending_lock:
+            for _, future in self._pending.clear():
+                future.cancel()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # 変換の失敗や取り消しで抜ける場合は、残りのアップロードを行わない
+        self.close(cancel_pending=exc_type is not None)
+
+
+def upload_images_to_hatena_photolife(
+    image_jobs: list, max_workers: int | None = None, cache: ImageCache | None = None
+) -> list:
+    """
+    複数の画像をワーカープールで並行してはてなフォトライフにアップロードする。
+
+    Args:
+        image_jobs: アップロードする画像 (ImageJob) のリスト。
+        max_workers: 同時アップロード数の上限。
+            省略時は環境変数 HATENA_UPLOAD_CONCURRENCY（既定値 4）を使用する。
+        cache: アップロード結果のキャッシュ。None の場合はキャッシュを使用しない。
+
+    Returns:
+        image_jobs と同じ順序で、アップロード結果（失敗した画像は None）を並べたリスト。
+    """
+    if not image_jobs:
+        return []
+
+    if max_workers is not None:
+        max_workers = min(max_workers, len(image_jobs))
+
+    with ImageUploadPool(max_workers, cache) as pool:
+        for image_job in image_jobs:
+            pool.submit(image_job)
+        return pool.results()
+
+
+def _entry_collection_url(target: HatenaTarget) -> str:
+    """
+    ブログのエントリのコレクション URI（一覧の取得と投稿に使用する）。
+    """
+    blog_base_url = os.environ.get("HATENA_BLOG_BASE_URL", DEFAULT_BLOG_BASE_URL).rstrip("/")
+    return f"{blog_base_url}/{target.user_id}/{target.blog_id}/atom/entry"
+
+
+def _entry_request(title: str, content: str, draft: bool, target: HatenaTarget) -> dict:
+    """
+    記事の投稿と更新のリクエストの認証情報、ヘッダー、本文。同期版と非同期版で共有する。
+    """
+    return {
+        "auth": (target.user_id, target.api_key),
+        "headers": {"Content-Type": "application/xml"},
+        "body": _build_entry_xml(title, content, draft, target.user_id).encode("utf-8"),
+    }
+
+
+def _build_entry_xml(title: str, content: str, draft: bool, hatena_user_id: str) -> str:
+    """Builds the AtomPub entry XML for Hatena Blog."""
     draft_tag = ""
     if draft:
         draft_tag = "<app:control><app:draft>yes</app:draft></app:control>"
 
-    data = f"""<?xml version="1.0" encoding="utf-8"?>
+    return f"""<?xml version="1.0" encoding="utf-8"?>
 <entry xmlns="http://www.w3.org/2005/Atom"
        xmlns:app="http://www.w3.org/2007/app">
-  <title>{title}</title>
+  <title>{escape(title)}</title>
   <author><name>{hatena_user_id}</name></author>
   <content type="text/markdown"><![CDATA[{content}]]></content>
   {draft_tag}
 </entry>"""
 
-    response = requests.post(url, auth=(hatena_user_id, hatena_api_key), headers=headers, data=data.encode("utf-8"))
 
+def _get_edit_uri(response: requests.Response | httpx.Response) -> str | None:
+    """
+    AtomPub のレスポンスからエントリの編集用 URI (link rel="edit") を取得する。
+    見つからない場合は Location ヘッダーを使用する。
+    """
+    try:
+        root = ElementTree.fromstring(response.content)
+        edit_link = root.find('atom:link[@rel="edit"]', {"atom": "http://www.w3.org/2005/Atom"})
+        if edit_link is not None:
+            return edit_link.get("href")
+    except ElementTree.ParseError as e:
+        logger.warning(f"Failed to parse Hatena Blog XML response. {e}")
+    return response.headers.get("Location")
+
+
+def list_hatena_entries(url: str | None = None, target: HatenaTarget | None = None) -> tuple[list, str | None] | None:
+    """
+    はてなブログのエントリの一覧 (AtomPub のコレクション) を1ページ分取得する。一覧は新しいエントリから順に並ぶ。
+
+    Args:
+        url: 取得する一覧のページの URL。省略時は最初（最新）のページを取得する。
+        target: 投稿先のブログ。省略時は環境変数 HATENA_USER_ID, HATENA_BLOG_ID, HATENA_API_KEY を使用する。
+
+    Returns:
+        (エントリのリスト, 次のページの URL) のタプル。最後のページでは次のページの URL は None。
+        エントリは edit_uri, url（公開時の URL）, title, content, draft を持つ辞書。
+        取得に失敗した場合は None。
+    """
+    target = target or HatenaTarget.from_env()
+    hatena_user_id = target.user_id
+    hatena_api_key = target.api_key
+    namespaces = {"atom": "http://www.w3.org/2005/Atom", "app": "http://www.w3.org/2007/app"}
+
+    if url is None:
+        url = _entry_collection_url(target)
+    try:
+        response = _send_hatena_request(
+            "GET",
+            url,
+            priority=PRIORITY_CRITICAL,
+            auth=(hatena_user_id, hatena_api_key),
+            hooks=requests_response_hook("hatena.blog.entry.list"),
+        )
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Failed to list the Hatena Blog entries. {e}")
+        return None
+    if response.status_code != 200:
+        logger.error(f"Failed to list the Hatena Blog entries. Status code: {response.status_code}")
+        return None
+    try:
+        root = ElementTree.fromstring(response.content)
+    except ElementTree.ParseError as e:
+        logger.error(f"Failed to parse Hatena Blog XML response. {e}")
+        return None
+
+    entries = []
+    for entry in root.iterfind("atom:entry", namespaces):
+        edit_link = entry.find('atom:link[@rel="edit"]', namespaces)
+        if edit_link is None:
+            continue
+        alternate_link = entry.find('atom:link[@rel="alternate"]', namespaces)
+        entries.append(
+            {
+                "edit_uri": edit_link.get("href"),
+                "url": alternate_link.get("href") if alternate_link is not None else None,
+                "title": entry.findtext("atom:title", "", namespaces),
+                "content": entry.findtext("atom:content", "", namespaces),
+                "draft": entry.findtext("app:control/app:draft", "no", namespaces).strip() == "yes",
+            }
+        )
+    next_link = root.find('atom:link[@rel="next"]', namespaces)
+    return entries, next_link.get("href") if next_link is not None else None
+
+
+def find_hatena_entry(
+    title: str, content: str, max_pages: int = DEFAULT_FIND_ENTRY_PAGES, target: HatenaTarget | None = None
+) -> str | None:
+    """
+    はてなブログの新しいエントリから、タイトルと本文が一致するエントリを探す。
+    応答を受け取れなかった投稿 (POST) で、エントリが作成されたかどうかを確かめるために使用する。
+
+    Args:
+        title: 探すエントリのタイトル。
+        content: 探すエントリの本文 (Markdown)。
+        max_pages: 新しい順に取得するエントリの一覧のページ数の上限。
+        target: 探すブログ。省略時は環境変数で指定したブログを使用する。
+
+    Returns:
+        見つかったエントリの編集用 URI。一覧を取得できなかった場合は None。
+
+    Raises:
+        HatenaEntryNotFoundError: 一致するエントリが見つからない場合。
+    """
+    content_lines = content.splitlines()
+    url = None
+    for _ in range(max_pages):
+        result = list_hatena_entries(url, target)
+        if result is None:
+            return None
+        entries, url = result
+        for entry in entries:
+            if entry["title"] == title and entry["content"].splitlines() == content_lines:
+                return entry["edit_uri"]
+        if url is None:
+            break
+    raise HatenaEntryNotFoundError(f"はてなブログにタイトルと本文が一致するエントリが見つかりません: {title}")
+
+
+def get_hatena_entry(edit_uri: str, target: HatenaTarget | None = None) -> dict | None:
+    """
+    はてなブログのエントリを取得する。
+
+    Args:
+        edit_uri: 取得するエントリの編集用 URI。
+        target: エントリのブログ。省略時は環境変数 HATENA_USER_ID, HATENA_API_KEY を使用する。
+
+    Returns:
+        title, content（Markdown の本文）, draft を持つ辞書。取得に失敗した場合は None。
+
+    Raises:
+        HatenaEntryNotFoundError: エントリが存在しない場合。
+    """
+    target = target or HatenaTarget.from_env()
+    hatena_user_id = target.user_id
+    hatena_api_key = target.api_key
+
+    try:
+        response = _send_hatena_request(
+            "GET",
+            edit_uri,
+            auth=(hatena_user_id, hatena_api_key),
+            hooks=requests_response_hook("hatena.blog.entry.get"),
+        )
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Failed to get the Hatena Blog entry. {e}")
+        return None
+
+    if response.status_code == 404:
+        raise HatenaEntryNotFoundError(f"はてなブログのエントリが見つかりません: {edit_uri}")
+    if response.status_code != 200:
+        logger.error(f"Failed to get the Hatena Blog entry. Status code: {response.status_code}")
+        logger.error(response.text)
+        return None
+    return _parse_entry(response.content)
+
+
+def _parse_entry(content: bytes) -> dict | None:
+    """
+    AtomPub のエントリの XML から、タイトル、本文、下書きかどうかを取り出す。
+    """
+    namespaces = {"atom": "http://www.w3.org/2005/Atom", "app": "http://www.w3.org/2007/app"}
+    try:
+        root = ElementTree.fromstring(content)
+    except ElementTree.ParseError as e:
+        logger.error(f"Failed to parse Hatena Blog XML response. {e}")
+        return None
+    return {
+        "title": root.findtext("atom:title", "", namespaces),
+        "content": root.findtext("atom:content", "", namespaces),
+        "draft": root.findtext("app:control/app:draft", "no", namespaces).strip() == "yes",
+    }
+
+
+def post_to_hatena(title: str, content: str, draft: bool = True, target: HatenaTarget | None = None) -> str | None:
+    """
+    Posts an article to Hatena Blog.
+
+    Args:
+        title: The title of the article.
+        content: The content of the article in Markdown format.
+        draft: If True, post as a draft. Defaults to True.
+        target: 投稿先のブログ。省略時は環境変数 HATENA_USER_ID, HATENA_BLOG_ID, HATENA_API_KEY を使用する。
+
+    Returns:
+        作成したエントリの編集用 URI。投稿に失敗した場合は None。
+    """
+    target = target or HatenaTarget.from_env()
+    request = _entry_request(title, content, draft, target)
+
+    try:
+        response = _send_hatena_request(
+            "POST",
+            _entry_collection_url(target),
+            priority=PRIORITY_CRITICAL,
+            auth=request["auth"],
+            headers=request["headers"],
+            data=request["body"],
+            hooks=requests_response_hook("hatena.blog.entry.create"),
+        )
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Failed to post to Hatena Blog. {e}")
+        return None
+
+    return _handle_post_response(response, draft)
+
+
+def _handle_post_response(response: requests.Response | httpx.Response, draft: bool) -> str | None:
+    """
+    記事の投稿のレスポンスから、作成したエントリの編集用 URI を返す。失敗した場合は None。
+    """
     if response.status_code == 201:
         status = "draft" if draft else "published"
         logger.info(f"Successfully posted to Hatena Blog as a {status}.")
+        return _get_edit_uri(response)
     else:
         logger.error(f"Failed to post to Hatena Blog. Status code: {response.status_code}")
         logger.error(response.text)
+        return None
+
+
+def update_hatena_entry(
+    edit_uri: str, title: str, content: str, draft: bool = True, target: HatenaTarget | None = None
+) -> str | None:
+    """
+    Updates an existing article on Hatena Blog.
+
+    Args:
+        edit_uri: 更新するエントリの編集用 URI。
+        title: The title of the article.
+        content: The content of the article in Markdown format.
+        draft: If True, keep the article as a draft. Defaults to True.
+        target: エントリのブログ。省略時は環境変数 HATENA_USER_ID, HATENA_API_KEY を使用する。
+
+    Returns:
+        更新したエントリの編集用 URI。更新に失敗した場合は None。
+
+    Raises:
+        HatenaEntryNotFoundError: 更新対象のエントリが存在しない場合。
+    """
+    target = target or HatenaTarget.from_env()
+    request = _entry_request(title, content, draft, target)
+
+    try:
+        response = _send_hatena_request(
+            "PUT",
+            edit_uri,
+            priority=PRIORITY_CRITICAL,
+            auth=request["auth"],
+            headers=request["headers"],
+            data=request["body"],
+            hooks=requests_response_hook("hatena.blog.entry.update"),
+        )
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Failed to update the Hatena Blog entry. {e}")
+        return None
+
+    return _handle_update_response(response, edit_uri, draft)
+
+
+def _handle_update_response(response: requests.Response | httpx.Response, edit_uri: str, draft: bool) -> str | None:
+    """
+    記事の更新のレスポンスから、更新したエントリの編集用 URI を返す。失敗した場合は None。
+
+    Raises:
+        HatenaEntryNotFoundError: 更新対象のエントリが存在しない場合。
+    """
+    if response.status_code == 200:
+        status = "draft" if draft else "published"
+        logger.info(f"Successfully updated the Hatena Blog entry as a {status}.")
+        return _get_edit_uri(response) or edit_uri
+    elif response.status_code == 404:
+        raise HatenaEntryNotFoundError(f"はてなブログのエントリが見つかりません: {edit_uri}")
+    else:
+        logger.error(f"Failed to update the Hatena Blog entry. Status code: {response.status_code}")
+        logger.error(response.text)
+        return None
+
+
+# 非同期 API
+# httpx.AsyncClient（create_async_client で作成する）を使い、process_notion_to_hatena_async から呼び出す。
+
+
+def _record_httpx_response(endpoint: str, response: httpx.Response, bytes_sent: int):
+    bytes_received = int(response.headers.get("Content-Length") or 0)
+    get_metrics().record_request(
+        endpoint, response.status_code, bytes_sent, bytes_received, response.elapsed.total_seconds()
+    )
+
+
+async def _send_hatena_request_async(
+    client: httpx.AsyncClient,
+    method: str,
+    url: str,
+    endpoint: str,
+    priority: int = PRIORITY_NORMAL,
+    build_headers: Callable[[], dict] | None = None,
+    build_content: Callable[[], object] | None = None,
+    **kwargs,
+) -> httpx.Response:
+    """
+    _send_hatena_request の非同期版。
+
+    同期版のセッションと同じ基準で 5xx を再試行し、429 は RateLimiter に通知して再試行する (_HatenaRetry)。
+    build_content を指定すると、送信のたびにリクエストボディを作り直す（ストリーミングするボディの場合）。
+    レスポンスの本文は読み込んだ状態で返す。
+    """
+    retry = _HatenaRetry(method, retry_server_errors=True)
+    while True:
+        await retry.limiter.acquire_async(priority)
+        if build_headers is not None:
+            kwargs["headers"] = {**kwargs.get("headers", {}), **build_headers()}
+        if build_content is not None:
+            kwargs["content"] = build_content()
+        response = await client.request(method, url, **kwargs)
+        await response.aread()
+        _record_httpx_response(endpoint, response, int(response.request.headers.get("Content-Length") or 0))
+
+        delay = retry.next_delay(response.status_code, response.headers.get("Retry-After"))
+        if delay is None:
+            return response
+        if delay:
+            await asyncio.sleep(delay)
+
+
+async def download_image_async(client: httpx.AsyncClient, image_url: str) -> DownloadedImage | None:
+    """
+    download_image の非同期版。
+    """
+    buffer = _ImageDownloadBuffer(image_url)
+    response = None
+    try:
+        async with client.stream("GET", image_url) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "image/jpeg")
+            async for chunk in response.aiter_bytes(_DOWNLOAD_CHUNK_SIZE):
+                if not buffer.write(chunk):
+                    return None
+    except httpx.HTTPError as e:
+        logger.error(f"Failed to download image from {image_url}. {e}")
+        buffer.close()
+        return None
+    finally:
+        # 所要時間はレスポンスを閉じた後でないと取得できない
+        if response is not None:
+            _record_httpx_response("image.download", response, 0)
+
+    return buffer.finish(content_type)
+
+
+async def prepare_image_async(image: DownloadedImage) -> DownloadedImage | None:
+    """
+    prepare_image の非同期版。イベントループを止めないよう、prepare_image を別スレッドで実行する
+    （最適化はそこからプロセスプールで行う）。
+    """
+    return await asyncio.to_thread(prepare_image, image)
+
+
+async def _iter_body_async(body: _Base64XmlBody) -> AsyncIterator[bytes]:
+    for chunk in body:
+        yield chunk
+
+
+async def post_image_to_hatena_photolife_async(
+    client: httpx.AsyncClient, image: DownloadedImage, target: HatenaTarget | None = None
+) -> str | None:
+    """
+    post_image_to_hatena_photolife の非同期版。
+    """
+    target = target or HatenaTarget.from_env()
+    hatena_user_id = target.user_id
+    hatena_api_key = target.api_key
+
+    url = os.environ.get("HATENA_PHOTOLIFE_URL", DEFAULT_PHOTOLIFE_URL)
+    body = _build_photolife_body(image)
+
+    try:
+        # 画像のアップロードは記事の変換と並行して進められるため、記事の投稿より後回しにする
+        post_response = await _send_hatena_request_async(
+            client,
+            "POST",
+            url,
+            "hatena.photolife.post",
+            priority=PRIORITY_BACKGROUND,
+            build_headers=lambda: {"X-WSSE": _generate_wsse_header(hatena_user_id, hatena_api_key)},
+            build_content=lambda: _iter_body_async(body),
+            headers={"Content-Length": str(len(body))},
+        )
+        post_response.raise_for_status()
+        return _parse_photolife_response(post_response.content)
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Failed to upload image to Hatena Photolife. {e}")
+        logger.error(f"Response: {e.response.text}")
+        return None
+    except httpx.HTTPError as e:
+        logger.error(f"Failed to upload image to Hatena Photolife. {e}")
+        return None
+    except ElementTree.ParseError as e:
+        logger.error(f"Failed to parse Hatena Photolife XML response. {e}")
+        return None
+
+
+async def _prepare_and_post_image_async(
+    client: httpx.AsyncClient,
+    image: DownloadedImage,
+    cache: ImageCache | None = None,
+    target: HatenaTarget | None = None,
+) -> str | None:
+    """
+    _prepare_and_post_image の非同期版。
+    """
+    target = target or HatenaTarget.from_env()
+    image_syntax = _get_cached_image(cache, image, target.user_id)
+    if image_syntax:
+        return image_syntax
+
+    prepared = await prepare_image_async(image)
+    if prepared is None:
+        return None
+    try:
+        image_syntax = await post_image_to_hatena_photolife_async(client, prepared, target)
+    finally:
+        if prepared is not image:
+            prepared.close()
+    _put_cached_image(cache, image, prepared, image_syntax, target.user_id)
+    return image_syntax
+
+
+async def upload_image_job_async(
+    client: httpx.AsyncClient,
+    image_job: ImageJob,
+    cache: ImageCache | None = None,
+    deduplicator: ImageDeduplicator | None = None,
+    downloader: Callable[[ImageJob], Awaitable[DownloadedImage | None]] | None = None,
+    target: HatenaTarget | None = None,
+) -> str | None:
+    """
+    upload_image_job の非同期版。キャッシュと内容が同じ画像の扱いは同期版と同じ。
+    downloader を省略した場合は、画像ブロックの URL からダウンロードする。
+    target を省略した場合は、環境変数で指定したアカウントのはてなフォトライフにアップロードする。
+    """
+    target = target or HatenaTarget.from_env()
+    cached_syntax = _get_cached_block(cache, image_job, target.user_id)
+    if cached_syntax:
+        return cached_syntax
+
+    if downloader is None:
+        image = await download_image_async(client, image_job.url)
+    else:
+        image = await downloader(image_job)
+    if image is None:
+        return None
+    content_hash = image.content_hash
+
+    with image:
+        if deduplicator is None:
+            image_syntax = await _prepare_and_post_image_async(client, image, cache, target)
+        else:
+            image_syntax = await deduplicator.run_async(
+                content_hash, lambda: _prepare_and_post_image_async(client, image, cache, target)
+            )
+    if not image_syntax:
+        return None
+
+    _link_cached_block(cache, image_job, target.user_id, content_hash)
+    return image_syntax
+
+
+class AsyncImageUploadPool:
+    """
+    ImageUploadPool の非同期版。submit した画像はタスクとしてすぐにアップロードを開始し、
+    同時アップロード数を HATENA_UPLOAD_CONCURRENCY（既定値 4）に制限する。
+    上限に達している場合は、同期版と同じく URL の有効期限が近い画像から順にアップロードする。
+    内容が同じ画像のアップロードは、プールの中で1回にまとめる。
+    downloader を指定すると、URL からのダウンロードの代わりにその関数で画像データを取得する。
+    on_uploaded を指定すると、画像のアップロードが終わるたびに（失敗した場合も）画像とアップロード結果を渡して呼び出す。
+    target を指定すると、そのアカウントのはてなフォトライフにアップロードする（省略時は環境変数のアカウント）。
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        max_workers: int | None = None,
+        cache: ImageCache | None = None,
+        downloader: Callable[[ImageJob], Awaitable[DownloadedImage | None]] | None = None,
+        target: HatenaTarget | None = None,
+        on_uploaded: Callable[[ImageJob, str | None], None] | None = None,
+    ):
+        if max_workers is None:
+            max_workers = int(os.environ.get("HATENA_UPLOAD_CONCURRENCY", DEFAULT_UPLOAD_CONCURRENCY))
+        self.client = client
+        self.cache = cache
+        self.downloader = downloader
+        self.on_uploaded = on_uploaded
+        self.target = target or HatenaTarget.from_env()
+        self.deduplicator = ImageDeduplicator()
+        self._tasks = []
+        self._available = max(1, max_workers)
+        # 空きを待っているアップロード
+        self._waiting = _ExpiryQueue()
+
+    def submit(self, image_job: ImageJob):
+        """
+        画像のアップロードを開始する。上限に達している場合は、空き次第有効期限が近いものから開始する。
+        """
+        self._tasks.append(asyncio.create_task(self._upload(image_job)))
+
+    def add_result(self, image_syntax: str):
+        """
+        アップロード済みの画像の結果を、submit と同じ順序の結果として追加する（ジャーナルから再開する場合）。
+        """
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(image_syntax)
+        self._tasks.append(future)
+
+    async def _acquire(self, image_job: ImageJob):
+        if self._available > 0:
+            self._available -= 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting.push(image_job, waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # 空きを譲り受けた後に取り消された場合は、次のアップロードに譲る
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+
+    def _release(self):
+        # 空きは、待っているアップロードのうち最も有効期限が近いものに直接譲る
+        while self._waiting:
+            waiter = self._waiting.pop()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._available += 1
+
+    async def _upload(self, image_job: ImageJob) -> str | None:
+        await self._acquire(image_job)
+        started_at = time.perf_counter()
+        image_syntax = None
+        try:
+            image_syntax = await upload_image_job_async(
+                self.client, image_job, self.cache, self.deduplicator, self.downloader, self.target
+            )
+            return image_syntax
+        finally:
+            self._release()
+            seconds = time.perf_counter() - started_at
+            metrics = get_metrics()
+            metrics.add_span("hatena.upload_image", seconds)
+            metrics.record_item("image_upload", image_job.block_id or image_job.url, seconds, url=image_job.url)
+            if self.on_uploaded is not None:
+                self.on_uploaded(image_job, image_syntax)
+
+    def __len__(self):
+        return len(self._tasks)
+
+    async def results(self) -> list:
+        """
+        すべてのアップロードの完了を待ち、submit した順にアップロード結果（失敗した画像は None）を返す。
+        """
+        results = await asyncio.gather(*self._tasks, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Failed to upload an image to Hatena Photolife: {result}", exc_info=result)
+        return [None if isinstance(result, BaseException) else result for result in results]
+
+    def cancel(self):
+        """
+        完了していないアップロードを取り消す。
+        """
+        for task in self._tasks:
+            task.cancel()
+
+
+async def post_to_hatena_async(
+    client: httpx.AsyncClient, title: str, content: str, draft: bool = True, target: HatenaTarget | None = None
+) -> str | None:
+    """
+    post_to_hatena の非同期版。
+    """
+    target = target or HatenaTarget.from_env()
+    request = _entry_request(title, content, draft, target)
+
+    try:
+        response = await _send_hatena_request_async(
+            client,
+            "POST",
+            _entry_collection_url(target),
+            "hatena.blog.entry.create",
+            priority=PRIORITY_CRITICAL,
+            auth=request["auth"],
+            headers=request["headers"],
+            content=request["body"],
+        )
+    except httpx.HTTPError as e:
+        logger.error(f"Failed to post to Hatena Blog. {e}")
+        return None
+    return _handle_post_response(response, draft)
+
+
+async def update_hatena_entry_async(
+    client: httpx.AsyncClient,
+    edit_uri: str,
+    title: str,
+    content: str,
+    draft: bool = True,
+    target: HatenaTarget | None = None,
+) -> str | None:
+    """
+    update_hatena_entry の非同期版。
+
+    Raises:
+        HatenaEntryNotFoundError: 更新対象のエントリが存在しない場合。
+    """
+    target = target or HatenaTarget.from_env()
+    request = _entry_request(title, content, draft, target)
+
+    try:
+        response = await _send_hatena_request_async(
+            client,
+            "PUT",
+            edit_uri,
+            "hatena.blog.entry.update",
+            priority=PRIORITY_CRITICAL,
+            auth=request["auth"],
+            headers=request["headers"],
+            content=request["body"],
+        )
+    except httpx.HTTPError as e:
+        logger.error(f"Failed to update the Hatena Blog entry. {e}")
+        return None
+    return _handle_update_response(response, edit_uri, draft)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,75 @@
+import os
+from dataclasses import dataclass
+
+DEFAULT_TARGET_NAME = "default"  # HATENA_USER_ID, HATENA_BLOG_ID, HATENA_API_KEY で指定する投稿先の名前
+
+
+@dataclass(frozen=True)
+class HatenaTarget:
+    """
+    投稿先のはてなブログと、そのアカウント（はてなフォトライフのアカウントを兼ねる）。
+
+    Attributes:
+        name: 投稿先の名前。結果の表示と、環境変数 HATENA_TARGET_<NAME>_* の名前に使用する。
+        user_id: はてなのユーザー ID。画像は、ユーザー ID ごとのはてなフォトライフにアップロードする。
+        blog_id: はてなブログのブログ ID（ドメイン）。
+        api_key: AtomPub の API キー。
+    """
+
+    name: str
+    user_id: str
+    blog_id: str
+    api_key: str
+
+    @classmethod
+    def from_env(cls) -> "HatenaTarget":
+        """
+        環境変数 HATENA_USER_ID, HATENA_BLOG_ID, HATENA_API_KEY で指定した投稿先を返す。
+        """
+        return cls(
+            DEFAULT_TARGET_NAME,
+            os.environ["HATENA_USER_ID"],
+            os.environ["HATENA_BLOG_ID"],
+            os.environ["HATENA_API_KEY"],
+        )
+
+
+def get_hatena_target(name: str) -> HatenaTarget:
+    """
+    名前で指定した投稿先を環境変数から読み込む。
+
+    default 以外の投稿先は HATENA_TARGET_<NAME>_BLOG_ID（NAME は大文字、`-` は `_`）でブログを指定する。
+    HATENA_TARGET_<NAME>_USER_ID と HATENA_TARGET_<NAME>_API_KEY を省略した場合は、
+    HATENA_USER_ID と HATENA_API_KEY（同じアカウントの別のブログ）を使用する。
+
+    Raises:
+        ValueError: 投稿先のブログ ID が設定されていない場合。
+    """
+    if name == DEFAULT_TARGET_NAME:
+        return HatenaTarget.from_env()
+    prefix = f"HATENA_TARGET_{name.upper().replace('-', '_')}_"
+    blog_id = os.environ.get(prefix + "BLOG_ID")
+    if not blog_id:
+        raise ValueError(f"投稿先 {name} のブログ ID ({prefix}BLOG_ID) が設定されていません。")
+    return HatenaTarget(
+        name,
+        os.environ.get(prefix + "USER_ID") or os.environ["HATENA_USER_ID"],
+        blog_id,
+        os.environ.get(prefix + "API_KEY") or os.environ["HATENA_API_KEY"],
+    )
+
+
+def get_hatena_targets(names: str | None = None) -> list:
+    """
+    カンマ区切りの名前で指定した投稿先のリストを返す。
+    省略時は環境変数 HATENA_TARGETS を、それもなければ default の投稿先だけを使用する。
+
+    Raises:
+        ValueError: 投稿先のブログ ID が設定されていない場合、または同じ投稿先を重複して指定した場合。
+    """
+    names = names or os.environ.get("HATENA_TARGETS") or DEFAULT_TARGET_NAME
+    targets = [get_hatena_target(name.strip()) for name in names.split(",") if name.strip()]
+    blogs = [(target.user_id, target.blog_id) for target in targets]
+    if len(set(blogs)) != len(blogs):
+        raise ValueError(f"同じブログが投稿先に重複して指定されています: {names}")
+    return targets or [HatenaTarget.from_env()]
@@ -0,0 +1,168 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from src.utils.env_loader import get_app_dir
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CACHE_FILENAME = ".notion_to_hatena_image_cache.sqlite3"
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_AGE_DAYS = 180
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    hatena_user_id TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    syntax TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    PRIMARY KEY (hatena_user_id, content_hash)
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    hatena_user_id TEXT NOT NULL,
+    block_id TEXT NOT NULL,
+    last_edited_time TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    PRIMARY KEY (hatena_user_id, block_id)
+);
+CREATE INDEX IF NOT EXISTS images_last_used_at ON images (last_used_at);
+"""
+
+
+def get_default_cache_path() -> str:
+    """
+    キャッシュファイルのパスを返す。
+    環境変数 IMAGE_CACHE_PATH があればそれを、なければ .env と同じディレクトリのファイルを使用する。
+    """
+    return os.environ.get("IMAGE_CACHE_PATH") or os.path.join(get_app_dir(), IMAGE_CACHE_FILENAME)
+
+
+class ImageCache:
+    """
+    はてなフォトライフへのアップロード結果を保存する SQLite のキャッシュ。
+
+    画像の内容のハッシュ値（SHA-256）をキーにはてな記法 ([f:id:...]) を保持する。
+    さらに Notion の画像ブロック ID と last_edited_time から内容のハッシュ値を引けるようにし、
+    ブロックが更新されていなければ画像のダウンロード自体も省略できるようにする。
+    キャッシュははてなユーザー（フォトライフのアカウント）ごとに分けて管理する。
+    """
+
+    def __init__(self, path: str | None = None, max_entries: int | None = None, max_age_days: float | None = None):
+        self.path = path or get_default_cache_path()
+        if max_entries is None:
+            max_entries = int(os.environ.get("IMAGE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        if max_age_days is None:
+            max_age_days = float(os.environ.get("IMAGE_CACHE_MAX_AGE_DAYS", DEFAULT_MAX_AGE_DAYS))
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+
+        # アップロードはワーカースレッドから行われるため、1つの接続をロックで保護して共有する
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def get_by_block(self, hatena_user_id: str, block_id: str, last_edited_time: str) -> str | None:
+        """
+        画像ブロックの ID と最終更新日時からアップロード済みのはてな記法を取得する。
+        """
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT images.syntax, images.content_hash FROM blocks "
+                "JOIN images ON images.hatena_user_id = blocks.hatena_user_id "
+                "AND images.content_hash = blocks.content_hash "
+                "WHERE blocks.hatena_user_id = ? AND blocks.block_id = ? AND blocks.last_edited_time = ?",
+                (hatena_user_id, block_id, last_edited_time),
+            ).fetchone()
+            if row is None:
+                return None
+            self._touch(hatena_user_id, row[1])
+            return row[0]
+
+    def get_by_hash(self, hatena_user_id: str, content_hash: str) -> str | None:
+        """
+        画像の内容のハッシュ値からアップロード済みのはてな記法を取得する。
+        """
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT syntax FROM images WHERE hatena_user_id = ? AND content_hash = ?",
+                (hatena_user_id, content_hash),
+            ).fetchone()
+            if row is None:
+                return None
+            self._touch(hatena_user_id, content_hash)
+            return row[0]
+
+    def put(self, hatena_user_id: str, content_hash: str, syntax: str, size: int) -> None:
+        """
+        アップロード結果を保存する。
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO images (hatena_user_id, content_hash, syntax, size, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (hatena_user_id, content_hash, syntax, size, now, now),
+            )
+
+    def link_block(self, hatena_user_id: str, block_id: str, last_edited_time: str, content_hash: str) -> None:
+        """
+        画像ブロックと画像の内容のハッシュ値を関連付ける。
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO blocks (hatena_user_id, block_id, last_edited_time, content_hash) "
+                "VALUES (?, ?, ?, ?)",
+                (hatena_user_id, block_id, last_edited_time, content_hash),
+            )
+
+    def evict(self) -> int:
+        """
+        古いエントリと上限件数を超えたエントリを削除する。
+
+        Returns:
+            削除した画像エントリの件数。
+        """
+        cutoff = time.time() - self.max_age_days * 24 * 60 * 60
+        with self._lock, self._connection:
+            deleted = self._connection.execute("DELETE FROM images WHERE last_used_at < ?", (cutoff,)).rowcount
+            deleted += self._connection.execute(
+                "DELETE FROM images WHERE rowid NOT IN (SELECT rowid FROM images ORDER BY last_used_at DESC LIMIT ?)",
+                (self.max_entries,),
+            ).rowcount
+            self._connection.execute(
+                "DELETE FROM blocks WHERE NOT EXISTS (SELECT 1 FROM images "
+                "WHERE images.hatena_user_id = blocks.hatena_user_id AND images.content_hash = blocks.content_hash)"
+            )
+        if deleted:
+            logger.info(f"Evicted {deleted} entries from the image cache.")
+        return deleted
+
+    def purge(self) -> None:
+        """
+        キャッシュをすべて削除する。
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM blocks")
+            self._connection.execute("DELETE FROM images")
+        logger.info(f"Purged the image cache: {self.path}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _touch(self, hatena_user_id: str, content_hash: str) -> None:
+        self._connection.execute(
+            "UPDATE images SET last_used_at = ? WHERE hatena_user_id = ? AND content_hash = ?",
+            (time.time(), hatena_user_id, content_hash),
+        )
@@ -0,0 +1,32 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+
+@dataclass(frozen=True)
+class ImageJob:
+    """
+    変換時に収集した、はてなフォトライフへアップロードする画像の情報。
+
+    Attributes:
+        url: Notion から取得した画像の URL。
+        block_id: 画像ブロックの ID。アップロードキャッシュのキーに使用する。
+        last_edited_time: 画像ブロックの最終更新日時。アップロードキャッシュのキーに使用する。
+        expiry_time: Notion にアップロードされた画像の URL（署名付き URL）の有効期限。
+            外部の画像など、期限がない場合は None。
+    """
+
+    url: str
+    block_id: str | None = None
+    last_edited_time: str | None = None
+    expiry_time: str | None = None
+
+    def expires_at(self) -> float | None:
+        """
+        URL の有効期限を UNIX 時刻で返す。期限がない（または解釈できない）場合は None。
+        """
+        if not self.expiry_time:
+            return None
+        try:
+            return datetime.fromisoformat(self.expiry_time).timestamp()
+        except ValueError:
+            return None
@@ -0,0 +1,241 @@
+import io
+import logging
+import math
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+SPOOL_MAX_SIZE = 1024 * 1024  # これを超える画像データはメモリではなく一時ファイルに保持する
+_JPEG_QUALITY = 85
+_MAX_SHRINK_ATTEMPTS = 5
+_SHRINK_STEP = 0.75
+
+IMAGE_FORMATS = ("jpeg", "webp", "original")  # 最適化で変換する形式
+DEFAULT_MAX_PROCESS_WORKERS = 4  # 画像の最適化を行うプロセス数の上限の既定値
+# Pillow の形式名 -> Content-Type（"original" で形式を変えずに再圧縮する形式）
+_REENCODABLE_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+_EXIF_ORIENTATION = 0x0112
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class ImageOptions:
+    """
+    アップロード前に行う画像の最適化の設定。
+
+    Attributes:
+        output_format: 変換後の形式。"jpeg"（透過のある画像は PNG）、"webp"、"original"（形式を変えない）のいずれか。
+        quality: JPEG / WebP の品質 (1-100)。
+        max_width: これより幅の広い画像をこの幅に縮小する（ピクセル）。0 の場合は縮小しない。
+    """
+
+    output_format: str = "jpeg"
+    quality: int = _JPEG_QUALITY
+    max_width: int = 0
+
+
+def is_pillow_available() -> bool:
+    """
+    画像の縮小・再圧縮に使用する Pillow がインストールされているかを返す。
+    """
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def shrink_image(image_file, size: int, max_bytes: int) -> tuple[object, int, str] | None:
+    """
+    画像を縮小・再圧縮して max_bytes 以下に収める。Pillow が必要。
+
+    透過のある画像は PNG、それ以外は JPEG として保存し、収まるまで解像度を下げて再試行する。
+    JPEG は最初の縮小後の大きさ以上で最も小さい解像度でデコードし、元の解像度の画素を展開しない。
+
+    Args:
+        image_file: 画像データを保持するファイルオブジェクト。
+        size: 画像データのバイト数。
+        max_bytes: 縮小後のバイト数の上限。
+
+    Returns:
+        縮小後の画像を保持するファイルオブジェクト、バイト数、Content-Type のタプル。
+        Pillow がない場合や上限に収まらなかった場合は None。
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.warning("Pillow is not installed. Oversized images cannot be shrunk.")
+        return None
+
+    # 面積がバイト数にほぼ比例すると見なして最初の縮小率を決める
+    scale = min(1.0, math.sqrt(max_bytes / size))
+    image_file.seek(0)
+    try:
+        image = Image.open(image_file)
+        original_width, original_height = image.size
+        _decode(image, (max(1, int(original_width * scale)), max(1, int(original_height * scale))))
+    except (OSError, Image.DecompressionBombError) as e:
+        logger.error(f"Failed to open the image for shrinking. {e}")
+        return None
+
+    has_alpha = _has_alpha(image)
+    image_format, content_type = ("PNG", "image/png") if has_alpha else ("JPEG", "image/jpeg")
+    if not has_alpha and image.mode != "RGB":
+        image = image.convert("RGB")
+
+    for _ in range(_MAX_SHRINK_ATTEMPTS):
+        width = max(1, int(original_width * scale))
+        height = max(1, int(original_height * scale))
+        resized = image.resize((width, height), Image.LANCZOS) if image.size != (width, height) else image
+
+        output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        if image_format == "JPEG":
+            resized.save(output, format=image_format, quality=_JPEG_QUALITY, optimize=True)
+        else:
+            resized.save(output, format=image_format, optimize=True)
+        output_size = output.seek(0, io.SEEK_END)
+
+        if output_size <= max_bytes:
+            logger.info(f"Shrunk an image from {size} bytes to {output_size} bytes ({width}x{height}).")
+            output.seek(0)
+            return output, output_size, content_type
+
+        output.close()
+        scale *= _SHRINK_STEP
+
+    logger.error(f"Could not shrink the image to {max_bytes} bytes.")
+    return None
+
+
+def _has_alpha(image) -> bool:
+    return image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+
+
+def _decode(image, target_size: tuple[int, int] | None):
+    """
+    画像をデコードする。JPEG で target_size（縮小後の大きさ）を指定した場合は、それ以上の大きさで最も小さい
+    1/2, 1/4, 1/8 の解像度でデコードし、元の解像度の画素をメモリに展開しない。
+    """
+    if target_size is not None and image.format == "JPEG":
+        image.draft("RGB", target_size)
+    image.load()
+
+
+def _target_size_for_width(image, max_width: int) -> tuple[int, int] | None:
+    """
+    EXIF の向きを反映した幅を max_width に縮小する場合の、デコードする画像（向きを反映する前）の大きさ。
+    縮小しない場合は None。
+    """
+    width, height = image.size
+    # 向きが 5〜8 の画像は、90度回転して表示する
+    display_width = height if image.getexif().get(_EXIF_ORIENTATION, 1) >= 5 else width
+    if max_width <= 0 or display_width <= max_width:
+        return None
+    scale = max_width / display_width
+    return max(1, math.ceil(width * scale)), max(1, math.ceil(height * scale))
+
+
+def optimize_image(data: bytes, options: ImageOptions) -> tuple[bytes, str] | None:
+    """
+    画像を縮小・形式の変換・再圧縮する。CPU を使う処理のため、プロセスプールのワーカーで実行する。Pillow が必要。
+
+    EXIF の向きを画素に反映してからメタデータを除き、幅が max_width を超える画像は縦横比を保って縮小する。
+    JPEG は縮小後の大きさ以上で最も小さい解像度でデコードし、元の解像度の画素を展開しない。
+
+    Args:
+        data: 画像データ。
+        options: 最適化の設定。
+
+    Returns:
+        最適化した画像データと Content-Type のタプル。開けない画像やアニメーション画像、
+        縮小せず再圧縮しても小さくならない画像の場合は None（元の画像をそのまま使う）。
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        original_size = image.size
+        _decode(image, _target_size_for_width(image, options.max_width))
+    except (OSError, Image.DecompressionBombError):
+        return None
+    if getattr(image, "is_animated", False):
+        return None
+
+    source_format = image.format
+    icc_profile = image.info.get("icc_profile")
+    # JPEG は縮小後の大きさに近い解像度でデコードするため、その場合は元の画像より小さくなっている
+    changed = image.size != original_size
+    # EXIF の向きは再保存すると失われるため、画素に反映しておく
+    if image.getexif().get(_EXIF_ORIENTATION, 1) != 1:
+        image = ImageOps.exif_transpose(image)
+        changed = True
+    if options.max_width > 0 and image.width > options.max_width:
+        height = max(1, round(image.height * options.max_width / image.width))
+        image = image.resize((options.max_width, height), Image.LANCZOS)
+        changed = True
+
+    has_alpha = _has_alpha(image)
+    if options.output_format == "original" and source_format in _REENCODABLE_FORMATS:
+        image_format = source_format
+    elif options.output_format == "webp":
+        image_format = "WEBP"
+    else:
+        image_format = "PNG" if has_alpha else "JPEG"
+
+    output = io.BytesIO()
+    save_options = {"icc_profile": icc_profile} if icc_profile else {}
+    if image_format == "JPEG":
+        if image.mode not in ("RGB", "L", "CMYK"):
+            image = image.convert("RGB")
+        image.save(output, format="JPEG", quality=options.quality, optimize=True, progressive=True, **save_options)
+    elif image_format == "WEBP":
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if has_alpha else "RGB")
+        image.save(output, format="WEBP", quality=options.quality, method=4, **save_options)
+    else:
+        image.save(output, format="PNG", optimize=True, **save_options)
+
+    optimized = output.getvalue()
+    if not changed and len(optimized) >= len(data):
+        return None
+    return optimized, _REENCODABLE_FORMATS[image_format]
+
+
+def get_image_process_pool() -> ProcessPoolExecutor:
+    """
+    画像の最適化を行うプロセスプールを取得または初期化する。
+
+    プロセス数は環境変数 HATENA_IMAGE_PROCESS_WORKERS（既定値は CPU 数、最大 4）で指定する。
+    ワーカーはスレッドを使う親プロセスを fork しないよう spawn で起動する。
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            max_workers = int(os.environ.get("HATENA_IMAGE_PROCESS_WORKERS", 0))
+            if max_workers <= 0:
+                max_workers = min(DEFAULT_MAX_PROCESS_WORKERS, os.cpu_count() or 1)
+            context = multiprocessing.get_context("spawn")
+            _process_pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+        return _process_pool
+
+
+def shutdown_image_process_pool(wait: bool = True):
+    """
+    プロセスプールを終了する。次に使用するときは作り直す。
+
+    ワーカーが異常終了してプールが使えなくなった場合や、プロセスプールのワーカーなど
+    インタープリターの終了時にプールが自動で終了しないプロセスで、処理の最後に呼び出す。
+    """
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,182 @@
+import os
+import sqlite3
+import threading
+import time
+
+from src.utils.env_loader import get_app_dir
+
+JOURNAL_FILENAME = ".notion_to_hatena_journal.sqlite3"
+DEFAULT_MAX_AGE_DAYS = 30
+
+# 記録する処理段階（この順に進む）
+STEP_FETCHED = "fetched"  # ページを取得した
+STEP_CONVERTED = "converted"  # すべての画像をアップロードし、Markdown に変換した
+STEP_POSTING = "posting"  # エントリの新規作成 (POST) を送信する（結果は不明）
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    page_id TEXT NOT NULL,
+    hatena_user_id TEXT NOT NULL,
+    hatena_blog_id TEXT NOT NULL,
+    last_edited_time TEXT,
+    step TEXT NOT NULL,
+    title TEXT,
+    markdown TEXT,
+    edit_uri TEXT,
+    content_hash TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (page_id, hatena_user_id, hatena_blog_id)
+);
+CREATE TABLE IF NOT EXISTS images (
+    page_id TEXT NOT NULL,
+    hatena_user_id TEXT NOT NULL,
+    block_id TEXT NOT NULL,
+    last_edited_time TEXT NOT NULL,
+    syntax TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (page_id, hatena_user_id, block_id, last_edited_time)
+);
+"""
+
+
+def get_default_journal_path() -> str:
+    """
+    ジャーナルファイルのパスを返す。
+    環境変数 JOURNAL_PATH があればそれを、なければ .env と同じディレクトリのファイルを使用する。
+    """
+    return os.environ.get("JOURNAL_PATH") or os.path.join(get_app_dir(), JOURNAL_FILENAME)
+
+
+class Journal:
+    """
+    ページの処理の途中経過（チェックポイント）を記録する SQLite の先行書き込みジャーナル。
+
+    ページごとに、取得したページの last_edited_time、アップロードした画像、変換した Markdown、
+    エントリの新規作成を送信したことを、それぞれの処理を終えた（POST は送信する）時点で記録する。
+    応答を受け取れなかった新規作成でエントリが作成されていた場合は、そのエントリの編集用 URI も記録する。
+    処理が途中で失敗した場合は、再実行時に記録した段階から再開する。投稿が完了したページの記録は削除する。
+    画像はページの中の画像ブロックの ID と last_edited_time をキーにし、はてなユーザーごとに分けて管理する。
+    """
+
+    def __init__(self, path: str | None = None, max_age_days: float | None = None):
+        self.path = path or get_default_journal_path()
+        if max_age_days is None:
+            max_age_days = float(os.environ.get("JOURNAL_MAX_AGE_DAYS", DEFAULT_MAX_AGE_DAYS))
+        self.max_age_days = max_age_days
+
+        # 画像のアップロードはワーカースレッドから記録されるため、1つの接続をロックで保護して共有する
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def get(self, page_id: str, hatena_user_id: str, hatena_blog_id: str) -> dict | None:
+        """
+        ページの処理の記録を取得する。
+
+        Returns:
+            last_edited_time, step, title, markdown, edit_uri, content_hash を持つ辞書。記録がない場合は None。
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT last_edited_time, step, title, markdown, edit_uri, content_hash FROM pages "
+                "WHERE page_id = ? AND hatena_user_id = ? AND hatena_blog_id = ?",
+                (page_id, hatena_user_id, hatena_blog_id),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def put(
+        self,
+        page_id: str,
+        hatena_user_id: str,
+        hatena_blog_id: str,
+        last_edited_time: str | None,
+        step: str,
+        title: str | None = None,
+        markdown: str | None = None,
+        edit_uri: str | None = None,
+        content_hash: str | None = None,
+    ) -> None:
+        """
+        ページの処理を step の段階まで終えたことを記録する。
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(page_id, hatena_user_id, hatena_blog_id, last_edited_time, step, title, markdown, edit_uri, "
+                "content_hash, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    page_id,
+                    hatena_user_id,
+                    hatena_blog_id,
+                    last_edited_time,
+                    step,
+                    title,
+                    markdown,
+                    edit_uri,
+                    content_hash,
+                    time.time(),
+                ),
+            )
+
+    def get_images(self, page_id: str, hatena_user_id: str) -> dict:
+        """
+        ページでアップロードを終えた画像を取得する。
+
+        Returns:
+            (画像ブロックの ID, last_edited_time) -> はてな記法 の辞書。
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT block_id, last_edited_time, syntax FROM images WHERE page_id = ? AND hatena_user_id = ?",
+                (page_id, hatena_user_id),
+            ).fetchall()
+        return {(row["block_id"], row["last_edited_time"]): row["syntax"] for row in rows}
+
+    def put_image(self, page_id: str, hatena_user_id: str, block_id: str, last_edited_time: str, syntax: str) -> None:
+        """
+        ページの画像のアップロードを終えたことを記録する。
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO images "
+                "(page_id, hatena_user_id, block_id, last_edited_time, syntax, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (page_id, hatena_user_id, block_id, last_edited_time, syntax, time.time()),
+            )
+
+    def finish(self, page_id: str, hatena_user_id: str, hatena_blog_id: str) -> None:
+        """
+        投稿が完了したページの記録を削除する。
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM pages WHERE page_id = ? AND hatena_user_id = ? AND hatena_blog_id = ?",
+                (page_id, hatena_user_id, hatena_blog_id),
+            )
+            self._connection.execute(
+                "DELETE FROM images WHERE page_id = ? AND hatena_user_id = ?", (page_id, hatena_user_id)
+            )
+
+    def evict(self) -> int:
+        """
+        max_age_days より長く更新されていない記録を削除する。
+
+        Returns:
+            削除したページと画像の記録の数。
+        """
+        cutoff = time.time() - self.max_age_days * 86400
+        with self._lock, self._connection:
+            deleted = self._connection.execute("DELETE FROM pages WHERE updated_at < ?", (cutoff,)).rowcount
+            deleted += self._connection.execute("DELETE FROM images WHERE updated_at < ?", (cutoff,)).rowcount
+        return deleted
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,10 +1,21 @@
+import asyncio
 import logging
 import os
+import random
+import re
+import time
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-from notion_client import Client
+import httpx
+from notion_client import AsyncClient, Client
+from notion_client.errors import HTTPResponseError
 
+from src.models.block_tree import compact_block
 from src.utils.env_loader import load_env
 from src.utils.errors import NotionAPIKeyError
+from src.utils.metrics import get_metrics
+from src.utils.rate_limiter import PRIORITY_CRITICAL, PRIORITY_NORMAL, get_rate_limiter, parse_retry_after
 
 load_env()
 
@@ -12,6 +23,59 @@ logger = logging.getLogger(__name__)
 
 _notion_client_instance = None  # Notionクライアントインスタンスを保持するための変数
 
+DEFAULT_FETCH_CONCURRENCY = 3  # Notion API のレート制限（平均 3 req/s）に合わせた既定の並列数
+NOTION_PAGE_SIZE = 100  # blocks.children.list で1回に取得できる最大件数
+NOTION_MAX_RETRIES = 5
+NOTION_INITIAL_BACKOFF_SECONDS = 1.0
+NOTION_MAX_BACKOFF_SECONDS = 30.0
+_RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# 計測時にエンドポイントごとに集計できるよう、パス中の ID を置き換える
+_NOTION_ID_PATTERN = re.compile(r"/[0-9a-fA-F-]{32,36}(?=/|$)")
+
+
+def _record_response(response: httpx.Response):
+    """
+    Notion API へのリクエストを、メソッドと ID を除いたパスをエンドポイント名として記録する。
+    """
+    response.read()
+    path = _NOTION_ID_PATTERN.sub("/{id}", response.request.url.path)
+    get_metrics().record_request(
+        f"notion {response.request.method} {path}",
+        response.status_code,
+        len(response.request.content),
+        len(response.content),
+        response.elapsed.total_seconds(),
+    )
+
+
+async def _record_response_async(response: httpx.Response):
+    """
+    _record_response の非同期クライアント用。
+    """
+    await response.aread()
+    _record_response(response)
+
+
+def _get_client_options() -> dict:
+    """
+    Notion クライアントのオプションを返す。
+    NOTION_API_KEYがない場合はNotionAPIKeyErrorを発生させる。
+    """
+    notion_api_key = os.environ.get("NOTION_API_KEY")
+    if not notion_api_key:
+        error_message = (
+            "環境変数 'NOTION_API_KEY' が設定されていません。\n"
+            "'.env' ファイルが実行ファイルと同じディレクトリに存在するか、\n"
+            "またはシステム環境変数に 'NOTION_API_KEY' が設定されていることを確認してください。"
+        )
+        logger.error(error_message)
+        raise NotionAPIKeyError(error_message)
+    options = {"auth": notion_api_key}
+    if os.environ.get("NOTION_API_BASE_URL"):
+        # ベンチマーク用のローカルサーバーなどに向ける場合に使用する
+        options["base_url"] = os.environ["NOTION_API_BASE_URL"]
+    return options
+
 
 def _get_notion_client() -> Client:
     """
@@ -20,77 +84,557 @@ def _get_notion_client() -> Client:
     """
     global _notion_client_instance
     if _notion_client_instance is None:
-        notion_api_key = os.environ.get("NOTION_API_KEY")
-        if not notion_api_key:
-            error_message = (
-                "環境変数 'NOTION_API_KEY' が設定されていません。\n"
-                "'.env' ファイルが実行ファイルと同じディレクトリに存在するか、\n"
-                "またはシステム環境変数に 'NOTION_API_KEY' が設定されていることを確認してください。"
-            )
-            logger.error(error_message)
-            raise NotionAPIKeyError(error_message)
-        _notion_client_instance = Client(auth=notion_api_key)
+        options = _get_client_options()
+        _notion_client_instance = Client(options, client=httpx.Client(event_hooks={"response": [_record_response]}))
     return _notion_client_instance
 
 
-def fetch_blocks_recursively(block_id: str) -> list:
+def create_async_notion_client() -> AsyncClient:
+    """
+    非同期 API 用の Notion クライアントを作成する。
+    httpx の非同期クライアントはイベントループごとに作る必要があるため、呼び出し側で aclose する。
+    NOTION_API_KEYがない場合はNotionAPIKeyErrorを発生させる。
+    """
+    options = _get_client_options()
+    return AsyncClient(options, client=httpx.AsyncClient(event_hooks={"response": [_record_response_async]}))
+
+
+def _get_retry_after(error: HTTPResponseError) -> float | None:
+    return parse_retry_after(error.headers.get("Retry-After") if error.headers else None)
+
+
+def _get_retry_delay(error: HTTPResponseError, attempt: int) -> float:
+    """
+    リトライまでの待機秒数を求める。
+    Retry-After ヘッダーがあればそれに従い、なければ指数バックオフ（ジッター付き）とする。
+    """
+    retry_after = _get_retry_after(error)
+    if retry_after is not None:
+        return retry_after
+    return min(NOTION_MAX_BACKOFF_SECONDS, NOTION_INITIAL_BACKOFF_SECONDS * (2**attempt)) + random.uniform(0, 0.5)
+
+
+def _next_retry_delay(description: str, error: HTTPResponseError, attempt: int, limiter) -> float | None:
+    """
+    Notion API のエラーを再試行するかを判定する。_call_with_retry とその非同期版で共有する（待機は呼び出し側で行う）。
+
+    レート制限 (429) の場合は RateLimiter に通知して Notion へのすべての送信を止める（待機は次の acquire で行う）。
+
+    Returns:
+        呼び出し側で待機する秒数（429 の場合は 0）。再試行しない場合は None。
+    """
+    if error.status not in _RETRYABLE_STATUS_CODES or attempt >= NOTION_MAX_RETRIES:
+        return None
+    if error.status == 429:
+        delay = limiter.on_rate_limited(_get_retry_after(error))
+    else:
+        delay = _get_retry_delay(error, attempt)
+    get_metrics().record_retry("notion", str(error.status), delay)
+    logger.warning(
+        f"Notion API returned {error.status} for {description}. "
+        f"Retrying in {delay:.1f}s ({attempt + 1}/{NOTION_MAX_RETRIES})."
+    )
+    return 0.0 if error.status == 429 else delay
+
+
+def _call_with_retry(description: str, func, priority: int = PRIORITY_NORMAL, **kwargs) -> dict:
+    """
+    Notion API を呼び出す。
+
+    送信前に Notion 用の RateLimiter で送信間隔を調整する（priority が小さいリクエストを先に送信する）。
+    レート制限 (429) の場合は RateLimiter に通知して Notion へのすべての送信を止め、再開後に再試行する。
+    サーバーエラー (5xx) の場合はバックオフしながら再試行する。
+    """
+    limiter = get_rate_limiter("notion")
+    attempt = 0
+    while True:
+        limiter.acquire(priority)
+        try:
+            response = func(**kwargs)
+        except HTTPResponseError as e:
+            delay = _next_retry_delay(description, e, attempt, limiter)
+            if delay is None:
+                raise
+            attempt += 1
+            if delay:
+                time.sleep(delay)
+            continue
+        limiter.on_success()
+        return response
+
+
+def _list_block_children(
+    notion: Client, block_id: str, start_cursor: str | None = None, priority: int = PRIORITY_NORMAL
+) -> dict:
+    """
+    blocks.children.list を1ページ分呼び出す。
+    """
+    params = {"block_id": block_id, "page_size": NOTION_PAGE_SIZE}
+    if start_cursor:
+        params["start_cursor"] = start_cursor
+    return _call_with_retry(f"block {block_id}", notion.blocks.children.list, priority=priority, **params)
+
+
+def fetch_block_children(block_id: str) -> list:
+    """
+    指定ブロックの直下の子ブロックを、ページネーションを辿ってすべて取得する。
+
+    Args:
+        block_id: The ID of the Notion block (or page).
+
+    Returns:
+        A list of the direct child block objects (without nested children).
+    """
+    notion = _get_notion_client()
+    children = []
+    start_cursor = None
+    started_at = time.perf_counter()
+    while True:
+        response = _list_block_children(notion, block_id, start_cursor)
+        children.extend(response.get("results", []))
+        if not response.get("has_more"):
+            break
+        start_cursor = response.get("next_cursor")
+
+    seconds = time.perf_counter() - started_at
+    metrics = get_metrics()
+    metrics.add_span("notion.fetch_block_children", seconds)
+    metrics.record_item("block_fetch", block_id, seconds, children=len(children))
+    return children
+
+
+def _get_fetch_concurrency(max_workers: int | None) -> int:
+    if max_workers is None:
+        max_workers = int(os.environ.get("NOTION_FETCH_CONCURRENCY", DEFAULT_FETCH_CONCURRENCY))
+    return max(1, max_workers)
+
+
+def _use_compact_blocks(compact: bool | None) -> bool:
+    if compact is None:
+        return os.environ.get("NOTION_COMPACT_BLOCKS", "0") != "0"
+    return compact
+
+
+def _received_block(block: dict, compact: bool):
+    """
+    取得したページ直下のブロックを返す。compact が True の場合は CompactBlock に変換する。
+    """
+    return compact_block(block) if compact else block
+
+
+def _attach_children(parent, children: list, compact: bool):
+    """
+    取得した子ブロックを親ブロックの children に格納し、格納した子ブロックを返す。
+    compact が True の場合は、子ブロックを CompactBlock に変換して API の応答の dict を保持しない。
+    """
+    if compact:
+        children = tuple(compact_block(child) for child in children)
+        parent.children = children
+    else:
+        parent["children"] = children
+    return children
+
+
+def iter_blocks_recursively(
+    block_id: str, max_workers: int | None = None, compact: bool | None = None
+) -> Iterator[dict]:
+    """
+    ページ直下のブロックを、子孫ブロックの取得が完了したものから先頭から順に返すジェネレーター。
+
+    ブロックツリーを幅優先で走査し、兄弟ブロックの子要素はワーカープールで並行して取得する。
+    呼び出し側が返されたブロックを処理している間も、後続のブロックの取得は続行される。
+
+    Args:
+        block_id: The ID of the Notion block (or page).
+        max_workers: 同時に発行するリクエスト数の上限。
+            省略時は環境変数 NOTION_FETCH_CONCURRENCY（既定値 3）を使用する。
+        compact: True の場合は、取得した応答をその場で CompactBlock に変換し、API の応答の dict を保持しない。
+            省略時は環境変数 NOTION_COMPACT_BLOCKS（既定値 0）が 0 でなければ変換する。
+
+    Yields:
+        子孫ブロックを children に持つ、ページ直下のブロック。
+    """
+    notion = _get_notion_client()  # ここでクライアントを取得し、必要であればNotionAPIKeyErrorをraise
+    max_workers = _get_fetch_concurrency(max_workers)
+    compact = _use_compact_blocks(compact)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="notion-fetch") as executor:
+        top_blocks = []  # ページ直下のブロック（取得済みの分）
+        remaining = []  # ページ直下のブロックごとの、未完了の子孫ブロックの取得数
+        # future -> (子要素を取得中のブロック, ページ直下のブロックの番号)。ページ直下の取得は (None, None)
+        pending = {}
+        next_index = 0
+
+        def submit_children(block: dict, top_index: int):
+            remaining[top_index] += 1
+            pending[executor.submit(fetch_block_children, block["id"])] = (block, top_index)
+
+        # ページ直下のブロックは、先頭から順に変換へ渡すため子孫ブロックより優先して取得する
+        pending[executor.submit(_list_block_children, notion, block_id, None, PRIORITY_CRITICAL)] = (None, None)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                parent, top_index = pending.pop(future)
+                if parent is None:
+                    response = future.result()
+                    for block in response.get("results", []):
+                        block = _received_block(block, compact)
+                        top_blocks.append(block)
+                        remaining.append(0)
+                        if block.get("has_children"):
+                            submit_children(block, len(top_blocks) - 1)
+                    if response.get("has_more"):
+                        next_page = executor.submit(
+                            _list_block_children, notion, block_id, response.get("next_cursor"), PRIORITY_CRITICAL
+                        )
+                        pending[next_page] = (None, None)
+                else:
+                    children = _attach_children(parent, future.result(), compact)
+                    remaining[top_index] -= 1
+                    for child in children:
+                        if child.get("has_children"):
+                            submit_children(child, top_index)
+
+            while next_index < len(top_blocks) and remaining[next_index] == 0:
+                block = top_blocks[next_index]
+                top_blocks[next_index] = None  # 返したブロックへの参照は保持しない
+                next_index += 1
+                yield block
+
+
+def fetch_blocks_recursively(block_id: str, max_workers: int | None = None, compact: bool | None = None) -> list:
     """
     Fetches all blocks from a Notion page recursively.
 
+    ブロックツリーを幅優先で走査し、兄弟ブロックの子要素はワーカープールで並行して取得する。
+    各階層はページネーション (has_more / next_cursor) を最後まで辿る。
+
     Args:
         block_id: The ID of the Notion block (or page).
+        max_workers: 同時に発行するリクエスト数の上限。
+            省略時は環境変数 NOTION_FETCH_CONCURRENCY（既定値 3）を使用する。
+        compact: True の場合は、ブロックを CompactBlock で返す。省略時は環境変数 NOTION_COMPACT_BLOCKS に従う。
 
     Returns:
         A list of block objects with their children.
     """
+    return list(iter_blocks_recursively(block_id, max_workers, compact))
+
+
+def query_database_page_ids(database_id: str) -> list:
+    """
+    Notion データベースに含まれるすべてのページの ID を、ページネーションを辿って取得する。
+
+    Args:
+        database_id: The ID of the Notion database.
+
+    Returns:
+        ハイフンを除いた 32 文字のページ ID のリスト。
+    """
     notion = _get_notion_client()  # ここでクライアントを取得し、必要であればNotionAPIKeyErrorをraise
-    blocks = []
-    response = notion.blocks.children.list(block_id=block_id)
-    results = response.get("results", [])
-    blocks.extend(results)
+    page_ids = []
+    params = {"database_id": database_id, "page_size": NOTION_PAGE_SIZE}
+    while True:
+        response = _call_with_retry(f"database {database_id}", notion.databases.query, **params)
+        page_ids.extend(page["id"].replace("-", "") for page in response.get("results", []))
+        if not response.get("has_more"):
+            return page_ids
+        params["start_cursor"] = response.get("next_cursor")
 
-    for block in results:
-        if block.get("has_children"):
-            block["children"] = fetch_blocks_recursively(block["id"])
 
-    return blocks
+def query_edited_pages(since: str | None = None, database_id: str | None = None) -> list:
+    """
+    since 以降に編集されたページを、last_edited_time の新しい順に取得する。
 
+    database_id を指定した場合はデータベースのクエリ、省略した場合は検索 API
+    （インテグレーションがアクセスできるすべてのページ）を使用する。
 
-def fetch_page_title(page_id: str) -> str | None:
+    Args:
+        since: ISO 8601 形式の日時。この日時以降（同じ日時を含む）に編集されたページを返す。省略時はすべてのページ。
+        database_id: The ID of the Notion database.
+
+    Returns:
+        (ハイフンを除いた 32 文字のページ ID, last_edited_time) のタプルのリスト。
     """
-    Fetches the title of a Notion page.
+    notion = _get_notion_client()  # ここでクライアントを取得し、必要であればNotionAPIKeyErrorをraise
+    sort = {"timestamp": "last_edited_time", "direction": "descending"}
+    if database_id:
+        description = f"database {database_id}"
+        func = notion.databases.query
+        params = {"database_id": database_id, "sorts": [sort], "page_size": NOTION_PAGE_SIZE}
+        if since:
+            params["filter"] = {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": since}}
+    else:
+        description = "search"
+        func = notion.search
+        params = {"filter": {"property": "object", "value": "page"}, "sort": sort, "page_size": NOTION_PAGE_SIZE}
+
+    pages = []
+    while True:
+        response = _call_with_retry(description, func, **params)
+        for page in response.get("results", []):
+            last_edited_time = page.get("last_edited_time")
+            # 検索 API は編集日時で絞り込めないため、新しい順に辿って since より古いページが出たら打ち切る
+            if since and last_edited_time and last_edited_time < since:
+                return pages
+            pages.append((page["id"].replace("-", ""), last_edited_time))
+        if not response.get("has_more"):
+            return pages
+        params["start_cursor"] = response.get("next_cursor")
+
+
+def fetch_block(block_id: str) -> dict | None:
+    """
+    ブロックを1件取得する（子ブロックは含まない）。有効期限が切れた画像の URL を取得し直す場合に使用する。
+
+    Args:
+        block_id: The ID of the Notion block.
+
+    Returns:
+        The block object, or None on failure.
+    """
+    notion = _get_notion_client()
+    try:
+        return _call_with_retry(
+            f"block {block_id}", notion.blocks.retrieve, priority=PRIORITY_CRITICAL, block_id=block_id
+        )
+    except Exception as e:
+        logger.error(f"An exception occurred while fetching the Notion block {block_id}: {e}")
+        return None
+
+
+def fetch_page(page_id: str) -> dict | None:
+    """
+    Fetches a Notion page object.
 
     Args:
         page_id: The ID of the Notion page.
 
     Returns:
-        The title of the page, or None if not found.
+        The page object, or None on failure.
     """
     notion = _get_notion_client()  # ここでクライアントを取得し、必要であればNotionAPIKeyErrorをraise
     try:
-        page = notion.pages.retrieve(page_id=page_id)
-        properties = page.get("properties")
-        if not properties:
-            logger.error("Page object does not contain 'properties'.")
-            return None
-
-        for prop_data in properties.values():
-            if isinstance(prop_data, dict) and prop_data.get("type") == "title":
-                title_list = prop_data.get("title", [])
-                if title_list:
-                    return title_list[0].get("plain_text")
-
-        logger.error("Could not find a property of type 'title' in the page properties.")
+        return _call_with_retry(f"page {page_id}", notion.pages.retrieve, priority=PRIORITY_CRITICAL, page_id=page_id)
+    except Exception as e:
+        logger.error(
+            f"An exception occurred while fetching the Notion page: {e}",
+            exc_info=True,
+        )
         return None
 
+
+async def _call_with_retry_async(description: str, func, priority: int = PRIORITY_NORMAL, **kwargs) -> dict:
+    """
+    _call_with_retry の非同期版。func には AsyncClient のエンドポイントを渡す。
+    """
+    limiter = get_rate_limiter("notion")
+    attempt = 0
+    while True:
+        await limiter.acquire_async(priority)
+        try:
+            response = await func(**kwargs)
+        except HTTPResponseError as e:
+            delay = _next_retry_delay(description, e, attempt, limiter)
+            if delay is None:
+                raise
+            attempt += 1
+            if delay:
+                await asyncio.sleep(delay)
+            continue
+        limiter.on_success()
+        return response
+
+
+async def fetch_block_async(notion: AsyncClient, block_id: str) -> dict | None:
+    """
+    fetch_block の非同期版。
+
+    Args:
+        notion: create_async_notion_client で作成したクライアント。
+        block_id: The ID of the Notion block.
+
+    Returns:
+        The block object, or None on failure.
+    """
+    try:
+        return await _call_with_retry_async(
+            f"block {block_id}", notion.blocks.retrieve, priority=PRIORITY_CRITICAL, block_id=block_id
+        )
+    except Exception as e:
+        logger.error(f"An exception occurred while fetching the Notion block {block_id}: {e}")
+        return None
+
+
+async def fetch_page_async(notion: AsyncClient, page_id: str) -> dict | None:
+    """
+    fetch_page の非同期版。
+
+    Args:
+        notion: create_async_notion_client で作成したクライアント。
+        page_id: The ID of the Notion page.
+
+    Returns:
+        The page object, or None on failure.
+    """
+    try:
+        return await _call_with_retry_async(
+            f"page {page_id}", notion.pages.retrieve, priority=PRIORITY_CRITICAL, page_id=page_id
+        )
     except Exception as e:
         logger.error(
-            f"An exception occurred while fetching the Notion page title: {e}",
+            f"An exception occurred while fetching the Notion page: {e}",
             exc_info=True,
         )
         return None
 
 
+async def _fetch_block_children_async(
+    notion: AsyncClient, block_id: str, semaphore: asyncio.Semaphore, priority: int = PRIORITY_NORMAL
+) -> list:
+    """
+    fetch_block_children の非同期版。
+    """
+    children = []
+    params = {"block_id": block_id, "page_size": NOTION_PAGE_SIZE}
+    started_at = time.perf_counter()
+    while True:
+        async with semaphore:
+            response = await _call_with_retry_async(
+                f"block {block_id}", notion.blocks.children.list, priority=priority, **params
+            )
+        children.extend(response.get("results", []))
+        if not response.get("has_more"):
+            break
+        params["start_cursor"] = response.get("next_cursor")
+
+    seconds = time.perf_counter() - started_at
+    metrics = get_metrics()
+    metrics.add_span("notion.fetch_block_children", seconds)
+    metrics.record_item("block_fetch", block_id, seconds, children=len(children))
+    return children
+
+
+async def _attach_descendants_async(notion: AsyncClient, block, semaphore: asyncio.Semaphore, compact: bool):
+    """
+    ブロックの子孫ブロックをすべて取得し、children に格納する。兄弟ブロックの子要素は並行して取得する。
+    """
+    children = await _fetch_block_children_async(notion, block["id"], semaphore)
+    children = _attach_children(block, children, compact)
+    await asyncio.gather(
+        *(
+            _attach_descendants_async(notion, child, semaphore, compact)
+            for child in children
+            if child.get("has_children")
+        )
+    )
+
+
+async def iter_blocks_recursively_async(
+    notion: AsyncClient, block_id: str, max_workers: int | None = None, compact: bool | None = None
+) -> AsyncIterator[dict]:
+    """
+    iter_blocks_recursively の非同期版。
+    ページ直下のブロックを、子孫ブロック (children) の取得が終わったものから先頭から順に返す。
+
+    Args:
+        notion: create_async_notion_client で作成したクライアント。
+        block_id: The ID of the Notion block (or page).
+        max_workers: 同時に発行するリクエスト数の上限。
+            省略時は環境変数 NOTION_FETCH_CONCURRENCY（既定値 3）を使用する。
+        compact: True の場合は、取得した応答をその場で CompactBlock に変換する。
+            省略時は環境変数 NOTION_COMPACT_BLOCKS（既定値 0）が 0 でなければ変換する。
+
+    Yields:
+        ページ直下のブロック（子孫ブロックを children に含む）。
+    """
+    max_workers = _get_fetch_concurrency(max_workers)
+    compact = _use_compact_blocks(compact)
+    semaphore = asyncio.Semaphore(max_workers)
+    # ページ直下のブロックと、その子孫ブロックを取得するタスク（子を持たないブロックは None）
+    queue = []
+    next_index = 0
+    try:
+        params = {"block_id": block_id, "page_size": NOTION_PAGE_SIZE}
+        while True:
+            # ページ直下のブロックは、先頭から順に変換へ渡すため子孫ブロックより優先して取得する
+            async with semaphore:
+                response = await _call_with_retry_async(
+                    f"block {block_id}", notion.blocks.children.list, priority=PRIORITY_CRITICAL, **params
+                )
+            for block in response.get("results", []):
+                block = _received_block(block, compact)
+                task = None
+                if block.get("has_children"):
+                    task = asyncio.create_task(_attach_descendants_async(notion, block, semaphore, compact))
+                queue.append((block, task))
+
+            while next_index < len(queue) and (queue[next_index][1] is None or queue[next_index][1].done()):
+                block, task = queue[next_index]
+                if task is not None:
+                    task.result()
+                next_index += 1
+                yield block
+
+            if not response.get("has_more"):
+                break
+            params["start_cursor"] = response.get("next_cursor")
+
+        while next_index < len(queue):
+            block, task = queue[next_index]
+            if task is not None:
+                await task
+            next_index += 1
+            yield block
+    finally:
+        # 途中で中断された場合は、残りの取得を取り消す
+        for _, task in queue[next_index:]:
+            if task is not None:
+                task.cancel()
+
+
+def get_page_title(page: dict) -> str | None:
+    """
+    Extracts the title from a Notion page object.
+
+    Args:
+        page: The Notion page object.
+
+    Returns:
+        The title of the page, or None if not found.
+    """
+    properties = page.get("properties")
+    if not properties:
+        logger.error("Page object does not contain 'properties'.")
+        return None
+
+    for prop_data in properties.values():
+        if isinstance(prop_data, dict) and prop_data.get("type") == "title":
+            title_list = prop_data.get("title", [])
+            if title_list:
+                return title_list[0].get("plain_text")
+
+    logger.error("Could not find a property of type 'title' in the page properties.")
+    return None
+
+
+def fetch_page_title(page_id: str) -> str | None:
+    """
+    Fetches the title of a Notion page.
+
+    Args:
+        page_id: The ID of the Notion page.
+
+    Returns:
+        The title of the page, or None if not found.
+    """
+    page = fetch_page(page_id)
+    if page is None:
+        return None
+    return get_page_title(page)
+
+
 if __name__ == "__main__":
     # Replace with a test page ID
     test_page_id = "YOUR_TEST_PAGE_ID"
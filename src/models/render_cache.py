@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from src.utils.env_loader import get_app_dir
+
+logger = logging.getLogger(__name__)
+
+RENDER_CACHE_FILENAME = ".notion_to_hatena_render_cache.sqlite3"
+DEFAULT_MAX_ENTRIES = 50000
+_FLUSH_THRESHOLD = 500  # この件数の書き込みがたまったら、1つのトランザクションでまとめて保存する
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blocks (
+    block_id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    markdown TEXT,
+    image_block_ids TEXT NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blocks_last_used_at ON blocks (last_used_at);
+"""
+
+
+def get_default_render_cache_path() -> str:
+    """
+    キャッシュファイルのパスを返す。
+    環境変数 RENDER_CACHE_PATH があればそれを、なければ .env と同じディレクトリのファイルを使用する。
+    """
+    return os.environ.get("RENDER_CACHE_PATH") or os.path.join(get_app_dir(), RENDER_CACHE_FILENAME)
+
+
+class RenderCache:
+    """
+    ページ直下のブロック（子孫ブロックを含む）の変換結果を保存する SQLite のキャッシュ。
+
+    ブロック ID と、ブロックツリーに含まれる全ブロックの ID と last_edited_time から求めた
+    フィンガープリントをキーに、プレースホルダー入りの Markdown と、画像ブロックの ID を保持する。
+    上限件数 (RENDER_CACHE_MAX_ENTRIES) を超えた場合は、最後に使用した日時が古いものから削除する。
+
+    書き込みと最終使用日時の更新はメモリにためておき、一定件数ごとと flush / close 時にまとめて保存する。
+    """
+
+    def __init__(self, path: str | None = None, max_entries: int | None = None):
+        self.path = path or get_default_render_cache_path()
+        if max_entries is None:
+            max_entries = int(os.environ.get("RENDER_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        self.max_entries = max_entries
+
+        # 変換はバッチ処理のワーカースレッドから行われるため、1つの接続をロックで保護して共有する
+        self._lock = threading.Lock()
+        self._pending_puts = {}
+        self._pending_touches = set()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def get(self, block_id: str, fingerprint: str) -> tuple[str | None, list] | None:
+        """
+        ブロックの変換結果を取得する。
+
+        Returns:
+            (Markdown, 画像ブロックの ID のリスト) のタプル。キャッシュにない場合は None。
+            Markdown が None の場合、そのブロックは何も出力しない。
+        """
+        with self._lock:
+            pending = self._pending_puts.get(block_id)
+            if pending is not None:
+                row = pending[:3]
+            else:
+                row = self._connection.execute(
+                    "SELECT fingerprint, markdown, image_block_ids FROM blocks WHERE block_id = ?", (block_id,)
+                ).fetchone()
+            if row is None or row[0] != fingerprint:
+                return None
+            self._pending_touches.add(block_id)
+            return row[1], json.loads(row[2])
+
+    def put(self, block_id: str, fingerprint: str, markdown: str | None, image_block_ids: list) -> None:
+        """
+        ブロックの変換結果を保存する。
+        """
+        with self._lock:
+            self._pending_puts[block_id] = (fingerprint, markdown, json.dumps(image_block_ids), time.time())
+            if len(self._pending_puts) >= _FLUSH_THRESHOLD:
+                self._flush()
+
+    def flush(self) -> None:
+        """
+        メモリにためている書き込みを保存する。
+        """
+        with self._lock:
+            self._flush()
+
+    def evict(self) -> int:
+        """
+        上限件数を超えたエントリを、最後に使用した日時が古いものから削除する。
+
+        Returns:
+            削除したエントリの件数。
+        """
+        with self._lock:
+            self._flush()
+            with self._connection:
+                deleted = self._connection.execute(
+                    "DELETE FROM blocks WHERE rowid NOT IN "
+                    "(SELECT rowid FROM blocks ORDER BY last_used_at DESC LIMIT ?)",
+                    (self.max_entries,),
+                ).rowcount
+        if deleted:
+            logger.info(f"Evicted {deleted} entries from the render cache.")
+        return deleted
+
+    def purge(self) -> None:
+        """
+        キャッシュをすべて削除する。
+        """
+        with self._lock:
+            self._pending_puts.clear()
+            self._pending_touches.clear()
+            with self._connection:
+                self._connection.execute("DELETE FROM blocks")
+        logger.info(f"Purged the render cache: {self.path}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _flush(self) -> None:
+        if not self._pending_puts and not self._pending_touches:
+            return
+        now = time.time()
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO blocks (block_id, fingerprint, markdown, image_block_ids, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(block_id, *values) for block_id, values in self._pending_puts.items()],
+            )
+            self._connection.executemany(
+                "UPDATE blocks SET last_used_at = ? WHERE block_id = ?",
+                [(now, block_id) for block_id in self._pending_touches - self._pending_puts.keys()],
+            )
+        self._pending_puts.clear()
+        self._pending_touches.clear()
@@ -0,0 +1,210 @@
+import base64
+import gzip
+import json
+import logging
+import tempfile
+import threading
+from collections.abc import Iterator
+from datetime import datetime, timezone
+
+from src.models.hatena_poster import DownloadedImage, download_image, download_image_job
+from src.models.image_job import ImageJob
+from src.models.image_processing import SPOOL_MAX_SIZE
+from src.models.notion_fetcher import fetch_page, get_page_title, iter_blocks_recursively
+from src.utils.errors import SnapshotFormatError
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = "notion-to-hatena-snapshot"
+SNAPSHOT_VERSION = 1
+# 画像データを分割して書き込む単位（base64 変換前のバイト数。3 の倍数にして分割位置でパディングが入らないようにする）
+_IMAGE_CHUNK_SIZE = 768 * 1024
+# 変換に使用しないため、スナップショットに保存しないブロックのメタデータ
+_OMITTED_BLOCK_KEYS = ("object", "created_time", "created_by", "last_edited_by", "parent", "archived", "in_trash")
+
+
+def _compact_block(block: dict) -> dict:
+    """
+    変換に使用しないメタデータを除いたブロックを返す。子ブロックも同様に処理する。
+    """
+    compact = {key: value for key, value in block.items() if key not in _OMITTED_BLOCK_KEYS}
+    if "children" in compact:
+        compact["children"] = [_compact_block(child) for child in compact["children"]]
+    return compact
+
+
+def _iter_uploaded_image_blocks(block: dict) -> Iterator[dict]:
+    """
+    ブロックとその子孫のうち、Notion にアップロードされた画像（URL に有効期限がある画像）のブロックを返す。
+    """
+    if block.get("type") == "image" and block.get("image", {}).get("type") == "file":
+        yield block
+    for child in block.get("children", []):
+        yield from _iter_uploaded_image_blocks(child)
+
+
+def _write_record(file, record: dict):
+    file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    file.write(b"\n")
+
+
+def _write_image(file, block_id: str, image: DownloadedImage):
+    _write_record(
+        file,
+        {
+            "type": "image",
+            "block_id": block_id,
+            "content_type": image.content_type,
+            "size": image.size,
+            # 縮小した画像でもキャッシュのキーとして使えるよう、元の画像のハッシュ値を保存する
+            "sha256": image.content_hash,
+        },
+    )
+    image.file.seek(0)
+    while chunk := image.file.read(_IMAGE_CHUNK_SIZE):
+        _write_record(
+            file, {"type": "image_data", "block_id": block_id, "data": base64.b64encode(chunk).decode("ascii")}
+        )
+
+
+def write_snapshot(page_id: str, path: str, include_images: bool = False) -> int:
+    """
+    Notion ページのタイトルとブロックツリーを、スナップショットファイルに書き出す。
+
+    スナップショットは gzip で圧縮した JSON Lines 形式で、1行目にヘッダー、
+    以降はページ直下のブロック（子孫ブロックを children に含む）を1行に1つずつ書き込む。
+    include_images が True の場合、各ブロックの前に、そのブロックに含まれる画像のデータを書き込む。
+    ブロックは取得できたものから順に書き込むため、ページ全体をメモリに保持しない。
+
+    Args:
+        page_id: The ID of the Notion page.
+        path: 書き出すファイルのパス。
+        include_images: Notion にアップロードされた画像のデータも保存するかどうか。
+
+    Returns:
+        書き込んだページ直下のブロックの数。
+    """
+    page = fetch_page(page_id)
+    if page is None:
+        raise ValueError(f"Notion ページを取得できませんでした: {page_id}")
+
+    block_count = 0
+    with gzip.open(path, "wb") as file:
+        _write_record(
+            file,
+            {
+                "type": "header",
+                "format": SNAPSHOT_FORMAT,
+                "version": SNAPSHOT_VERSION,
+                "page_id": page_id,
+                "title": get_page_title(page),
+                "last_edited_time": page.get("last_edited_time"),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "includes_images": include_images,
+            },
+        )
+        # スナップショットには API の応答と同じ形式で保存するため、CompactBlock には変換しない
+        for block in iter_blocks_recursively(page_id, compact=False):
+            if include_images:
+                for image_block in _iter_uploaded_image_blocks(block):
+                    image = download_image(image_block["image"]["file"]["url"])
+                    if image is None:
+                        logger.warning(f"Could not save the image of block {image_block['id']} to the snapshot.")
+                        continue
+                    with image:
+                        _write_image(file, image_block["id"], image)
+            _write_record(file, {"type": "block", "block": _compact_block(block)})
+            block_count += 1
+
+    logger.info(f"Saved {block_count} blocks of page {page_id} to the snapshot {path}.")
+    return block_count
+
+
+class SnapshotReader:
+    """
+    スナップショットファイルを先頭から順に読み込む。
+
+    ヘッダーは開いた時点で読み込み、ブロックは iter_blocks で1つずつ返すため、
+    大きなページでもブロックツリー全体をメモリに保持しない。
+    保存された画像は読み込んだ時点で一時ファイルに書き出し、load_image で取り出す。
+
+    Attributes:
+        page_id: ページ ID。
+        title: ページのタイトル。
+        last_edited_time: スナップショットを作成した時点のページの last_edited_time。
+        includes_images: 画像のデータを含むかどうか。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = gzip.open(path, "rt", encoding="utf-8")
+        self._images = {}
+        self._images_lock = threading.Lock()
+        try:
+            header = self._read_header()
+        except Exception:
+            self._file.close()
+            raise
+        self.page_id = header["page_id"]
+        self.title = header.get("title")
+        self.last_edited_time = header.get("last_edited_time")
+        self.includes_images = header.get("includes_images", False)
+
+    def _read_header(self) -> dict:
+        try:
+            header = json.loads(self._file.readline() or "null")
+        except (OSError, EOFError, json.JSONDecodeError) as e:
+            raise SnapshotFormatError(f"スナップショットを読み込めません: {self.path} ({e})") from e
+        if not isinstance(header, dict) or header.get("format") != SNAPSHOT_FORMAT:
+            raise SnapshotFormatError(f"スナップショットの形式ではありません: {self.path}")
+        if header.get("version", 0) > SNAPSHOT_VERSION:
+            raise SnapshotFormatError(
+                f"対応していないバージョンのスナップショットです: {self.path} (version {header.get('version')})"
+            )
+        return header
+
+    def iter_blocks(self) -> Iterator[dict]:
+        """
+        ページ直下のブロック（子孫ブロックを children に含む）を先頭から順に返すジェネレーター。
+        """
+        image_file = None
+        for line in self._file:
+            record = json.loads(line)
+            record_type = record.get("type")
+            if record_type == "block":
+                yield record["block"]
+            elif record_type == "image":
+                image_file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+                image = DownloadedImage(image_file, record["size"], record["content_type"], record["sha256"])
+                with self._images_lock:
+                    previous = self._images.pop(record["block_id"], None)
+                    self._images[record["block_id"]] = image
+                if previous is not None:
+                    previous.close()
+            elif record_type == "image_data" and image_file is not None:
+                image_file.write(base64.b64decode(record["data"]))
+
+    def load_image(self, image_job: ImageJob) -> DownloadedImage | None:
+        """
+        スナップショットに保存された画像を返す。保存されていない画像は URL からダウンロードする。
+        ImageUploadPool の downloader として使用する。
+        """
+        with self._images_lock:
+            image = self._images.pop(image_job.block_id, None)
+        if image is None:
+            return download_image_job(image_job)
+        return image
+
+    def close(self):
+        self._file.close()
+        with self._images_lock:
+            images = list(self._images.values())
+            self._images.clear()
+        for image in images:
+            image.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import threading
+import time
+
+from src.utils.env_loader import get_app_dir
+
+SYNC_STATE_FILENAME = ".notion_to_hatena_sync.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    page_id TEXT NOT NULL,
+    hatena_user_id TEXT NOT NULL,
+    hatena_blog_id TEXT NOT NULL,
+    edit_uri TEXT NOT NULL,
+    last_edited_time TEXT,
+    content_hash TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    draft INTEGER,
+    PRIMARY KEY (page_id, hatena_user_id, hatena_blog_id)
+);
+CREATE TABLE IF NOT EXISTS watch_cursors (
+    source TEXT NOT NULL,
+    hatena_user_id TEXT NOT NULL,
+    hatena_blog_id TEXT NOT NULL,
+    last_edited_time TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (source, hatena_user_id, hatena_blog_id)
+);
+"""
+
+
+def get_default_sync_state_path() -> str:
+    """
+    同期状態ファイルのパスを返す。
+    環境変数 SYNC_STATE_PATH があればそれを、なければ .env と同じディレクトリのファイルを使用する。
+    """
+    return os.environ.get("SYNC_STATE_PATH") or os.path.join(get_app_dir(), SYNC_STATE_FILENAME)
+
+
+class SyncState:
+    """
+    Notion ページとはてなブログのエントリの対応を保存する SQLite のストア。
+
+    ページごとに、エントリの編集用 URI、同期時のページの last_edited_time、
+    生成したコンテンツのハッシュ値、下書きとして投稿したかどうかを保持し、変更がなければ投稿を省略できるようにする。
+    監視モード (--watch) のカーソルも保持する。
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or get_default_sync_state_path()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            self._connection.executescript(_SCHEMA)
+            columns = {row["name"] for row in self._connection.execute("PRAGMA table_info(entries)")}
+            if "draft" not in columns:
+                # 下書きかどうかを保存していなかったファイルは列を追加する（既存の行は不明 (NULL) とする）
+                self._connection.execute("ALTER TABLE entries ADD COLUMN draft INTEGER")
+
+    def get(self, page_id: str, hatena_user_id: str, hatena_blog_id: str) -> dict | None:
+        """
+        ページに対応するエントリの同期状態を取得する。
+
+        Returns:
+            edit_uri, last_edited_time, content_hash, draft を持つ辞書。未同期の場合は None。
+            draft は下書きとして投稿した場合は True、公開した場合は False、記録がない場合は None。
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT edit_uri, last_edited_time, content_hash, draft FROM entries "
+                "WHERE page_id = ? AND hatena_user_id = ? AND hatena_blog_id = ?",
+                (page_id, hatena_user_id, hatena_blog_id),
+            ).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        record["draft"] = None if row["draft"] is None else bool(row["draft"])
+        return record
+
+    def put(
+        self,
+        page_id: str,
+        hatena_user_id: str,
+        hatena_blog_id: str,
+        edit_uri: str,
+        last_edited_time: str | None,
+        content_hash: str,
+        draft: bool | None = None,
+    ) -> None:
+        """
+        ページに対応するエントリの同期状態を保存する。
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(page_id, hatena_user_id, hatena_blog_id, edit_uri, last_edited_time, content_hash, synced_at, draft) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    page_id,
+                    hatena_user_id,
+                    hatena_blog_id,
+                    edit_uri,
+                    last_edited_time,
+                    content_hash,
+                    time.time(),
+                    None if draft is None else int(draft),
+                ),
+            )
+
+    def get_page_ids(self, hatena_user_id: str, hatena_blog_id: str) -> dict:
+        """
+        同期しているエントリの編集用 URI -> Notion のページ ID の対応を取得する。
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT edit_uri, page_id FROM entries WHERE hatena_user_id = ? AND hatena_blog_id = ?",
+                (hatena_user_id, hatena_blog_id),
+            ).fetchall()
+        return {row["edit_uri"]: row["page_id"] for row in rows}
+
+    def get_watch_cursor(self, source: str, hatena_user_id: str, hatena_blog_id: str) -> str | None:
+        """
+        監視モードで、監視対象 (source) の編集日時をどこまで処理したか（カーソル）を取得する。
+
+        Returns:
+            ISO 8601 形式の last_edited_time。未保存の場合は None。
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT last_edited_time FROM watch_cursors "
+                "WHERE source = ? AND hatena_user_id = ? AND hatena_blog_id = ?",
+                (source, hatena_user_id, hatena_blog_id),
+            ).fetchone()
+        return row["last_edited_time"] if row else None
+
+    def put_watch_cursor(self, source: str, hatena_user_id: str, hatena_blog_id: str, last_edited_time: str) -> None:
+        """
+        監視モードのカーソルを保存する。
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO watch_cursors "
+                "(source, hatena_user_id, hatena_blog_id, last_edited_time, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (source, hatena_user_id, hatena_blog_id, last_edited_time, time.time()),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,7 +1,34 @@
+import functools
 import os
 import sys
 
-from dotenv import load_dotenv
+from dotenv import find_dotenv, load_dotenv
+
+_env_loaded = False
+
+
+@functools.cache
+def get_env_path() -> str:
+    """
+    Returns the path of the .env file used by load_env().
+    If running as a frozen executable (PyInstaller), this is the .env in the executable's directory.
+    Otherwise, it is the .env found by python-dotenv, or the one in the current working directory.
+    The result is cached because searching for the .env file is slow and the path does not change during a run.
+    """
+    if getattr(sys, "frozen", False):
+        # Running as compiled executable
+        base_path = os.path.dirname(sys.executable)
+        return os.path.join(base_path, ".env")
+
+    # Running as script
+    return find_dotenv() or os.path.join(os.getcwd(), ".env")
+
+
+def get_app_dir() -> str:
+    """
+    .env と同じディレクトリを返す。キャッシュなどのローカルファイルの保存先として使用する。
+    """
+    return os.path.dirname(os.path.abspath(get_env_path()))
 
 
 def load_env():
@@ -9,12 +36,10 @@ def load_env():
     Loads environment variables from .env file.
     If running as a frozen executable (PyInstaller), looks for .env in the executable's directory.
     Otherwise, looks in the current working directory.
+    The file is read only once; later calls do nothing.
     """
-    if getattr(sys, "frozen", False):
-        # Running as compiled executable
-        base_path = os.path.dirname(sys.executable)
-        env_path = os.path.join(base_path, ".env")
-        load_dotenv(env_path)
-    else:
-        # Running as script
-        load_dotenv()
+    global _env_loaded
+    if _env_loaded:
+        return
+    load_dotenv(get_env_path())
+    _env_loaded = True
@@ -9,3 +9,27 @@ class NotionPageIDError(Exception):
     NotionページIDが設定されていない場合に発生するカスタム例外。
     """
     pass
+
+class HatenaEntryNotFoundError(Exception):
+    """
+    更新対象のはてなブログのエントリが存在しない場合に発生するカスタム例外。
+    """
+    pass
+
+class HatenaEntryLookupError(Exception):
+    """
+    投稿の結果を確かめるためのはてなブログのエントリの検索に失敗した場合に発生するカスタム例外。
+    """
+    pass
+
+class SnapshotFormatError(Exception):
+    """
+    スナップショットファイルの形式が不正な場合に発生するカスタム例外。
+    """
+    pass
+
+class JobCancelledError(Exception):
+    """
+    処理中のジョブが取り消された場合に発生するカスタム例外。
+    """
+    pass
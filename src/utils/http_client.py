@@ -0,0 +1,170 @@
+import os
+import threading
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.utils.metrics import get_metrics
+
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 10.0
+DEFAULT_READ_TIMEOUT_SECONDS = 60.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 1.0
+DEFAULT_POOL_SIZE = 10
+
+_RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+# POST は冪等でないため、サーバーが処理せずに拒否したことが明らかなステータスのみ再試行する
+_POST_RETRYABLE_STATUS_CODES = (429, 503)
+
+_session_instance = None  # 共有する HTTP セッションを保持するための変数
+_api_session_instance = None  # 429 を再試行しない（RateLimiter に任せる）共有の HTTP セッション
+_session_lock = threading.Lock()
+
+
+class _Retry(Retry):
+    """
+    冪等なメソッドに加え、POST も 429 / 503 の場合に限り再試行する Retry。
+    """
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if (
+            method.upper() == "POST"
+            and status_code in _POST_RETRYABLE_STATUS_CODES
+            and status_code in (self.status_forcelist or ())
+        ):
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        if response is not None:
+            reason = str(response.status)
+            delay = new_retry.get_retry_after(response) if self.respect_retry_after_header else None
+        else:
+            reason = type(error).__name__ if error is not None else "unknown"
+            delay = None
+        if delay is None:
+            delay = new_retry.get_backoff_time()
+        get_metrics().record_retry("http", reason, delay)
+        return new_retry
+
+
+class TimeoutSession(requests.Session):
+    """
+    タイムアウトが指定されていないリクエストに既定のタイムアウトを設定する Session。
+    """
+
+    def __init__(self, timeout: tuple[float, float]):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def _get_timeout() -> tuple[float, float]:
+    return (
+        float(os.environ.get("HTTP_CONNECT_TIMEOUT_SECONDS", DEFAULT_CONNECT_TIMEOUT_SECONDS)),
+        float(os.environ.get("HTTP_READ_TIMEOUT_SECONDS", DEFAULT_READ_TIMEOUT_SECONDS)),
+    )
+
+
+def create_session(
+    timeout: tuple[float, float] | None = None,
+    max_retries: int | None = None,
+    backoff_factor: float | None = None,
+    pool_size: int | None = None,
+    retry_rate_limited: bool = True,
+) -> requests.Session:
+    """
+    コネクションプール、keep-alive、タイムアウト、429 / 5xx の再試行を設定した HTTP セッションを作成する。
+    省略した設定は環境変数（HTTP_CONNECT_TIMEOUT_SECONDS, HTTP_READ_TIMEOUT_SECONDS,
+    HTTP_MAX_RETRIES, HTTP_BACKOFF_FACTOR, HTTP_POOL_SIZE）または既定値を使用する。
+
+    Args:
+        timeout: 接続タイムアウトと読み込みタイムアウト（秒）のタプル。
+        max_retries: 再試行の最大回数。
+        backoff_factor: 指数バックオフの係数（秒）。Retry-After ヘッダーがある場合はそちらを優先する。
+        pool_size: ホストごとに保持する接続数の上限。
+        retry_rate_limited: 429 を再試行するかどうか。False の場合は 429 のレスポンスをそのまま返す
+            （呼び出し側の RateLimiter で送信を止めて再試行する場合）。
+
+    Returns:
+        設定済みの requests.Session。
+    """
+    if timeout is None:
+        timeout = _get_timeout()
+    if max_retries is None:
+        max_retries = int(os.environ.get("HTTP_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+    if backoff_factor is None:
+        backoff_factor = float(os.environ.get("HTTP_BACKOFF_FACTOR", DEFAULT_BACKOFF_FACTOR))
+    if pool_size is None:
+        pool_size = int(os.environ.get("HTTP_POOL_SIZE", DEFAULT_POOL_SIZE))
+
+    retry = _Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=[code for code in _RETRYABLE_STATUS_CODES if retry_rate_limited or code != 429],
+        respect_retry_after_header=True,
+        # 再試行し尽くした場合は例外ではなく最後のレスポンスを返し、呼び出し側でステータスを処理する
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = TimeoutSession(timeout)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    共有の HTTP セッションを取得または初期化する。
+    """
+    global _session_instance
+    with _session_lock:
+        if _session_instance is None:
+            _session_instance = create_session()
+        return _session_instance
+
+
+def get_api_session() -> requests.Session:
+    """
+    429 を再試行しない共有の HTTP セッションを取得または初期化する。
+    RateLimiter で送信間隔を調整する API（はてなの API など）へのリクエストに使用する。
+    """
+    global _api_session_instance
+    with _session_lock:
+        if _api_session_instance is None:
+            _api_session_instance = create_session(retry_rate_limited=False)
+        return _api_session_instance
+
+
+def is_retryable_status(method: str, status_code: int) -> bool:
+    """
+    create_session のセッションと同じ基準で、ステータスコードが再試行の対象かどうかを判定する（429 は除く）。
+    """
+    if status_code == 429:
+        return False
+    if method.upper() == "POST":
+        return status_code in _POST_RETRYABLE_STATUS_CODES
+    return status_code in _RETRYABLE_STATUS_CODES
+
+
+def create_async_client(**kwargs) -> httpx.AsyncClient:
+    """
+    create_session と同じタイムアウトを設定した、非同期 API 用の httpx.AsyncClient を作成する。
+    keep-alive で保持する接続数は HTTP_POOL_SIZE とし、同時接続数は呼び出し側の並列数で制限する。
+    接続エラーは HTTP_MAX_RETRIES 回まで再試行する（ステータスコードによる再試行は呼び出し側で行う）。
+    """
+    connect_timeout, read_timeout = _get_timeout()
+    pool_size = int(os.environ.get("HTTP_POOL_SIZE", DEFAULT_POOL_SIZE))
+    max_retries = int(os.environ.get("HTTP_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+    transport = httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(max_connections=None, max_keepalive_connections=pool_size), retries=max_retries
+    )
+    timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+    return httpx.AsyncClient(timeout=timeout, transport=transport, **kwargs)
@@ -0,0 +1,283 @@
+import heapq
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+DEFAULT_SLOWEST_LIMIT = 10  # 種類ごとに保持する、処理に時間がかかった項目の数
+PROMETHEUS_PREFIX = "notion_to_hatena"
+
+_metrics_instance = None  # 実行中の計測結果を保持するための変数
+_metrics_lock = threading.Lock()
+
+
+class RunMetrics:
+    """
+    1回の実行（1ページまたはバッチ全体）の計測結果を集計する。
+
+    複数のスレッドから同時に記録できる。集計するのは次の4種類。
+    - 処理段階 (span) ごとの回数と所要時間
+    - エンドポイントごとの HTTP リクエスト数、ステータス、送受信バイト数、所要時間
+    - サービスと理由ごとの再試行回数
+    - 種類（ブロックの取得、画像のアップロードなど）ごとの、時間がかかった上位の項目
+    """
+
+    def __init__(self, slowest_limit: int = DEFAULT_SLOWEST_LIMIT):
+        self.slowest_limit = slowest_limit
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        計測結果をすべて破棄し、計測を開始し直す。
+        """
+        with self._lock:
+            self.started_at = datetime.now(timezone.utc)
+            self._started_at = time.perf_counter()
+            self._spans = {}
+            self._requests = {}
+            self._retries = {}
+            self._slowest = {}
+            self._sequence = 0
+
+    @contextmanager
+    def span(self, stage: str):
+        """
+        with ブロックの所要時間を、処理段階 stage の時間として記録する。
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(stage, time.perf_counter() - started_at)
+
+    def add_span(self, stage: str, seconds: float):
+        with self._lock:
+            stats = self._spans.setdefault(stage, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            stats["count"] += 1
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def record_request(self, endpoint: str, status: int | None, bytes_sent: int, bytes_received: int, seconds: float):
+        """
+        HTTP リクエストを1件記録する。status が None の場合は通信エラーとして扱う。
+        """
+        with self._lock:
+            stats = self._requests.setdefault(
+                endpoint,
+                {
+                    "count": 0,
+                    "statuses": {},
+                    "bytes_sent": 0,
+                    "bytes_received": 0,
+                    "total_seconds": 0.0,
+                    "max_seconds": 0.0,
+                },
+            )
+            stats["count"] += 1
+            status_key = str(status) if status is not None else "error"
+            stats["statuses"][status_key] = stats["statuses"].get(status_key, 0) + 1
+            stats["bytes_sent"] += bytes_sent
+            stats["bytes_received"] += bytes_received
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def record_retry(self, service: str, reason: str, delay: float = 0.0):
+        """
+        再試行を1回記録する。delay には再試行までの待機秒数を指定する。
+        """
+        with self._lock:
+            stats = self._retries.setdefault(service, {})
+            reason_stats = stats.setdefault(reason, {"count": 0, "backoff_seconds": 0.0})
+            reason_stats["count"] += 1
+            reason_stats["backoff_seconds"] += delay
+
+    def record_item(self, kind: str, identifier: str, seconds: float, **details):
+        """
+        ブロックや画像など、個別の項目の所要時間を記録する。種類ごとに時間がかかった上位の項目のみを保持する。
+        """
+        with self._lock:
+            self._sequence += 1
+            # 所要時間が同じ場合に details の比較にならないよう、連番を挟む
+            entry = (seconds, self._sequence, identifier, details)
+            heap = self._slowest.setdefault(kind, [])
+            if len(heap) < self.slowest_limit:
+                heapq.heappush(heap, entry)
+            elif seconds > heap[0][0]:
+                heapq.heapreplace(heap, entry)
+
+    def to_dict(self) -> dict:
+        """
+        計測結果を JSON に変換できる辞書として返す。
+        """
+        with self._lock:
+            slowest = {
+                kind: [
+                    {"id": identifier, "seconds": seconds, **details}
+                    for seconds, _, identifier, details in sorted(heap, reverse=True)
+                ]
+                for kind, heap in self._slowest.items()
+            }
+            return {
+                "started_at": self.started_at.isoformat(),
+                "wall_seconds": time.perf_counter() - self._started_at,
+                "spans": {stage: dict(stats) for stage, stats in sorted(self._spans.items())},
+                "requests": {
+                    endpoint: {**stats, "statuses": dict(stats["statuses"])}
+                    for endpoint, stats in sorted(self._requests.items())
+                },
+                "retries": {
+                    service: {reason: dict(stats) for reason, stats in reasons.items()}
+                    for service, reasons in sorted(self._retries.items())
+                },
+                "slowest": slowest,
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        計測結果を Prometheus のテキスト形式（node_exporter の textfile collector 向け）で返す。
+        """
+        report = self.to_dict()
+        lines = []
+
+        def metric(name: str, metric_type: str, help_text: str, samples: list):
+            full_name = f"{PROMETHEUS_PREFIX}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {metric_type}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape_label(str(val))}"' for key, val in labels.items())
+                lines.append(f"{full_name}{{{label_text}}} {value}" if label_text else f"{full_name} {value}")
+
+        metric("run_seconds", "gauge", "Wall time of the run.", [({}, report["wall_seconds"])])
+
+        spans = report["spans"]
+        metric(
+            "stage_seconds_total",
+            "counter",
+            "Total time spent in each stage.",
+            [({"stage": stage}, stats["total_seconds"]) for stage, stats in spans.items()],
+        )
+        metric(
+            "stage_runs_total",
+            "counter",
+            "Number of times each stage ran.",
+            [({"stage": stage}, stats["count"]) for stage, stats in spans.items()],
+        )
+
+        requests = report["requests"]
+        metric(
+            "http_requests_total",
+            "counter",
+            "HTTP requests by endpoint and status.",
+            [
+                ({"endpoint": endpoint, "status": status}, count)
+                for endpoint, stats in requests.items()
+                for status, count in stats["statuses"].items()
+            ],
+        )
+        metric(
+            "http_request_seconds_total",
+            "counter",
+            "Total HTTP request time by endpoint.",
+            [({"endpoint": endpoint}, stats["total_seconds"]) for endpoint, stats in requests.items()],
+        )
+        metric(
+            "http_sent_bytes_total",
+            "counter",
+            "Bytes sent by endpoint.",
+            [({"endpoint": endpoint}, stats["bytes_sent"]) for endpoint, stats in requests.items()],
+        )
+        metric(
+            "http_received_bytes_total",
+            "counter",
+            "Bytes received by endpoint.",
+            [({"endpoint": endpoint}, stats["bytes_received"]) for endpoint, stats in requests.items()],
+        )
+
+        retries = report["retries"]
+        metric(
+            "retries_total",
+            "counter",
+            "Retries by service and reason.",
+            [
+                ({"service": service, "reason": reason}, stats["count"])
+                for service, reasons in retries.items()
+                for reason, stats in reasons.items()
+            ],
+        )
+        metric(
+            "retry_backoff_seconds_total",
+            "counter",
+            "Total time spent waiting before retries.",
+            [
+                ({"service": service, "reason": reason}, stats["backoff_seconds"])
+                for service, reasons in retries.items()
+                for reason, stats in reasons.items()
+            ],
+        )
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path: str):
+        """
+        計測結果をファイルに書き出す。拡張子が .prom の場合は Prometheus 形式、それ以外は JSON 形式とする。
+        """
+        text = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def format_summary(self) -> str:
+        """
+        計測結果の要約を、ログや GUI に表示するためのテキストとして返す。
+        """
+        report = self.to_dict()
+        lines = [f"Total: {report['wall_seconds']:.2f}s"]
+        for stage, stats in report["spans"].items():
+            lines.append(f"  {stage}: {stats['total_seconds']:.2f}s ({stats['count']} runs)")
+        for endpoint, stats in report["requests"].items():
+            lines.append(
+                f"  {endpoint}: {stats['count']} requests, {stats['total_seconds']:.2f}s, "
+                f"sent {stats['bytes_sent']} B, received {stats['bytes_received']} B"
+            )
+        for service, reasons in report["retries"].items():
+            count = sum(stats["count"] for stats in reasons.values())
+            backoff = sum(stats["backoff_seconds"] for stats in reasons.values())
+            lines.append(f"  retries ({service}): {count} ({backoff:.1f}s waiting)")
+        for kind, items in report["slowest"].items():
+            if items:
+                lines.append(f"  slowest {kind}: {items[0]['id']} ({items[0]['seconds']:.2f}s)")
+        return "\n".join(lines)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def get_metrics() -> RunMetrics:
+    """
+    共有の計測結果を取得または初期化する。
+    """
+    global _metrics_instance
+    with _metrics_lock:
+        if _metrics_instance is None:
+            _metrics_instance = RunMetrics()
+        return _metrics_instance
+
+
+def requests_response_hook(endpoint: str) -> dict:
+    """
+    requests のレスポンスを endpoint として記録するフック。`hooks=` 引数に渡して使用する。
+    """
+
+    def record(response, *args, **kwargs):
+        bytes_sent = int(response.request.headers.get("Content-Length") or 0)
+        # ストリーミングで受信する場合は本文を読まずに済むよう、Content-Length を使用する
+        bytes_received = int(response.headers.get("Content-Length") or 0)
+        get_metrics().record_request(
+            endpoint, response.status_code, bytes_sent, bytes_received, response.elapsed.total_seconds()
+        )
+
+    return {"response": record}
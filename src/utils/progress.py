@@ -0,0 +1,80 @@
+import threading
+from collections.abc import Callable
+
+from src.utils.errors import JobCancelledError
+
+# 処理段階
+STAGE_QUEUED = "queued"  # 実行を待っている
+STAGE_FETCHING_PAGE = "fetching_page"  # ページを取得している
+STAGE_CONVERTING = "converting"  # ブロックを取得しながら Markdown に変換している
+STAGE_UPLOADING_IMAGES = "uploading_images"  # 変換を終え、画像のアップロードを待っている
+STAGE_POSTING = "posting"  # はてなブログに投稿している
+STAGE_DONE = "done"  # 処理を終えた
+
+
+class JobProgress:
+    """
+    1ページ分の処理の進捗を保持し、取り消しを受け付ける。
+
+    処理の各段階で更新され、更新のたびに on_change を呼び出す。
+    on_change はブロックの取得や画像のアップロードのワーカースレッドから呼ばれることがある。
+    cancel を呼ぶと、処理は次の区切り（ブロックの変換の前、画像のアップロードの待機中、投稿の前）で
+    JobCancelledError を送出して中断する。
+
+    Attributes:
+        stage: 現在の処理段階 (STAGE_*)。
+        blocks_fetched: 取得したブロックの数（子孫ブロックを含む）。
+        images_total: 見つかった画像の数。
+        images_uploaded: アップロードを終えた画像の数（失敗を含む）。
+    """
+
+    def __init__(self, on_change: Callable[["JobProgress"], None] | None = None):
+        self.on_change = on_change
+        self.stage = STAGE_QUEUED
+        self.blocks_fetched = 0
+        self.images_total = 0
+        self.images_uploaded = 0
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def set_stage(self, stage: str):
+        with self._lock:
+            self.stage = stage
+        self._notify()
+
+    def add_blocks(self, count: int):
+        with self._lock:
+            self.blocks_fetched += count
+        self._notify()
+
+    def add_image(self):
+        with self._lock:
+            self.images_total += 1
+        self._notify()
+
+    def image_uploaded(self):
+        with self._lock:
+            self.images_uploaded += 1
+        self._notify()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        """
+        処理の取り消しを要求する。
+        """
+        self.cancel_event.set()
+        self._notify()
+
+    def check_cancelled(self):
+        """
+        取り消しが要求されていれば JobCancelledError を送出する。
+        """
+        if self.cancelled:
+            raise JobCancelledError("処理が取り消されました。")
+
+    def _notify(self):
+        if self.on_change is not None:
+            self.on_change(self)
@@ -0,0 +1,231 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+
+from src.utils.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# リクエストの優先度。値が小さいほど先に送信する
+PRIORITY_CRITICAL = 0  # ページの取得や記事の投稿など、処理全体の待ち時間に直結するリクエスト
+PRIORITY_NORMAL = 10  # 子ブロックの取得など
+PRIORITY_BACKGROUND = 20  # 画像のアップロードなど、他の処理と並行して進められるリクエスト
+
+# サービスごとの既定の秒間リクエスト数。環境変数 <SERVICE>_RATE_LIMIT で変更でき、0 の場合は制限しない
+DEFAULT_RATE_LIMITS = {
+    "notion": 3.0,  # Notion API の上限（インテグレーションごとに平均 3 req/s）
+    "hatena": 5.0,
+}
+
+INITIAL_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 30.0
+MIN_RATE_RATIO = 0.1  # 429 を受けて送信レートを下げる場合の下限（設定値に対する割合）
+RATE_RECOVERY_RATIO = 0.05  # 成功したリクエストごとに回復させる送信レート（設定値に対する割合）
+_ASYNC_POLL_SECONDS = 0.01  # acquire_async で順番を待つ間隔の最小値
+
+_limiters = {}  # サービス名 -> RateLimiter
+_limiters_lock = threading.Lock()
+
+
+class RateLimiter:
+    """
+    優先度付きのトークンバケットで、サービスへのリクエストの送信間隔を制御する。
+
+    - 秒間 rate 個のトークンを補充し、最大 burst 個までためておく。トークンを1つ消費して1リクエストを送信する。
+    - トークンを待っているリクエストは、優先度の高いもの（値の小さいもの）から、同じ優先度なら到着順に送信する。
+    - 429 を受けた場合 (on_rate_limited) は、Retry-After（なければ指数バックオフ）の間すべての送信を止め、
+      送信レートを半分に下げる。成功したリクエストごと (on_success) に送信レートを少しずつ設定値まで戻す。
+
+    Args:
+        service: サービス名（ログと計測に使用する）。
+        rate: 秒間リクエスト数。0 以下の場合はトークンによる制限を行わない（Retry-After による停止のみ行う）。
+        burst: ためておけるトークンの最大数。省略時は rate（最低 1）。
+    """
+
+    def __init__(self, service: str, rate: float, burst: float | None = None):
+        self.service = service
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self._current_rate = rate
+        self._tokens = self.burst
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._consecutive_rate_limits = 0
+        self._waiters = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+
+    @property
+    def current_rate(self) -> float:
+        with self._condition:
+            return self._current_rate
+
+    def acquire(self, priority: int = PRIORITY_NORMAL) -> float:
+        """
+        リクエストを送信してよくなるまで待つ。
+
+        Args:
+            priority: 優先度。値が小さいほど先に送信する。
+
+        Returns:
+            待機した秒数。
+        """
+        started_at = time.monotonic()
+        ticket = (priority, next(self._counter))
+        with self._condition:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._waiters[0] == ticket:
+                        delay = self._time_until_ready(now)
+                        if delay <= 0:
+                            heapq.heappop(self._waiters)
+                            if self.rate > 0:
+                                self._tokens -= 1
+                            # 次に優先度の高いリクエストを起こす
+                            self._condition.notify_all()
+                            break
+                        self._condition.wait(delay)
+                    else:
+                        self._condition.wait()
+            except BaseException:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+                raise
+
+        waited = time.monotonic() - started_at
+        get_metrics().add_span(f"rate_limit.wait.{self.service}", waited)
+        return waited
+
+    async def acquire_async(self, priority: int = PRIORITY_NORMAL) -> float:
+        """
+        acquire の非同期版。イベントループを止めずに、リクエストを送信してよくなるまで待つ。
+        スレッドから acquire するリクエストと同じ順番待ちに並ぶ。
+
+        Returns:
+            待機した秒数。
+        """
+        started_at = time.monotonic()
+        ticket = (priority, next(self._counter))
+        with self._condition:
+            heapq.heappush(self._waiters, ticket)
+        try:
+            while True:
+                with self._condition:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._waiters[0] == ticket:
+                        delay = self._time_until_ready(now)
+                        if delay <= 0:
+                            heapq.heappop(self._waiters)
+                            if self.rate > 0:
+                                self._tokens -= 1
+                            self._condition.notify_all()
+                            break
+                    else:
+                        # 先に並んでいるリクエストが送信されるまで、トークン1つ分の間隔でようすを見る
+                        delay = 1 / self._current_rate if self.rate > 0 else _ASYNC_POLL_SECONDS
+                await asyncio.sleep(max(delay, _ASYNC_POLL_SECONDS))
+        except BaseException:
+            with self._condition:
+                if ticket in self._waiters:
+                    self._waiters.remove(ticket)
+                    heapq.heapify(self._waiters)
+                self._condition.notify_all()
+            raise
+
+        waited = time.monotonic() - started_at
+        get_metrics().add_span(f"rate_limit.wait.{self.service}", waited)
+        return waited
+
+    def on_success(self):
+        """
+        リクエストが成功した（429 以外が返った）ことを通知し、下げた送信レートを少しずつ戻す。
+        """
+        with self._condition:
+            self._consecutive_rate_limits = 0
+            if self.rate > 0 and self._current_rate < self.rate:
+                self._refill(time.monotonic())
+                self._current_rate = min(self.rate, self._current_rate + self.rate * RATE_RECOVERY_RATIO)
+
+    def on_rate_limited(self, retry_after: float | None = None) -> float:
+        """
+        429 を受けたことを通知する。Retry-After（なければ指数バックオフ）の間すべての送信を止め、送信レートを下げる。
+
+        Args:
+            retry_after: Retry-After ヘッダーの秒数。
+
+        Returns:
+            送信を再開するまでの秒数。
+        """
+        with self._condition:
+            now = time.monotonic()
+            self._refill(now)
+            if retry_after is not None:
+                delay = max(retry_after, 0.0)
+            else:
+                delay = min(MAX_BACKOFF_SECONDS, INITIAL_BACKOFF_SECONDS * (2**self._consecutive_rate_limits))
+                delay += random.uniform(0, 0.5)
+            self._consecutive_rate_limits += 1
+            self._paused_until = max(self._paused_until, now + delay)
+            if self.rate > 0:
+                self._current_rate = max(self.rate * MIN_RATE_RATIO, self._current_rate / 2)
+                # 再開直後にためたトークンで一斉に送信しないよう、トークンを空にする
+                self._tokens = min(self._tokens, 0.0)
+            self._condition.notify_all()
+            delay = self._paused_until - now
+            current_rate = self._current_rate
+
+        logger.warning(
+            f"{self.service} rate limit reached. Pausing requests for {delay:.1f}s (rate: {current_rate:.2f} req/s)."
+        )
+        return delay
+
+    def _refill(self, now: float):
+        # 送信を止めている間はトークンを補充しない
+        start = max(self._updated_at, self._paused_until)
+        if self.rate > 0 and now > start:
+            self._tokens = min(self.burst, self._tokens + (now - start) * self._current_rate)
+        self._updated_at = now
+
+    def _time_until_ready(self, now: float) -> float:
+        delay = self._paused_until - now
+        if self.rate > 0 and self._tokens < 1:
+            delay = max(delay, (1 - self._tokens) / self._current_rate)
+        return delay
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Retry-After ヘッダーの値（秒数）を解釈する。解釈できない場合は None を返す。
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+
+def get_rate_limiter(service: str) -> RateLimiter:
+    """
+    サービスの RateLimiter を取得または初期化する。
+    秒間リクエスト数は環境変数 <SERVICE>_RATE_LIMIT、ためておけるトークン数は <SERVICE>_RATE_BURST で変更できる。
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(service)
+        if limiter is None:
+            prefix = service.upper()
+            rate = float(os.environ.get(f"{prefix}_RATE_LIMIT", DEFAULT_RATE_LIMITS.get(service, 0.0)))
+            burst = os.environ.get(f"{prefix}_RATE_BURST")
+            limiter = RateLimiter(service, rate, float(burst) if burst else None)
+            _limiters[service] = limiter
+        return limiter
@@ -1,45 +1,171 @@
+import itertools
+import os
 import sys
+import threading
 
-from PySide6.QtCore import QThread, Signal
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
 from PySide6.QtWidgets import (
     QApplication,
     QCheckBox,
+    QHeaderView,
     QLabel,
-    QLineEdit,
     QMainWindow,
     QMessageBox,
+    QPlainTextEdit,
     QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
     QVBoxLayout,
     QWidget,
 )
 
-from src.controllers.main_controller import process_notion_to_hatena
-from src.utils.errors import NotionAPIKeyError, NotionPageIDError
+from src.models.entry_index import EntryIndex
+from src.models.image_cache import ImageCache
+from src.models.render_cache import RenderCache
+from src.utils.errors import JobCancelledError, NotionAPIKeyError, NotionPageIDError
+from src.utils.metrics import get_metrics
+from src.utils.progress import (
+    STAGE_CONVERTING,
+    STAGE_DONE,
+    STAGE_FETCHING_PAGE,
+    STAGE_POSTING,
+    STAGE_QUEUED,
+    STAGE_UPLOADING_IMAGES,
+    JobProgress,
+)
+
+STAGE_LABELS = {
+    STAGE_QUEUED: "Queued",
+    STAGE_FETCHING_PAGE: "Fetching page",
+    STAGE_CONVERTING: "Converting",
+    STAGE_UPLOADING_IMAGES: "Uploading images",
+    STAGE_POSTING: "Posting",
+    STAGE_DONE: "Done",
+}
+# BATCH_CONCURRENCY が未設定の場合に同時に実行するジョブ数（バッチモードの既定値と同じ）
+DEFAULT_JOB_CONCURRENCY = 2
+
+# ジョブの一覧の列
+COLUMN_PAGE = 0
+COLUMN_STAGE = 1
+COLUMN_BLOCKS = 2
+COLUMN_IMAGES = 3
+COLUMN_RESULT = 4
+COLUMN_CANCEL = 5
+COLUMN_HEADERS = ("Page", "Stage", "Blocks", "Images", "Result", "")
+
+
+def result_label(status):
+    """
+    処理結果 (STATUS_*) を一覧に表示するメッセージに変換する。
+    """
+    from src.controllers.main_controller import (
+        STATUS_FAILED,
+        STATUS_POSTED,
+        STATUS_SKIPPED,
+        STATUS_UNCHANGED,
+        STATUS_UPDATED,
+    )
+
+    labels = {
+        STATUS_POSTED: "はてなブログへの投稿が成功しました！",
+        STATUS_UPDATED: "はてなブログの記事を更新しました。",
+        STATUS_UNCHANGED: "変更がないため投稿しませんでした。",
+        STATUS_SKIPPED: "タイトルまたは本文がないため投稿しませんでした。",
+        STATUS_FAILED: "はてなブログへの投稿に失敗しました。",
+    }
+    return labels.get(status, status)
+
+
+class SharedEntryIndex:
+    """
+    ウィンドウのすべてのジョブで共有するエントリの索引。
+
+    バッチモードと同じく、最初に実行したジョブで1回だけ投稿先ごとに更新する（更新中はほかのジョブは待つ）。
+    """
+
+    def __init__(self):
+        self.entry_index = EntryIndex()
+        self._lock = threading.Lock()
+        self._refreshed = False
+
+    def get(self):
+        with self._lock:
+            if not self._refreshed:
+                from src.controllers.main_controller import refresh_entry_index
+                from src.models.hatena_target import get_hatena_targets
+
+                for target in get_hatena_targets():
+                    refresh_entry_index(self.entry_index, target=target)
+                self._refreshed = True
+        return self.entry_index
+
+    def close(self):
+        self.entry_index.close()
+
 
+class JobSignals(QObject):
+    # ジョブ ID, 処理段階, ブロック数, アップロード済みの画像数, 画像数
+    progress_signal = Signal(int, str, int, int, int)
+    finished_signal = Signal(int, str)  # ジョブ ID, 処理結果のメッセージ
+    error_signal = Signal(int, str)  # ジョブ ID, エラーメッセージ
+    cancelled_signal = Signal(int)  # ジョブ ID
 
-class WorkerThread(QThread):
-    finished_signal = Signal(str)
-    error_signal = Signal(str)
 
-    def __init__(self, url_or_id, publish):
+class PageJob(QRunnable):
+    """
+    1ページを投稿するジョブ。MainWindow のスレッドプールで実行する。
+
+    進捗は JobProgress から progress_signal で通知する（ブロックの取得や画像のアップロードの
+    ワーカースレッドから送信されるため、受け取る側ではキュー接続で GUI スレッドに渡される）。
+    """
+
+    def __init__(self, job_id, url_or_id, publish, image_cache, render_cache, entry_index):
         super().__init__()
+        # Python 側でジョブを保持するため、実行後に Qt に削除させない
+        self.setAutoDelete(False)
+        self.job_id = job_id
         self.url_or_id = url_or_id
         self.publish = publish
+        self.image_cache = image_cache
+        self.render_cache = render_cache
+        self.entry_index = entry_index
+        self.signals = JobSignals()
+        self.progress = JobProgress(on_change=self.on_progress)
+
+    def on_progress(self, progress):
+        self.signals.progress_signal.emit(
+            self.job_id, progress.stage, progress.blocks_fetched, progress.images_uploaded, progress.images_total
+        )
 
     def run(self):
+        if self.progress.cancelled:
+            self.signals.cancelled_signal.emit(self.job_id)
+            return
         try:
-            process_notion_to_hatena(self.url_or_id, self.publish)
-            self.finished_signal.emit("はてなブログへの投稿が成功しました！")
+            # notion_client や requests の読み込みに時間がかかるため、ウィンドウの表示後に最初のジョブで読み込む
+            from src.controllers.main_controller import process_notion_to_hatena
+
+            status = process_notion_to_hatena(
+                self.url_or_id,
+                self.publish,
+                image_cache=self.image_cache,
+                render_cache=self.render_cache,
+                progress=self.progress,
+                entry_index=self.entry_index.get(),
+            )
+            self.signals.finished_signal.emit(self.job_id, result_label(status))
+        except JobCancelledError:
+            self.signals.cancelled_signal.emit(self.job_id)
         except NotionAPIKeyError as e:
-            self.error_signal.emit(str(e))
+            self.signals.error_signal.emit(self.job_id, str(e))
         except NotionPageIDError as e:
-            self.error_signal.emit(str(e))
+            self.signals.error_signal.emit(self.job_id, str(e))
         except ValueError as e:
             # main_controller.pyで発生する不正なNotion ID/URLに関するエラー
-            self.error_signal.emit(f"入力エラー: {e}")
+            self.signals.error_signal.emit(self.job_id, f"入力エラー: {e}")
         except Exception as e:
-            self.error_signal.emit(f"予期せぬエラーが発生しました: {e}")
-
+            self.signals.error_signal.emit(self.job_id, f"予期せぬエラーが発生しました: {e}")
 
 
 class MainWindow(QMainWindow):
@@ -47,63 +173,157 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.setWindowTitle("Notion to Hatena")
 
+        # 同時に実行するジョブ数は、バッチモードと同じ BATCH_CONCURRENCY で指定する
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(max(1, int(os.environ.get("BATCH_CONCURRENCY", DEFAULT_JOB_CONCURRENCY))))
+        self.jobs = {}  # ジョブ ID -> 実行中または実行待ちの PageJob
+        self.job_rows = {}  # ジョブ ID -> 一覧の行
+        self.job_ids = itertools.count(1)
+        # キャッシュはすべてのジョブで共有し、ウィンドウを閉じるときに閉じる
+        self.image_cache = None
+        self.render_cache = None
+        self.entry_index = None
+
         # Main layout
         layout = QVBoxLayout()
 
         # URL/ID Input
-        self.url_label = QLabel("Notion Page URL or ID:")
+        self.url_label = QLabel("Notion Page URLs or IDs (one per line):")
         layout.addWidget(self.url_label)
-        self.url_input = QLineEdit()
+        self.url_input = QPlainTextEdit()
+        self.url_input.setFixedHeight(80)
         layout.addWidget(self.url_input)
 
         # Publish Checkbox
         self.publish_checkbox = QCheckBox("Publish directly (default is draft)")
         layout.addWidget(self.publish_checkbox)
 
+        # Metrics Checkbox
+        self.metrics_checkbox = QCheckBox("Show timing report when all jobs are finished")
+        layout.addWidget(self.metrics_checkbox)
+
         # Execute Button
-        self.execute_button = QPushButton("Execute")
+        self.execute_button = QPushButton("Add to Queue")
         self.execute_button.clicked.connect(self.on_execute)
         layout.addWidget(self.execute_button)
 
+        # Job list
+        self.job_table = QTableWidget(0, len(COLUMN_HEADERS))
+        self.job_table.setHorizontalHeaderLabels(COLUMN_HEADERS)
+        self.job_table.verticalHeader().setVisible(False)
+        self.job_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        header = self.job_table.horizontalHeader()
+        header.setSectionResizeMode(COLUMN_PAGE, QHeaderView.ResizeMode.Stretch)
+        header.setSectionResizeMode(COLUMN_RESULT, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.job_table)
+
         # Set central widget
         container = QWidget()
         container.setLayout(layout)
         self.setCentralWidget(container)
 
-        # Adjust size to fit content
-        self.adjustSize()
-
-        # Fix height, allow width resizing
-        self.setFixedHeight(self.height())
+        self.resize(720, 420)
         self.setMinimumWidth(300)
 
     def on_execute(self):
-        url_or_id = self.url_input.text().strip()
-        if not url_or_id:
+        lines = [line.strip() for line in self.url_input.toPlainText().splitlines()]
+        urls_or_ids = [line for line in lines if line and not line.startswith("#")]
+        if not urls_or_ids:
             QMessageBox.warning(self, "Input Error", "Please enter a Notion Page URL or ID.")
             return
 
+        if not self.jobs:
+            # 計測結果は、ジョブがない状態から次にすべてのジョブが終わるまでを集計する
+            get_metrics().reset()
+        if self.image_cache is None:
+            self.image_cache = ImageCache()
+            self.render_cache = RenderCache()
+            self.entry_index = SharedEntryIndex()
+
         publish = self.publish_checkbox.isChecked()
+        for url_or_id in urls_or_ids:
+            self.add_job(url_or_id, publish)
+        self.url_input.clear()
+
+    def add_job(self, url_or_id, publish):
+        job = PageJob(next(self.job_ids), url_or_id, publish, self.image_cache, self.render_cache, self.entry_index)
+        job.signals.progress_signal.connect(self.on_progress)
+        job.signals.finished_signal.connect(self.on_success)
+        job.signals.error_signal.connect(self.on_error)
+        job.signals.cancelled_signal.connect(self.on_cancelled)
+
+        row = self.job_table.rowCount()
+        self.job_table.insertRow(row)
+        self.job_table.setItem(row, COLUMN_PAGE, QTableWidgetItem(url_or_id))
+        self.job_table.setItem(row, COLUMN_STAGE, QTableWidgetItem(STAGE_LABELS[STAGE_QUEUED]))
+        self.job_table.setItem(row, COLUMN_BLOCKS, QTableWidgetItem("0"))
+        self.job_table.setItem(row, COLUMN_IMAGES, QTableWidgetItem("0/0"))
+        self.job_table.setItem(row, COLUMN_RESULT, QTableWidgetItem(""))
+        cancel_button = QPushButton("Cancel")
+        cancel_button.clicked.connect(lambda: self.cancel_job(job.job_id))
+        self.job_table.setCellWidget(row, COLUMN_CANCEL, cancel_button)
+
+        self.jobs[job.job_id] = job
+        self.job_rows[job.job_id] = row
+        self.thread_pool.start(job)
+
+    def cancel_job(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        job.progress.cancel()
+        self.set_result(job_id, "Cancelling...")
+        # まだ始まっていないジョブは、実行待ちの列から取り除く
+        if self.thread_pool.tryTake(job):
+            self.on_cancelled(job_id)
+
+    def on_progress(self, job_id, stage, blocks_fetched, images_uploaded, images_total):
+        row = self.job_rows.get(job_id)
+        if row is None or job_id not in self.jobs:
+            return
+        self.job_table.item(row, COLUMN_STAGE).setText(STAGE_LABELS.get(stage, stage))
+        self.job_table.item(row, COLUMN_BLOCKS).setText(str(blocks_fetched))
+        self.job_table.item(row, COLUMN_IMAGES).setText(f"{images_uploaded}/{images_total}")
+
+    def on_success(self, job_id, message):
+        self.finish_job(job_id, message)
+
+    def on_error(self, job_id, message):
+        self.finish_job(job_id, f"An error occurred: {message}")
+
+    def on_cancelled(self, job_id):
+        self.finish_job(job_id, "Cancelled")
+
+    def set_result(self, job_id, message):
+        row = self.job_rows[job_id]
+        item = self.job_table.item(row, COLUMN_RESULT)
+        item.setText(message.splitlines()[0] if message else "")
+        item.setToolTip(message)
+
+    def finish_job(self, job_id, message):
+        if self.jobs.pop(job_id, None) is None:
+            return
+        row = self.job_rows[job_id]
+        self.job_table.item(row, COLUMN_STAGE).setText(STAGE_LABELS[STAGE_DONE])
+        self.job_table.cellWidget(row, COLUMN_CANCEL).setEnabled(False)
+        self.set_result(job_id, message)
+
+        if not self.jobs and self.metrics_checkbox.isChecked():
+            QMessageBox.information(self, "Timing Report", get_metrics().format_summary())
 
-        # Disable button while processing
-        self.execute_button.setEnabled(False)
-        self.execute_button.setText("Processing...")
-
-        # Start worker thread
-        self.worker = WorkerThread(url_or_id, publish)
-        self.worker.finished_signal.connect(self.on_success)
-        self.worker.error_signal.connect(self.on_error)
-        self.worker.start()
-
-    def on_success(self, message):
-        self.execute_button.setEnabled(True)
-        self.execute_button.setText("Execute")
-        QMessageBox.information(self, "Success", message)
-
-    def on_error(self, message):
-        self.execute_button.setEnabled(True)
-        self.execute_button.setText("Execute")
-        QMessageBox.critical(self, "Error", f"An error occurred:\n{message}")
+    def closeEvent(self, event):
+        # 実行待ちのジョブを取り消し、実行中のジョブが中断するのを待ってからキャッシュを閉じる
+        for job in list(self.jobs.values()):
+            job.progress.cancel()
+        self.thread_pool.clear()
+        self.thread_pool.waitForDone()
+        if self.image_cache is not None:
+            self.image_cache.evict()
+            self.image_cache.close()
+            self.render_cache.evict()
+            self.render_cache.close()
+            self.entry_index.close()
+        super().closeEvent(event)
 
 
 def launch_gui():